@@ -0,0 +1,48 @@
+"""Compare generating all mutants with shallow node copies (current) and deep node copies.
+
+Usage: python benchmarks/copy_node.py [FUNCTIONS] [CLASSES]
+"""
+import sys
+import time
+import tracemalloc
+
+from mutpy import operators, utils
+from mutpy.operators import base
+
+import samples
+
+
+def generate_all_mutants(target_ast, module):
+    number = 0
+    for operator in utils.sort_operators(operators.standard_operators | operators.experimental_operators):
+        for _ in operator().mutate(target_ast, module=module):
+            number += 1
+    return number
+
+
+def measure(copy_function, target_ast, module):
+    base.shallow_copy_node = copy_function
+    tracemalloc.start()
+    start = time.perf_counter()
+    number = generate_all_mutants(target_ast, module)
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return number, duration, peak
+
+
+def main(argv):
+    source = samples.create_source(*map(int, argv[1:3]))
+    target_ast = utils.create_ast(source)
+    module = utils.create_module(utils.create_ast(source))
+    shallow_copy_node = base.shallow_copy_node
+    print('{} lines'.format(source.count('\n')))
+    for name, copy_function in [('deep copy', base.deep_copy_node), ('shallow copy', shallow_copy_node)]:
+        number, duration, peak = measure(copy_function, target_ast, module)
+        print('{:<14} {} mutants, {:.3f} s, peak traced memory {:.1f} KiB'.format(
+            name, number, duration, peak / 1024))
+    base.shallow_copy_node = shallow_copy_node
+
+
+if __name__ == '__main__':
+    main(sys.argv)
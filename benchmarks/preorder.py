@@ -0,0 +1,81 @@
+"""Compare AST annotated with descendants lists (previous) and with preorder numbers (current).
+
+Usage: python benchmarks/preorder.py [FILES]
+
+Without files it measures typing.py and _pydecimal.py from the standard library and a synthetic module
+with deeply nested sums (200 functions returning sums of 100 terms).
+"""
+import ast
+import copy
+import os
+import sys
+import time
+import tracemalloc
+
+from mutpy import utils
+
+import samples
+
+
+class ChildrenNodeTransformer(ast.NodeTransformer):
+    """Previous ParentNodeTransformer, every node keeps list of all its descendants."""
+
+    def visit(self, node):
+        if getattr(node, 'parent', None):
+            node = copy.copy(node)
+            if hasattr(node, 'lineno'):
+                del node.lineno
+        node.parent = getattr(self, 'parent', None)
+        node.children = []
+        self.parent = node
+        result_node = super().visit(node)
+        self.parent = node.parent
+        if self.parent:
+            self.parent.children += [node] + node.children
+        return result_node
+
+
+def create_children_ast(code):
+    return ChildrenNodeTransformer().visit(ast.parse(code))
+
+
+def measure(create_function, code):
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree = create_function(code)
+    build_duration = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    copy.deepcopy(tree)
+    return size, build_duration, time.perf_counter() - start
+
+
+def get_default_sources():
+    library_dir = os.path.dirname(os.__file__)
+    for file_name in ['typing.py', '_pydecimal.py']:
+        with open(os.path.join(library_dir, file_name)) as source_file:
+            yield file_name, source_file.read()
+    yield 'deep sums', samples.create_deep_source()
+
+
+def get_sources(paths):
+    for path in paths:
+        with open(path) as source_file:
+            yield os.path.basename(path), source_file.read()
+
+
+def main(argv):
+    sys.setrecursionlimit(100000)
+    sources = get_sources(argv[1:]) if argv[1:] else get_default_sources()
+    for name, code in sources:
+        print('{} ({} lines)'.format(name, code.count('\n')))
+        for label, create_function in [('children', create_children_ast), ('preorder', utils.create_ast),
+                                       ('ast.parse', ast.parse)]:
+            size, build_duration, copy_duration = measure(create_function, code)
+            print('  {:<10} traced memory {:7.1f} MiB, build {:.3f} s, deepcopy {:.3f} s'.format(
+                label, size / 2 ** 20, build_duration, copy_duration))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,51 @@
+"""Synthetic target modules used by MutPy benchmarks."""
+
+FUNCTION_TEMPLATE = '''
+def function_{n}(a, b, items):
+    result = a + b * {n} - (a // (b or 1)) % 7
+    if a > b and not b < 0 or a == {n}:
+        result += a ** 2
+    for item in items:
+        if item != result:
+            result -= item | {n}
+        else:
+            break
+    while result > 1000:
+        result = result >> 1
+    try:
+        result = items[1:result:2]
+    except IndexError:
+        result = -result
+    return result
+'''
+
+CLASS_TEMPLATE = '''
+class Base{n}:
+    value = {n}
+
+    def method(self, x, y=1):
+        return x + y + self.value
+
+
+class Derived{n}(Base{n}):
+    value = {n} + 1
+
+    def method(self, x, y=1):
+        super().method(x, y=y)
+        total = x - y
+        for i in range(x):
+            total += i * self.value
+        return total
+'''
+
+
+def create_source(functions=40, classes=10):
+    parts = [FUNCTION_TEMPLATE.format(n=n) for n in range(functions)]
+    parts += [CLASS_TEMPLATE.format(n=n) for n in range(classes)]
+    return ''.join(parts)
+
+
+def create_deep_source(functions=200, terms=100):
+    """Return functions returning long sums, which parse to deeply nested binary operations."""
+    return ''.join('def f{}(x):\n    return {}\n'.format(n, ' + '.join('x * {}'.format(term) for term in range(terms)))
+                   for n in range(functions))
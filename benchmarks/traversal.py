@@ -0,0 +1,57 @@
+"""Compare generating mutants by visiting the whole AST once per operator and by a single walk over the AST.
+
+Usage: python benchmarks/traversal.py [FUNCTIONS] [CLASSES]
+"""
+import sys
+import time
+
+from mutpy import controller, operators, utils
+
+import samples
+
+OPERATORS = operators.standard_operators | operators.experimental_operators
+
+
+def visit_per_operator(target_ast, module):
+    for operator in utils.sort_operators(OPERATORS):
+        for mutation, mutant in operator().mutate(target_ast, module=module):
+            yield [mutation], mutant
+
+
+def single_walk(target_ast, module):
+    return controller.FirstOrderMutator(OPERATORS).mutate(target_ast, module=module)
+
+
+def apply_by_visit(target_ast, module):
+    mutator = controller.HighOrderMutator(OPERATORS)
+    mutator.get_mutation_sites = lambda site, applied_sites: None
+    return mutator.mutate(target_ast, module=module)
+
+
+def apply_by_site(target_ast, module):
+    return controller.HighOrderMutator(OPERATORS).mutate(target_ast, module=module)
+
+
+def measure(generate, target_ast, module):
+    start = time.perf_counter()
+    number = sum(1 for _ in generate(target_ast, module))
+    return number, time.perf_counter() - start
+
+
+def main(argv):
+    source = samples.create_source(*map(int, argv[1:3]))
+    target_ast = utils.create_ast(source)
+    module = utils.create_module(utils.create_ast(source))
+    print('{} lines'.format(source.count('\n')))
+    for name, generate in [
+        ('first order, visit per operator', visit_per_operator),
+        ('first order, single walk', single_walk),
+        ('second order, visit per mutation', apply_by_visit),
+        ('second order, single walk', apply_by_site),
+    ]:
+        number, duration = measure(generate, target_ast, module)
+        print('{:<34} {} mutants, {:.3f} s'.format(name, number, duration))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
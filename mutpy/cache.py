@@ -0,0 +1,205 @@
+import ast
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+
+from mutpy import utils, equivalence
+from mutpy.test_runners.base import SerializableMutationTestResult
+
+DEFAULT_CACHE_DIR = '.mutpy_cache'
+
+
+def hash_module(module):
+    digest = hashlib.sha1(module.__name__.encode())
+    try:
+        with open(module.__file__, 'rb') as module_file:
+            digest.update(module_file.read())
+    except (AttributeError, OSError):
+        pass
+    return digest.hexdigest()
+
+
+def get_package_modules(modules):
+    """Return the modules and all loaded modules of their top-level packages."""
+    packages = {module.__name__.split('.')[0] for module in modules}
+    package_modules = {module.__name__: module for module in modules}
+    for name, module in list(sys.modules.items()):
+        if module is not None and name.split('.')[0] in packages:
+            package_modules.setdefault(name, module)
+    return list(package_modules.values())
+
+
+def create_fingerprint(modules, options=None):
+    """Return hash of the Python version, sources of the modules and options of the run."""
+    digest = hashlib.sha1(sys.version.encode())
+    for module in sorted(modules, key=lambda module: module.__name__):
+        digest.update(hash_module(module).encode())
+    digest.update(repr(sorted((options or {}).items())).encode())
+    return digest.hexdigest()
+
+
+class MutationResultCache:
+    """On-disk store of mutants results shared between MutPy runs.
+
+    Results are keyed by the mutant AST, the applied operators and visitors, the source of all test
+    modules and the run fingerprint (sources of loaded target packages and options which affect outcomes),
+    so a result is reused only when neither the mutant, the code it runs nor the options changed. Per-test
+    coverage of target modules is stored the same way, and the number of mutants killed by each test is
+    kept across runs, per mutation operator and line, to order tests.
+    """
+    FILE_NAME = 'results.sqlite'
+    COVERAGE_FORMAT = 'bitset'
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(cache_dir, self.FILE_NAME))
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result BLOB)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS coverage (key TEXT PRIMARY KEY, coverage BLOB)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS kills (test TEXT, key TEXT, kills INTEGER, '
+                                    'PRIMARY KEY (test, key))')
+        self.tests_hash = ''
+        self.run_fingerprint = ''
+
+    def set_test_modules(self, test_modules):
+        self.tests_hash = create_fingerprint(test_modules)
+
+    def set_run_fingerprint(self, fingerprint):
+        self.run_fingerprint = fingerprint
+
+    def create_key(self, mutations, mutant_ast):
+        digest = hashlib.sha1(self.tests_hash.encode())
+        digest.update(self.run_fingerprint.encode())
+        for mutation in mutations:
+            digest.update('{}:{}'.format(mutation.operator.name(), mutation.visitor).encode())
+        digest.update(ast.dump(mutant_ast).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        row = self.connection.execute('SELECT result FROM results WHERE key = ?', (key,)).fetchone()
+        if row:
+            return pickle.loads(row[0])
+        return None
+
+    def set(self, key, result, duration):
+        if result:
+            result = utils.make_picklable_result(result)
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?)',
+                                    (key, pickle.dumps((result, duration))))
+
+    def create_coverage_key(self, target_module, target_ast):
+        digest = hashlib.sha1(self.tests_hash.encode())
+        digest.update(self.COVERAGE_FORMAT.encode())
+        digest.update(target_module.__name__.encode())
+        digest.update(ast.dump(target_ast).encode())
+        return digest.hexdigest()
+
+    def get_coverage(self, key):
+        row = self.connection.execute('SELECT coverage FROM coverage WHERE key = ?', (key,)).fetchone()
+        if row:
+            return pickle.loads(row[0])
+        return None
+
+    def set_coverage(self, key, covered_nodes, test_covered_nodes):
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO coverage VALUES (?, ?)',
+                                    (key, pickle.dumps((covered_nodes, test_covered_nodes))))
+
+    def get_test_kills(self):
+        return {(test, key): kills for test, key, kills in self.connection.execute('SELECT * FROM kills')}
+
+    def set_test_kills(self, test_kills):
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO kills VALUES (?, ?, ?)',
+                                        ((test, key, kills) for (test, key), kills in test_kills.items()))
+
+
+class MutationRunState:
+    """Outcomes of mutants decided so far in a run, appended to a file after each mutant.
+
+    It is notified about mutants like views. Mutants are identified by their number, module and applied
+    operators, visitors and nodes markers, so a restarted run can skip mutants which were already decided
+    and report their recorded results instead. The file starts with the run fingerprint and the seed of
+    random order of mutants, outcomes recorded for other sources, options or seed are dropped.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.header, self.results, self.size = self.load()
+        self.state_file = None
+        self.current_key = None
+
+    def load(self):
+        """Return the header (fingerprint and seed), outcomes and size of complete records of the state file."""
+        header, results, size = (None, None), {}, 0
+        try:
+            with open(self.file_name, 'rb') as state_file:
+                header = pickle.load(state_file)
+                size = state_file.tell()
+                while True:
+                    key, result, duration = pickle.load(state_file)
+                    results[key] = (result, duration)
+                    size = state_file.tell()
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # missing file, end of the file or an outcome which was being written when the run was stopped
+            pass
+        return header, results, size
+
+    def set_run_fingerprint(self, fingerprint, seed=None):
+        if (fingerprint, seed) != self.header:
+            self.header = (fingerprint, seed)
+            self.results = {}
+            self.size = 0
+
+    @staticmethod
+    def create_key(number, module_name, mutations):
+        return number, module_name, tuple((mutation.operator.name(), mutation.visitor,
+                                           getattr(mutation.node, 'marker', None)) for mutation in mutations)
+
+    def get(self, number, module_name, mutations):
+        return self.results.get(self.create_key(number, module_name, mutations))
+
+    def set(self, key, result, duration):
+        if result:
+            result = utils.make_picklable_result(result)
+        self.results[key] = (result, duration)
+        if not self.state_file:
+            self.state_file = open(self.file_name, 'ab')
+            self.state_file.truncate(self.size)
+            if not self.size:
+                pickle.dump(self.header, self.state_file)
+        pickle.dump((key, result, duration), self.state_file)
+        self.state_file.flush()
+
+    def mutation(self, number, mutations, module, mutant):
+        key = self.create_key(number, module.__name__, mutations)
+        self.current_key = None if key in self.results else key
+
+    def end_mutation(self, result, duration):
+        if self.current_key:
+            self.set(self.current_key, result, duration)
+            self.current_key = None
+
+    def killed(self, time, killer, exception_traceback, tests_run, *args, **kwargs):
+        self.end_mutation(SerializableMutationTestResult(False, False, killer, exception_traceback, None, tests_run),
+                          time)
+
+    def survived(self, time, tests_run, *args, **kwargs):
+        self.end_mutation(SerializableMutationTestResult(False, True, None, None, None, tests_run), time)
+
+    def incompetent(self, time, exception, tests_run, *args, **kwargs):
+        self.end_mutation(SerializableMutationTestResult(True, False, None, None, exception, tests_run), time)
+
+    def timeout(self, time, *args, **kwargs):
+        self.end_mutation(None, time)
+
+    def equivalent(self, time, *args, **kwargs):
+        self.end_mutation(equivalence.EQUIVALENT, time)
+
+    def end(self, *args, **kwargs):
+        if self.state_file:
+            self.state_file.close()
+            self.state_file = None
@@ -0,0 +1,89 @@
+import ast
+import bisect
+import os
+import re
+import subprocess
+
+HUNK_HEADER_PATTERN = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+
+class ChangesException(Exception):
+    pass
+
+
+def parse_changed_lines(diff):
+    changed_lines = set()
+    for line in diff.splitlines():
+        match = HUNK_HEADER_PATTERN.match(line)
+        if match:
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            if count:
+                changed_lines.update(range(start, start + count))
+            else:
+                changed_lines.add(max(start, 1))
+    return changed_lines
+
+
+def get_line_span(node):
+    end_lineno = getattr(node, 'end_lineno', None)
+    if end_lineno is not None:
+        decorator_list = getattr(node, 'decorator_list', None)
+        if decorator_list:
+            return min(node.lineno, min(decorator.lineno for decorator in decorator_list)), end_lineno
+        return node.lineno, end_lineno
+    linenos = [n.lineno for n in ast.walk(node) if hasattr(n, 'lineno')]
+    return min(linenos), max(linenos)
+
+
+class ChangedNodesFilter:
+
+    def __init__(self, changed_lines):
+        self.changed_lines = sorted(changed_lines)
+
+    def is_selected(self, node):
+        if not hasattr(node, 'lineno'):
+            return True
+        start, end = get_line_span(node)
+        index = bisect.bisect_left(self.changed_lines, start)
+        return index < len(self.changed_lines) and self.changed_lines[index] <= end
+
+
+class GitChanges:
+    """Lines of target files changed in the working tree since the given git revision."""
+
+    def __init__(self, revision):
+        self.revision = revision
+        try:
+            self.git('rev-parse', '--verify', '--quiet', revision + '^{commit}')
+        except ChangesException:
+            raise ChangesException('Unknown git revision {}.'.format(revision))
+
+    def git(self, *args, cwd=None):
+        try:
+            process = subprocess.Popen(['git'] + list(args), cwd=cwd, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, universal_newlines=True)
+        except OSError as error:
+            raise ChangesException("Can't run git: {}".format(error))
+        output, error = process.communicate()
+        if process.returncode:
+            raise ChangesException(error.strip())
+        return output
+
+    def is_tracked(self, path):
+        try:
+            self.git('ls-files', '--error-unmatch', path, cwd=os.path.dirname(path))
+        except ChangesException:
+            return False
+        return True
+
+    def get_changed_lines(self, path):
+        path = os.path.abspath(path)
+        diff = self.git('diff', '--unified=0', '--no-color', '--no-ext-diff', self.revision, '--', path,
+                        cwd=os.path.dirname(path))
+        return parse_changed_lines(diff)
+
+    def get_node_filter(self, path):
+        if not self.is_tracked(path):
+            return None
+        return ChangedNodesFilter(self.get_changed_lines(path))
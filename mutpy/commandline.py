@@ -2,28 +2,52 @@ import argparse
 import sys
 
 from mutpy import __version__ as version
-from mutpy import controller, views, operators, utils
+from mutpy import controller, views, operators, utils, pool, cache, changes, profiler, coverage, sampling
 
 
 def main(argv):
+    if argv[1:2] == ['merge']:
+        run_merge(build_merge_parser(), argv[2:])
+        return
     parser = build_parser()
     run_mutpy(parser)
 
 
+def shard_type(value):
+    try:
+        index, count = map(int, value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('shard should be given as INDEX/COUNT, e.g. 1/4')
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError('shard index should be between 1 and shards count')
+    return index, count
+
+
 def build_parser():
     DEF_TIMEOUT_FACTOR = 5
+    DEF_TIMEOUT_FLOOR = 1
+    DEF_TIMEOUT_PERCENTILE = 95
+    DEF_SCORE_CONFIDENCE = 95
     parser = argparse.ArgumentParser(description='Mutation testing tool for Python 3.x source code. ',
                                      fromfile_prefix_chars='@')
     parser.add_argument('--version', '-v', action='version', version='%(prog)s {}'.format(version))
     parser.add_argument('--target', '-t', type=str, nargs='+', help='target module or package to mutate')
     parser.add_argument('--unit-test', '-u', type=str, nargs='+',
                         help='test class, test method, module or package with unit tests')
-    parser.add_argument('--runner', type=str, choices=['unittest', 'pytest'], default='unittest',
+    parser.add_argument('--runner', type=str, choices=['unittest', 'pytest', 'pytest-session'], default='unittest',
                         metavar='RUNNER', help='test runner')
     parser.add_argument('--report', '-r', type=str, help='generate YAML report', metavar='REPORT_FILE')
     parser.add_argument('--report-html', type=str, help='generate HTML report', metavar='DIR_NAME')
+    parser.add_argument('--report-jsonl', type=str, help='stream results to JSON Lines report', metavar='REPORT_FILE')
+    parser.add_argument('--report-from-jsonl', type=str, metavar='REPORT_FILE',
+                        help='generate YAML and HTML reports from JSON Lines report')
     parser.add_argument('--timeout-factor', '-f', type=float, default=DEF_TIMEOUT_FACTOR,
                         help='max timeout factor (default {})'.format(DEF_TIMEOUT_FACTOR))
+    parser.add_argument('--timeout-floor', type=float, default=DEF_TIMEOUT_FLOOR, metavar='SECONDS',
+                        help='minimal time budget of a mutant (default {})'.format(DEF_TIMEOUT_FLOOR))
+    parser.add_argument('--timeout-percentile', type=float, default=DEF_TIMEOUT_PERCENTILE, metavar='PERCENTILE',
+                        help='percentile of tests durations added to time budget of a mutant '
+                             '(default {})'.format(DEF_TIMEOUT_PERCENTILE))
     parser.add_argument('--show-mutants', '-m', action='store_true', help='show mutants source code')
     parser.add_argument('--quiet', '-q', action='store_true', help='quiet mode')
     parser.add_argument('--debug', action='store_true', help='dubug mode')
@@ -40,14 +64,60 @@ def build_parser():
     parser.add_argument('--path', '-p', type=str, metavar='DIR', help='extend Python path')
     parser.add_argument('--percentage', type=int, metavar='PERCENTAGE', default=100,
                         help='percentage of the generated mutants (mutation sampling)')
+    parser.add_argument('--score-margin', type=float, metavar='PERCENT',
+                        help='run mutants in random order until the confidence interval of mutation score is not '
+                             'wider than the score +/- PERCENT')
+    parser.add_argument('--score-confidence', type=float, metavar='PERCENT', default=DEF_SCORE_CONFIDENCE,
+                        help='confidence level of mutation score interval (default {})'.format(DEF_SCORE_CONFIDENCE))
+    parser.add_argument('--score-seed', type=int, metavar='SEED',
+                        help='seed of random order of mutants (default derived from sources and options)')
     parser.add_argument('--coverage', action='store_true',
                         help='mutate only covered code')
+    parser.add_argument('--coverage-backend', type=str, choices=sorted(coverage.COVERAGE_BACKENDS), default='ast',
+                        help='measure coverage by injecting code into modules (ast) or by tracing lines (trace)')
+    parser.add_argument('--select-tests', action='store_true',
+                        help='run only tests which cover mutated code')
+    parser.add_argument('--kill-first', action='store_true',
+                        help='run first tests which killed mutants of the same operator or line, '
+                             'then the fastest tests')
+    parser.add_argument('--tce', action='store_true',
+                        help='detect mutants compiled to the same code as the original (equivalent) or as other '
+                             'mutant (run once)')
+    parser.add_argument('--schemata', action='store_true',
+                        help='compile mutants of functions bodies into one module and switch them at runtime')
     parser.add_argument('--order', type=int, metavar='ORDER', default=1, help='mutation order')
     parser.add_argument('--hom-strategy', type=str, metavar='HOM_STRATEGY', help='HOM strategy',
                         default='FIRST_TO_LAST')
     parser.add_argument('--list-hom-strategies', action='store_true', help='list available HOM strategies')
     parser.add_argument('--mutation-number', type=int, metavar='MUTATION_NUMBER',
                         help='run only one mutation (debug purpose)')
+    parser.add_argument('--jobs', '-j', type=int, metavar='JOBS', default=1,
+                        help='number of worker processes running mutants in parallel')
+    parser.add_argument('--cache', action='store_true',
+                        help='reuse results of unchanged mutants and tests from previous runs')
+    parser.add_argument('--cache-dir', type=str, metavar='DIR', default=cache.DEFAULT_CACHE_DIR,
+                        help='directory of results cache (default {})'.format(cache.DEFAULT_CACHE_DIR))
+    parser.add_argument('--resume', type=str, metavar='STATE_FILE',
+                        help='record outcome of each mutant and skip already decided mutants on restart')
+    parser.add_argument('--since', type=str, metavar='REVISION',
+                        help='mutate only code changed since given git revision')
+    parser.add_argument('--shard', type=shard_type, metavar='INDEX/COUNT',
+                        help='run only mutants assigned to given shard, e.g. 1/4')
+    parser.add_argument('--profile', type=str, metavar='PROFILE_FILE',
+                        help='write wall and CPU time of each phase of processing mutants to JSON Lines file')
+    parser.add_argument('--profile-top', type=int, metavar='N', default=0,
+                        help='save cProfile stats of N slowest mutants next to profile file')
+    return parser
+
+
+def build_merge_parser():
+    parser = argparse.ArgumentParser(prog='mut.py merge',
+                                     description='Merge JSON Lines reports of shards into one report.')
+    parser.add_argument('reports', type=str, nargs='+', help='JSON Lines reports of shards', metavar='SHARD_REPORT')
+    parser.add_argument('--report', '-r', type=str, help='generate YAML report', metavar='REPORT_FILE')
+    parser.add_argument('--report-html', type=str, help='generate HTML report', metavar='DIR_NAME')
+    parser.add_argument('--report-jsonl', type=str, help='generate JSON Lines report', metavar='REPORT_FILE')
+    parser.add_argument('--colored-output', '-c', action='store_true', help='try print colored output')
     return parser
 
 
@@ -57,6 +127,8 @@ def run_mutpy(parser):
         list_operators()
     elif cfg.list_hom_strategies:
         list_hom_strategies()
+    elif cfg.report_from_jsonl:
+        controller.JSONLReportReplay([cfg.report_from_jsonl], build_report_views(cfg)).run()
     elif cfg.target and cfg.unit_test:
         mutation_controller = build_controller(cfg)
         mutation_controller.run()
@@ -64,7 +136,22 @@ def run_mutpy(parser):
         parser.print_usage()
 
 
+def run_merge(parser, args):
+    cfg = parser.parse_args(args)
+    merge_views = [views.QuietTextView(cfg.colored_output)] + build_report_views(cfg)
+    controller.JSONLReportReplay(cfg.reports, merge_views).run()
+
+
 def build_controller(cfg):
+    if cfg.jobs > 1 and not pool.fork_available():
+        print('Parallel mutation (--jobs) is not supported on this platform.')
+        sys.exit(-1)
+    if not 0 < cfg.score_confidence < 100:
+        print('Confidence level (--score-confidence) should be between 0 and 100.')
+        sys.exit(-1)
+    if cfg.score_margin and cfg.jobs > 1:
+        print('Estimating mutation score (--score-margin) is not supported with --jobs.')
+        sys.exit(-1)
     runner_cls = get_runner_cls(cfg.runner)
     built_views = build_views(cfg)
     mutant_generator = build_mutator(cfg)
@@ -77,12 +164,37 @@ def build_controller(cfg):
         views=built_views,
         mutant_generator=mutant_generator,
         timeout_factor=cfg.timeout_factor,
+        timeout_floor=cfg.timeout_floor,
+        timeout_percentile=cfg.timeout_percentile,
         disable_stdout=cfg.disable_stdout,
         mutate_covered=cfg.coverage,
+        coverage_backend=cfg.coverage_backend,
         mutation_number=cfg.mutation_number,
+        jobs=cfg.jobs,
+        result_cache=cache.MutationResultCache(cfg.cache_dir) if cfg.cache else None,
+        run_state=cache.MutationRunState(cfg.resume) if cfg.resume else None,
+        shard=controller.MutantsShard(*cfg.shard) if cfg.shard else None,
+        tce=cfg.tce,
+        schemata=cfg.schemata,
+        profiler=profiler.MutantsProfiler(cfg.profile, cfg.profile_top) if cfg.profile else None,
+        score_estimator=sampling.ScoreEstimator(cfg.score_margin, cfg.score_confidence,
+                                                cfg.score_seed) if cfg.score_margin else None,
+        changes=build_changes(cfg),
+        select_tests=cfg.select_tests,
+        kill_first=cfg.kill_first,
     )
 
 
+def build_changes(cfg):
+    if not cfg.since:
+        return None
+    try:
+        return changes.GitChanges(cfg.since)
+    except changes.ChangesException as error:
+        print(error)
+        sys.exit(-1)
+
+
 def get_runner_cls(runner):
     if runner == 'unittest':
         from mutpy.test_runners import UnittestTestRunner
@@ -90,6 +202,12 @@ def get_runner_cls(runner):
     elif runner == 'pytest':
         from mutpy.test_runners import PytestTestRunner
         return PytestTestRunner
+    elif runner == 'pytest-session':
+        from mutpy.test_runners import PytestTestRunner, PytestSessionTestRunner, pytest_session_supported
+        if pytest_session_supported():
+            return PytestSessionTestRunner
+        print('Runner pytest-session requires pytest 7.0 or newer, falling back to pytest runner.')
+        return PytestTestRunner
     raise ValueError('Unknown runner: {0}'.format(runner))
 
 
@@ -153,14 +271,25 @@ def build_views(cfg):
     else:
         views_list.append(views.TextView(cfg.colored_output, cfg.show_mutants))
 
+    views_list += build_report_views(cfg)
+
+    if cfg.debug:
+        views_list.append(views.DebugView())
+
+    return views_list
+
+
+def build_report_views(cfg):
+    views_list = []
+
     if cfg.report:
         views_list.append(views.YAMLReportView(cfg.report))
 
     if cfg.report_html:
         views_list.append(views.HTMLReportView(cfg.report_html))
 
-    if cfg.debug:
-        views_list.append(views.DebugView())
+    if cfg.report_jsonl:
+        views_list.append(views.JSONLReportView(cfg.report_jsonl))
 
     return views_list
 
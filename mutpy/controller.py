@@ -1,8 +1,12 @@
+import ast
+import collections
+import hashlib
 import random
 import sys
 import time
+import types
 
-from mutpy import views, utils
+from mutpy import views, utils, pool, patching, operators, equivalence, schemata, sampling, cache
 
 
 class TestsFailAtOriginal(Exception):
@@ -18,11 +22,15 @@ class MutationScore:
         self.timeout_mutants = 0
         self.incompetent_mutants = 0
         self.survived_mutants = 0
+        self.equivalent_mutants = 0
         self.covered_nodes = 0
         self.all_nodes = 0
+        self.confidence = None
+        self.confidence_interval = None
+        self.population = None
 
     def count(self):
-        bottom = self.all_mutants - self.incompetent_mutants
+        bottom = self.all_mutants - self.incompetent_mutants - self.equivalent_mutants
         return (((self.killed_mutants + self.timeout_mutants) / bottom) * 100) if bottom else 0
 
     def inc_killed(self):
@@ -37,19 +45,49 @@ class MutationScore:
     def inc_survived(self):
         self.survived_mutants += 1
 
+    def inc_equivalent(self):
+        self.equivalent_mutants += 1
+
     def update_coverage(self, covered_nodes, all_nodes):
         self.covered_nodes += covered_nodes
         self.all_nodes += all_nodes
 
+    def set_confidence_interval(self, confidence, low, high, population):
+        self.confidence = confidence
+        self.confidence_interval = (low, high)
+        self.population = population
+
     @property
     def all_mutants(self):
-        return self.killed_mutants + self.timeout_mutants + self.incompetent_mutants + self.survived_mutants
+        return (self.killed_mutants + self.timeout_mutants + self.incompetent_mutants + self.survived_mutants +
+                self.equivalent_mutants)
+
+
+class MutantsShard:
+    """Part of mutants of a run which is spread over several machines.
+
+    Mutants are assigned to shards by a hash of their module and applied operators, visitors and nodes
+    markers, so the same mutant always goes to the same shard regardless of the order of mutants.
+    """
+
+    def __init__(self, index, count):
+        self.index = index
+        self.count = count
+
+    def is_selected(self, module_name, mutations):
+        mutant_id = ';'.join('{}:{}:{}:{}'.format(module_name, mutation.operator.name(), mutation.visitor,
+                                                  getattr(mutation.node, 'marker', None)) for mutation in mutations)
+        digest = hashlib.sha1(mutant_id.encode()).digest()
+        return int.from_bytes(digest[:8], 'big') % self.count == self.index - 1
 
 
 class MutationController(views.ViewNotifier):
 
     def __init__(self, runner_cls, target_loader, test_loader, views, mutant_generator,
-                 timeout_factor=5, disable_stdout=False, mutate_covered=False, mutation_number=None):
+                 timeout_factor=5, disable_stdout=False, mutate_covered=False, mutation_number=None, jobs=1,
+                 result_cache=None, changes=None, select_tests=False, kill_first=False, timeout_floor=1,
+                 timeout_percentile=95, run_state=None, shard=None, tce=False, schemata=False, profiler=None,
+                 coverage_backend='ast', score_estimator=None):
         super().__init__(views)
         self.target_loader = target_loader
         self.test_loader = test_loader
@@ -57,7 +95,40 @@ class MutationController(views.ViewNotifier):
         self.timeout_factor = timeout_factor
         self.stdout_manager = utils.StdoutManager(disable_stdout)
         self.mutation_number = mutation_number
-        self.runner = runner_cls(self.test_loader, self.timeout_factor, self.stdout_manager, mutate_covered)
+        self.jobs = jobs
+        self.result_cache = result_cache
+        self.changes = changes
+        self.shard = shard
+        self.tce = tce
+        self.equivalence = None
+        self.schemata = schemata
+        self.mutant_schemata = None
+        self.baseline_coverage = {}
+        self.score_estimator = score_estimator
+        self.score_seed = None
+        self.runner = runner_cls(self.test_loader, self.timeout_factor, self.stdout_manager, mutate_covered,
+                                 select_tests, kill_first, timeout_floor, timeout_percentile, coverage_backend)
+        self.run_options = {
+            'runner': runner_cls.__name__,
+            'unit_tests': sorted(test_loader.names),
+            'timeout_factor': timeout_factor,
+            'timeout_floor': timeout_floor,
+            'timeout_percentile': timeout_percentile,
+            'mutate_covered': mutate_covered,
+            'select_tests': select_tests,
+            'kill_first': kill_first,
+            'coverage_backend': coverage_backend,
+        }
+        self.add_view(self.runner.test_kills)
+        self.run_state = run_state
+        if run_state:
+            self.add_view(run_state)
+        self.profiler = profiler
+        utils.TimeRegister.profiler = profiler
+        if profiler:
+            if jobs > 1:
+                profiler.dumps = 0
+            self.add_view(profiler)
 
     def run(self):
         self.notify_initialize(self.target_loader.names, self.test_loader.names)
@@ -79,13 +150,46 @@ class MutationController(views.ViewNotifier):
             self.notify_passed(test_modules, number_of_tests)
             self.notify_start()
 
+            if self.result_cache:
+                self.result_cache.set_test_modules([module for module, *_ in test_modules])
+                self.runner.test_kills.kills.update(self.result_cache.get_test_kills())
+
             self.score = MutationScore()
+            self.other_shards_mutants = 0
+
+            target_modules = list(self.target_loader.load([module for module, *_ in test_modules]))
+            self.set_run_fingerprint([module for module, _ in target_modules], [module for module, *_ in test_modules])
+            self.run_baseline_coverage(target_modules)
+            if self.score_estimator:
+                self.mutate_modules_in_random_order(target_modules, total_duration)
+            else:
+                for target_module, to_mutate in target_modules:
+                    self.mutate_module(target_module, to_mutate, total_duration)
 
-            for target_module, to_mutate in self.target_loader.load([module for module, *_ in test_modules]):
-                self.mutate_module(target_module, to_mutate, total_duration)
+            if self.result_cache:
+                self.result_cache.set_test_kills(self.runner.test_kills.kills)
         except KeyboardInterrupt:
             pass
 
+    def set_run_fingerprint(self, target_modules, test_modules):
+        """Tie cached and recorded results to sources of target packages and tests and to options of the run.
+
+        The seed of random order of mutants is derived from the fingerprint too, unless it is given, and it is
+        stored in the run state, so numbers of mutants match when the run is resumed.
+        """
+        if not self.result_cache and not self.run_state and not self.score_estimator:
+            return
+        fingerprint = cache.create_fingerprint(cache.get_package_modules(target_modules) + test_modules,
+                                               self.run_options)
+        if self.score_estimator:
+            self.score_seed = self.score_estimator.seed
+            if self.score_seed is None:
+                self.score_seed = int(fingerprint[:8], 16)
+        if self.result_cache:
+            self.result_cache.set_run_fingerprint(fingerprint)
+        if self.run_state:
+            self.run_state.set_run_fingerprint(fingerprint, self.score_seed)
+
     def load_and_check_tests(self):
         test_modules = []
         number_of_tests = 0
@@ -106,25 +210,277 @@ class MutationController(views.ViewNotifier):
 
     @utils.TimeRegister
     def mutate_module(self, target_module, to_mutate, total_duration):
+        prepared_module = self.prepare_module(target_module, to_mutate)
+        if not prepared_module:
+            return
+        target_ast, coverage_injector, coverage_result, node_filter = prepared_module
+        mutants = self.mutant_generator.mutate(target_ast, to_mutate, coverage_injector, module=target_module,
+                                               node_filter=node_filter)
+        if self.profiler:
+            mutants = self.profiler.generate(mutants)
+        if self.jobs > 1:
+            self.mutate_module_in_pool(target_module, mutants, total_duration, coverage_result)
+            return
+        for mutations, mutant_ast in mutants:
+            self.run_mutant(target_module, mutations, mutant_ast, total_duration, coverage_result)
+
+    def prepare_module(self, target_module, to_mutate):
+        """Return the AST, coverage and nodes filter of the module, or None if the module has no changed lines."""
+        node_filter = self.create_node_filter(target_module)
+        if node_filter and not node_filter.changed_lines:
+            return None
         target_ast = self.create_target_ast(target_module)
         coverage_injector, coverage_result = self.inject_coverage(target_ast, target_module)
         if coverage_injector:
             self.score.update_coverage(*coverage_injector.get_result())
-        for mutations, mutant_ast in self.mutant_generator.mutate(target_ast, to_mutate, coverage_injector,
-                                                                  module=target_module):
-            mutation_number = self.score.all_mutants + 1
-            if self.mutation_number and self.mutation_number != mutation_number:
-                self.score.inc_incompetent()
+        if not self.runner.mutate_covered:
+            coverage_injector = None
+        self.equivalence = self.create_equivalence(target_ast, target_module)
+        self.mutant_schemata = self.create_mutant_schemata(target_ast, target_module, to_mutate, coverage_injector,
+                                                           node_filter)
+        return target_ast, coverage_injector, coverage_result, node_filter
+
+    def mutate_modules_in_random_order(self, target_modules, total_duration):
+        """Run mutants of all modules in random order until the score is estimated precisely enough.
+
+        Mutants are drawn from strata of mutants of the same module and operators, in proportion to the sizes
+        of the strata. If all mutants are run, the score is exact.
+        """
+        prepared_modules = []
+        strata = {}
+        for target_module, to_mutate in target_modules:
+            prepared_module = self.prepare_module(target_module, to_mutate)
+            if not prepared_module:
                 continue
-            self.notify_mutation(mutation_number, mutations, target_module, mutant_ast)
-            mutant_module = self.create_mutant_module(target_module, mutant_ast)
-            if mutant_module:
-                self.run_tests_with_mutant(total_duration, mutant_module, mutations, coverage_result)
-            else:
+            target_ast, coverage_injector, coverage_result, node_filter = prepared_module
+            site_index, mutants_mutations = self.mutant_generator.generate_mutations(
+                target_ast, to_mutate, coverage_injector, module=target_module, node_filter=node_filter)
+            prepared_modules.append(((target_module, to_mutate, target_ast, coverage_injector, coverage_result,
+                                      site_index), (self.equivalence, self.mutant_schemata)))
+            for mutations in mutants_mutations:
+                operators_names = tuple(mutation.operator.name() for mutation in mutations)
+                strata.setdefault((target_module.__name__, operators_names), []).append(
+                    (len(prepared_modules) - 1, mutations))
+        population = sum(len(mutants) for mutants in strata.values())
+        precise = False
+        for module_index, mutations_to_apply in sampling.stratified_order(list(strata.values()), self.score_seed):
+            module, (self.equivalence, self.mutant_schemata) = prepared_modules[module_index]
+            target_module, to_mutate, target_ast, coverage_injector, coverage_result, site_index = module
+            for mutations, mutant_ast in self.mutant_generator.apply_mutations(
+                    target_ast, mutations_to_apply, site_index, to_mutate, coverage_injector, target_module):
+                self.run_mutant(target_module, mutations, mutant_ast, total_duration, coverage_result)
+            if self.score_estimator.is_precise(self.score):
+                precise = True
+                break
+        if precise:
+            low, high = self.score_estimator.get_interval(self.score)
+        else:
+            low = high = self.score.count()
+        self.score.set_confidence_interval(self.score_estimator.confidence, low, high, population)
+
+    def run_mutant(self, target_module, mutations, mutant_ast, total_duration, coverage_result):
+        if not self.is_in_shard(target_module, mutations):
+            return
+        mutation_number = self.score.all_mutants + self.other_shards_mutants + 1
+        if self.mutation_number and self.mutation_number != mutation_number:
+            self.score.inc_incompetent()
+            return
+        self.start_mutant(mutation_number)
+        self.notify_mutation(mutation_number, mutations, target_module, mutant_ast)
+        cache_key, cached_result = self.get_cached_result(mutation_number, target_module, mutations, mutant_ast)
+        if cached_result:
+            self.update_score_and_notify_views(*cached_result)
+            return
+        mutant_id = self.get_schemata_mutant_id(mutations)
+        function_patch, mutant_code, exception = self.prepare_mutant(target_module, mutations, mutant_ast, mutant_id)
+        if exception:
+            self.update_score_and_notify_views(pool.create_incompetent_result(exception), 0)
+            return
+        equivalence_key, equivalent_result = self.find_equivalent_result(mutant_code, function_patch)
+        if equivalent_result:
+            self.update_score_and_notify_views(*equivalent_result)
+            return
+        if mutant_id:
+            with self.mutant_schemata.activate(mutant_id) as mutant_module:
+                result = self.run_tests_with_mutant(total_duration, mutant_module, mutations, coverage_result,
+                                                    cache_key)
+        elif function_patch:
+            with function_patch as mutant_module:
+                result = self.run_tests_with_mutant(total_duration, mutant_module, mutations, coverage_result,
+                                                    cache_key)
+        else:
+            mutant_module = self.create_mutant_module(target_module, mutant_code)
+            if not mutant_module:
                 self.score.inc_incompetent()
+                return
+            result = self.run_tests_with_mutant(total_duration, mutant_module, mutations, coverage_result, cache_key)
+        self.store_equivalent_result(equivalence_key, *result)
+
+    def mutate_module_in_pool(self, target_module, mutants, total_duration, coverage_result):
+        """Run mutants in worker pool, notifying views about results in order of mutants.
+
+        Mutations are reverted before views are notified, so views which need the mutant code capture it
+        when the mutant is submitted and the shared AST is passed to them later.
+        """
+        pending = collections.deque()
+        with pool.MutationWorkerPool(self.jobs, self.runner, total_duration, coverage_result, target_module,
+                                     self.mutant_schemata) as worker_pool:
+            for mutations, mutant_ast in mutants:
+                if not self.is_in_shard(target_module, mutations):
+                    continue
+                mutation_number = self.score.all_mutants + self.other_shards_mutants + len(pending) + 1
+                if self.mutation_number and self.mutation_number != mutation_number:
+                    self.score.inc_incompetent()
+                    continue
+                self.start_mutant(mutation_number)
+                cache_key, result = self.get_cached_result(mutation_number, target_module, mutations, mutant_ast)
+                equivalence_key, duplicate = None, False
+                if not result:
+                    mutant_id = self.get_schemata_mutant_id(mutations)
+                    function_patch, mutant_code, exception = self.prepare_mutant(target_module, mutations,
+                                                                                 mutant_ast, mutant_id)
+                    if exception:
+                        result = (pool.create_incompetent_result(exception), 0)
+                    else:
+                        equivalence_key, result = self.find_equivalent_result(mutant_code, function_patch)
+                        duplicate = not result and self.is_duplicate(equivalence_key)
+                if not result and not duplicate:
+                    worker_pool.submit(mutation_number, target_module.__name__, mutant_code, mutations,
+                                       function_patch.path if function_patch else None, mutant_id)
+                    if self.equivalence:
+                        self.equivalence.register(equivalence_key)
+                self.notify_capture_mutant(mutation_number, mutations, target_module, mutant_ast)
+                pending.append((mutation_number, mutations, mutant_ast, result, cache_key, equivalence_key, duplicate))
+                while len(pending) > 2 * self.jobs:
+                    self.notify_pool_result(target_module, worker_pool, *pending.popleft())
+            while pending:
+                self.notify_pool_result(target_module, worker_pool, *pending.popleft())
+
+    def notify_pool_result(self, target_module, worker_pool, mutation_number, mutations, mutant_ast, result,
+                           cache_key, equivalence_key, duplicate):
+        self.notify_mutation(mutation_number, mutations, target_module, mutant_ast)
+        if duplicate:
+            result = self.equivalence.get_result(equivalence_key)
+        elif not result:
+            result, duration, time_budget = worker_pool.get_result(mutation_number)
+            self.notify_time_budget(time_budget)
+            self.store_result(cache_key, result, duration)
+            self.store_equivalent_result(equivalence_key, result, duration)
+            result = (result, duration)
+        self.update_score_and_notify_views(*result)
+
+    def start_mutant(self, mutation_number):
+        if self.profiler:
+            self.profiler.start_mutant(mutation_number)
+
+    def is_in_shard(self, target_module, mutations):
+        if not self.shard or self.shard.is_selected(target_module.__name__, mutations):
+            return True
+        self.other_shards_mutants += 1
+        return False
+
+    def get_cached_result(self, mutation_number, target_module, mutations, mutant_ast):
+        if self.run_state:
+            result = self.run_state.get(mutation_number, target_module.__name__, mutations)
+            if result:
+                return None, result
+        if not self.result_cache:
+            return None, None
+        cache_key = self.result_cache.create_key(mutations, mutant_ast)
+        return cache_key, self.result_cache.get(cache_key)
+
+    def store_result(self, cache_key, result, duration):
+        if cache_key:
+            self.result_cache.set(cache_key, result, duration)
+
+    def create_equivalence(self, target_ast, target_module):
+        if not self.tce:
+            return None
+        return equivalence.TrivialCompilerEquivalence(target_ast, target_module.__name__)
+
+    def find_equivalent_result(self, mutant_code, function_patch):
+        if not self.equivalence:
+            return None, None
+        key = self.equivalence.create_key(mutant_code, function_patch)
+        if self.equivalence.is_equivalent(key, function_patch):
+            return key, (equivalence.EQUIVALENT, 0)
+        return key, self.equivalence.get_result(key)
+
+    def is_duplicate(self, key):
+        return bool(self.equivalence and self.equivalence.is_registered(key))
+
+    def store_equivalent_result(self, key, result, duration):
+        if self.equivalence:
+            self.equivalence.set_result(key, result, duration)
+
+    @utils.TimeRegister
+    def create_mutant_schemata(self, target_ast, target_module, to_mutate, coverage_injector, node_filter):
+        if not self.schemata:
+            return None
+        mutant_schemata = schemata.create_schemata(self.mutant_generator.operators, target_ast, target_module,
+                                                   to_mutate, coverage_injector, node_filter)
+        with self.stdout_manager:
+            if not mutant_schemata.create_module():
+                return None
+        return mutant_schemata
+
+    def get_schemata_mutant_id(self, mutations):
+        if not self.mutant_schemata:
+            return None
+        return self.mutant_schemata.get_mutant_id(mutations)
+
+    def create_node_filter(self, target_module):
+        if not self.changes:
+            return None
+        return self.changes.get_node_filter(target_module.__file__)
+
+    @utils.TimeRegister
+    def run_baseline_coverage(self, target_modules):
+        """Measure coverage of all target modules with one run of tests, before mutating them.
+
+        Covered nodes of each module are kept for the rest of the run, and stored in the results cache.
+        Modules without changed lines or with cached coverage are not measured.
+        """
+        self.baseline_coverage = {}
+        if not self.runner.requires_coverage():
+            return
+        targets = []
+        for target_module, _ in target_modules:
+            node_filter = self.create_node_filter(target_module)
+            if node_filter and not node_filter.changed_lines:
+                continue
+            target_ast = self.create_target_ast(target_module)
+            if not self.get_cached_coverage(target_module, target_ast):
+                targets.append((target_ast, target_module))
+        if not targets:
+            return
+        for (target_ast, target_module), (coverage_injector, coverage_result) in zip(
+                targets, self.runner.inject_modules_coverage(targets)):
+            self.baseline_coverage[target_module.__name__] = (coverage_injector.covered_nodes,
+                                                              coverage_result.test_covered_nodes)
+            self.store_coverage(target_module, target_ast, coverage_injector, coverage_result)
+
+    def get_cached_coverage(self, target_module, target_ast):
+        if not self.result_cache:
+            return None
+        return self.result_cache.get_coverage(self.result_cache.create_coverage_key(target_module, target_ast))
+
+    def store_coverage(self, target_module, target_ast, coverage_injector, coverage_result):
+        if self.result_cache:
+            self.result_cache.set_coverage(self.result_cache.create_coverage_key(target_module, target_ast),
+                                           coverage_injector.covered_nodes, coverage_result.test_covered_nodes)
 
     def inject_coverage(self, target_ast, target_module):
-        return self.runner.inject_coverage(target_ast, target_module)
+        if not self.runner.requires_coverage():
+            return None, None
+        measured_coverage = self.baseline_coverage.pop(target_module.__name__, None)
+        if not measured_coverage:
+            measured_coverage = self.get_cached_coverage(target_module, target_ast)
+        if measured_coverage:
+            return self.runner.restore_coverage(target_ast, *measured_coverage)
+        coverage_injector, coverage_result = self.runner.inject_coverage(target_ast, target_module)
+        self.store_coverage(target_module, target_ast, coverage_injector, coverage_result)
+        return coverage_injector, coverage_result
 
     @utils.TimeRegister
     def create_target_ast(self, target_module):
@@ -132,23 +488,50 @@ class MutationController(views.ViewNotifier):
             return utils.create_ast(target_file.read())
 
     @utils.TimeRegister
-    def create_mutant_module(self, target_module, mutant_ast):
+    def create_mutant_module(self, target_module, mutant_code):
         try:
             with self.stdout_manager:
-                return utils.create_module(
-                    ast_node=mutant_ast,
-                    module_name=target_module.__name__
-                )
+                return utils.create_module_from_code(mutant_code, module_name=target_module.__name__)
         except BaseException as exception:
             self.notify_incompetent(0, exception, tests_run=0)
             return None
 
-    def run_tests_with_mutant(self, total_duration, mutant_module, mutations, coverage_result):
-        result, duration = self.runner.run_tests_with_mutant(total_duration, mutant_module, mutations, coverage_result)
+    @utils.TimeRegister
+    def create_function_patch(self, target_module, mutations):
+        return patching.create_function_patch(target_module, mutations)
+
+    def prepare_mutant(self, target_module, mutations, mutant_ast, mutant_id=None):
+        """Return the function patch, the code and the compilation error of the mutant.
+
+        Mutants switched in the schemata module are compiled only if their code is needed to find
+        equivalent mutants.
+        """
+        if mutant_id and not self.equivalence:
+            return None, None, None
+        function_patch = self.create_function_patch(target_module, mutations)
+        if function_patch:
+            return function_patch, function_patch.code, None
+        return (None,) + self.compile_mutant(target_module, mutant_ast)
+
+    @utils.TimeRegister
+    def compile_mutant(self, target_module, mutant_ast):
+        try:
+            return compile(mutant_ast, target_module.__name__, 'exec'), None
+        except BaseException as exception:
+            return None, exception
+
+    def run_tests_with_mutant(self, total_duration, mutant_module, mutations, coverage_result, cache_key=None):
+        result, duration, time_budget = self.runner.run_tests_with_mutant(total_duration, mutant_module, mutations,
+                                                                          coverage_result)
+        self.notify_time_budget(time_budget)
+        self.store_result(cache_key, result, duration)
         self.update_score_and_notify_views(result, duration)
+        return result, duration
 
     def update_score_and_notify_views(self, result, mutant_duration):
-        if not result:
+        if result is equivalence.EQUIVALENT:
+            self.update_equivalent_mutant(mutant_duration)
+        elif not result:
             self.update_timeout_mutant(mutant_duration)
         elif result.is_incompetent:
             self.update_incompetent_mutant(result, mutant_duration)
@@ -173,6 +556,101 @@ class MutationController(views.ViewNotifier):
         self.notify_killed(duration, result.killer, result.exception_traceback, result.tests_run)
         self.score.inc_killed()
 
+    def update_equivalent_mutant(self, duration):
+        self.notify_equivalent(duration)
+        self.score.inc_equivalent()
+
+
+class JSONLReportReplay(views.ViewNotifier):
+    """Notifies views about mutants recorded in JSON Lines reports, e.g. to generate YAML or HTML reports.
+
+    Reports of several shards of one run are merged by mutants numbers.
+    """
+
+    def __init__(self, file_names, views):
+        super().__init__(views)
+        self.file_names = file_names
+        self.sources = {}
+        self.modules = {}
+        self.operators = {operator.name(): operator
+                          for operator in operators.standard_operators | operators.experimental_operators}
+
+    def run(self):
+        self.score = MutationScore()
+        mutation_records = {}
+        end_records = {}
+        for index, file_name in enumerate(self.file_names):
+            for record in views.read_jsonl_report(file_name):
+                if record['type'] == 'initialize' and index == 0:
+                    self.notify_initialize(record['targets'], record['tests'])
+                elif record['type'] == 'passed' and index == 0:
+                    tests = [(types.ModuleType(test['name']), test['target'], test['time'])
+                             for test in record['tests']]
+                    self.notify_passed(tests, record['number_of_tests'])
+                elif record['type'] == 'module':
+                    self.sources[record['name']] = record['source'].split('\n')
+                    self.get_module(record['name']).__file__ = record['file']
+                elif record['type'] == 'mutation':
+                    mutation_records.setdefault(record['number'], record)
+                elif record['type'] == 'end' and (index not in end_records or
+                                                  record['duration'] > end_records[index]['duration']):
+                    end_records[index] = record
+        for number in sorted(mutation_records):
+            self.replay_mutation(mutation_records[number])
+        self.restore_confidence_interval(list(end_records.values()))
+        end_record = max(end_records.values(), key=lambda record: record['duration'], default=None)
+        if end_record:
+            duration = end_record['duration']
+            self.score.update_coverage(end_record['covered_nodes'], end_record['all_nodes'])
+        else:
+            duration = sum(record.get('time') or 0 for record in mutation_records.values())
+        self.notify_end(self.score, duration)
+
+    def restore_confidence_interval(self, end_records):
+        """Restore the interval of an estimated score, computing it again for the merged score of shards."""
+        if not end_records or not all(record.get('confidence_interval') for record in end_records):
+            return
+        confidence = end_records[0]['confidence']
+        population = sum(record['population'] for record in end_records)
+        if len(end_records) == 1:
+            low, high = end_records[0]['confidence_interval']
+        elif all(low == high for low, high in (record['confidence_interval'] for record in end_records)):
+            low = high = self.score.count()
+        else:
+            low, high = sampling.ScoreEstimator(margin=0, confidence=confidence).get_interval(self.score)
+        self.score.set_confidence_interval(confidence, low, high, population)
+
+    def get_module(self, name):
+        if name not in self.modules:
+            self.modules[name] = types.ModuleType(name)
+        return self.modules[name]
+
+    def replay_mutation(self, record):
+        mutations = pool.deserialize_mutations([(self.operators[mutation['operator']], None, None, mutation['lineno'])
+                                                for mutation in record['mutations']])
+        if 'mutant_code' in record:
+            mutant_code = record['mutant_code']
+        else:
+            mutant_code = views.restore_mutant_code(self.sources[record['module']], record['mutant_diff'])
+        self.notify_mutation(record['number'], mutations, self.get_module(record['module']), ast.parse(mutant_code))
+        self.notify_time_budget(record['time_budget'])
+        status = record['status']
+        if status == 'killed':
+            self.notify_killed(record['time'], record['killer'], record['exception_traceback'], record['tests_run'])
+            self.score.inc_killed()
+        elif status == 'survived':
+            self.notify_survived(record['time'], record['tests_run'])
+            self.score.inc_survived()
+        elif status == 'incompetent':
+            self.notify_incompetent(record['time'], Exception(record['exception']), record['tests_run'])
+            self.score.inc_incompetent()
+        elif status == 'equivalent':
+            self.notify_equivalent(record['time'])
+            self.score.inc_equivalent()
+        else:
+            self.notify_timeout(record['time'])
+            self.score.inc_timeout()
+
 
 class HOMStrategy:
 
@@ -183,8 +661,8 @@ class HOMStrategy:
         for mutation_to_apply in mutations_to_apply:
             for available_mutation in available_mutations[:]:
                 if mutation_to_apply.node == available_mutation.node or \
-                        mutation_to_apply.node in available_mutation.node.children or \
-                        available_mutation.node in mutation_to_apply.node.children or \
+                        utils.is_descendant(mutation_to_apply.node, available_mutation.node) or \
+                        utils.is_descendant(available_mutation.node, mutation_to_apply.node) or \
                         (not allow_same_operators and mutation_to_apply.operator == available_mutation.operator):
                     available_mutations.remove(available_mutation)
 
@@ -287,49 +765,66 @@ class FirstOrderMutator:
         self.operators = operators
         self.sampler = utils.RandomSampler(percentage)
 
-    def mutate(self, target_ast, to_mutate=None, coverage_injector=None, module=None):
+    def mutate(self, target_ast, to_mutate=None, coverage_injector=None, module=None, node_filter=None):
+        site_index = operators.MutationSiteIndex(self.operators, target_ast, coverage_injector, node_filter)
         for op in utils.sort_operators(self.operators):
-            for mutation, mutant in op().mutate(target_ast, to_mutate, self.sampler, coverage_injector, module=module):
+            for mutation, mutant in op().mutate(target_ast, to_mutate, self.sampler, coverage_injector, module=module,
+                                                node_filter=node_filter, sites=site_index.get_sites(op)):
                 yield [mutation], mutant
 
+    def generate_mutations(self, target_ast, to_mutate=None, coverage_injector=None, module=None, node_filter=None):
+        """Return the sites index and mutations of each mutant, which can be applied later in any order."""
+        site_index = operators.MutationSiteIndex(self.operators, target_ast, coverage_injector, node_filter)
+        mutations = self.generate_all_mutations(coverage_injector, module, target_ast, to_mutate, node_filter,
+                                                site_index)
+        return site_index, [[mutation] for mutation in mutations]
 
-class HighOrderMutator(FirstOrderMutator):
-
-    def __init__(self, *args, hom_strategy=None, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.hom_strategy = hom_strategy or FirstToLastHOMStrategy(order=2)
-
-    def mutate(self, target_ast, to_mutate=None, coverage_injector=None, module=None):
-        mutations = self.generate_all_mutations(coverage_injector, module, target_ast, to_mutate)
-        for mutations_to_apply in self.hom_strategy.generate(mutations):
-            generators = []
-            applied_mutations = []
-            mutant = target_ast
-            for mutation in mutations_to_apply:
-                generator = mutation.operator().mutate(
-                    mutant,
-                    to_mutate=to_mutate,
-                    sampler=self.sampler,
-                    coverage_injector=coverage_injector,
-                    module=module,
-                    only_mutation=mutation,
-                )
-                try:
-                    new_mutation, mutant = generator.__next__()
-                except StopIteration:
-                    assert False, 'no mutations!'
-                applied_mutations.append(new_mutation)
-                generators.append(generator)
-            yield applied_mutations, mutant
-            self.finish_generators(generators)
-
-    def generate_all_mutations(self, coverage_injector, module, target_ast, to_mutate):
+    def generate_all_mutations(self, coverage_injector, module, target_ast, to_mutate, node_filter=None,
+                               site_index=None):
         mutations = []
+        if site_index is None:
+            site_index = operators.MutationSiteIndex(self.operators, target_ast, coverage_injector, node_filter)
         for op in utils.sort_operators(self.operators):
-            for mutation, _ in op().mutate(target_ast, to_mutate, None, coverage_injector, module=module):
+            for mutation, _ in op().mutate(target_ast, to_mutate, None, coverage_injector, module=module,
+                                           node_filter=node_filter, sites=site_index.get_sites(op)):
                 mutations.append(mutation)
         return mutations
 
+    def apply_mutations(self, target_ast, mutations_to_apply, site_index, to_mutate=None, coverage_injector=None,
+                        module=None, sampler=None):
+        generators = []
+        applied_mutations = []
+        applied_sites = []
+        mutant = target_ast
+        for mutation in mutations_to_apply:
+            site = site_index.get_site(mutation.node)
+            generator = mutation.operator().mutate(
+                mutant,
+                to_mutate=to_mutate,
+                sampler=sampler,
+                coverage_injector=coverage_injector,
+                module=module,
+                only_mutation=mutation,
+                sites=self.get_mutation_sites(site, applied_sites),
+            )
+            try:
+                new_mutation, mutant = generator.__next__()
+            except StopIteration:
+                assert False, 'no mutations!'
+            applied_mutations.append(new_mutation)
+            applied_sites.append(site)
+            generators.append(generator)
+        yield applied_mutations, mutant
+        self.finish_generators(generators)
+
+    @staticmethod
+    def get_mutation_sites(site, applied_sites):
+        """Return the site to apply a mutation directly, or None if the mutant AST has to be visited to find it."""
+        if site is None or any(applied_site is None or site.is_affected_by(applied_site)
+                               for applied_site in applied_sites):
+            return None
+        return [site]
+
     def finish_generators(self, generators):
         for generator in reversed(generators):
             try:
@@ -337,3 +832,24 @@ class HighOrderMutator(FirstOrderMutator):
             except StopIteration:
                 continue
             assert False, 'too many mutations!'
+
+
+class HighOrderMutator(FirstOrderMutator):
+
+    def __init__(self, *args, hom_strategy=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hom_strategy = hom_strategy or FirstToLastHOMStrategy(order=2)
+
+    def mutate(self, target_ast, to_mutate=None, coverage_injector=None, module=None, node_filter=None):
+        site_index = operators.MutationSiteIndex(self.operators, target_ast, coverage_injector, node_filter)
+        mutations = self.generate_all_mutations(coverage_injector, module, target_ast, to_mutate, node_filter,
+                                                site_index)
+        for mutations_to_apply in self.hom_strategy.generate(mutations):
+            yield from self.apply_mutations(target_ast, mutations_to_apply, site_index, to_mutate, coverage_injector,
+                                            module, self.sampler)
+
+    def generate_mutations(self, target_ast, to_mutate=None, coverage_injector=None, module=None, node_filter=None):
+        site_index = operators.MutationSiteIndex(self.operators, target_ast, coverage_injector, node_filter)
+        mutations = self.generate_all_mutations(coverage_injector, module, target_ast, to_mutate, node_filter,
+                                                site_index)
+        return site_index, list(self.hom_strategy.generate(mutations))
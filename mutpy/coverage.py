@@ -1,5 +1,6 @@
 import ast
 import copy
+import sys
 
 from mutpy import utils
 
@@ -48,15 +49,18 @@ class AbstractCoverageNodeTransformer(ast.NodeTransformer):
         return node
 
     def generate_coverage_node(self, node):
-        if hasattr(node, 'body'):
-            markers = self.get_markers_from_body_node(node)
-        else:
-            markers = self.get_included_markers(node)
+        markers = self.get_markers(node)
         coverage_node = utils.create_ast('{}.update({})'.format(COVERAGE_SET_NAME, repr(markers))).body[0]
         coverage_node.lineno = node.lineno
         coverage_node.col_offset = node.col_offset
+        coverage_node.end_lineno = node.lineno
         return coverage_node
 
+    def get_markers(self, node):
+        if hasattr(node, 'body'):
+            return self.get_markers_from_body_node(node)
+        return self.get_included_markers(node)
+
     def is_future_statement(self, node):
         return isinstance(node, ast.ImportFrom) and node.module == '__future__'
 
@@ -163,8 +167,291 @@ class CoverageInjector:
                 module_dict={COVERAGE_SET_NAME: self.covered_nodes},
             )
 
+    def restore(self, node, covered_nodes):
+        self.marker_transformer = MarkerNodeTransformer()
+        self.marker_transformer.visit(node)
+        self.covered_nodes = set(covered_nodes)
+
     def is_covered(self, child_node):
         return child_node.marker in self.covered_nodes
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
     def get_result(self):
         return len(self.covered_nodes), self.marker_transformer.last_marker
+
+
+SCOPE_NODES = (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def is_executed(node):
+    """Check if the statement is compiled to any instruction, so it generates a line event."""
+    if isinstance(node, (ast.Global, ast.Nonlocal)):
+        return False
+    return not (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and
+                getattr(node, 'parent', None) and utils.is_docstring(node.value))
+
+
+def get_event_line(node):
+    if isinstance(node, ast.ExceptHandler):
+        return node.body[0].lineno
+    return node.lineno
+
+
+def get_scope_key(node):
+    if isinstance(node, ast.Module):
+        return '<module>', None
+    return node.name, min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+
+
+def get_code_scope_key(code):
+    if code.co_name == '<module>':
+        return '<module>', None
+    return code.co_name, code.co_firstlineno
+
+
+def get_line_markers(node):
+    """Map scopes (module, classes and functions) to lines and markers which injected coverage would
+    mark as covered when the line is executed in the scope code.
+
+    Markers of statements without instructions (docstrings, global and nonlocal declarations) are added
+    to the line of the next statement in the same body.
+    """
+    transformer = CoverageNodeTransformer()
+    scope_markers = {}
+    for scope in ast.walk(node):
+        if isinstance(scope, SCOPE_NODES):
+            add_line_markers(transformer, scope, scope_markers.setdefault(get_scope_key(scope), {}))
+    return scope_markers
+
+
+def add_line_markers(transformer, node, line_markers):
+    coverable_nodes = tuple(transformer.get_coverable_nodes())
+    for _, statements in ast.iter_fields(node):
+        if not isinstance(statements, list):
+            continue
+        pending_markers = set()
+        for statement in statements:
+            if isinstance(statement, ast.AST) and not isinstance(statement, SCOPE_NODES):
+                add_line_markers(transformer, statement, line_markers)
+            if not isinstance(statement, coverable_nodes) or transformer.is_future_statement(statement):
+                continue
+            pending_markers |= transformer.get_markers(statement)
+            if is_executed(statement):
+                line_markers.setdefault(get_event_line(statement), set()).update(pending_markers)
+                pending_markers = set()
+        if pending_markers:
+            line_markers.setdefault(get_event_line(statement), set()).update(pending_markers)
+
+
+def get_code_objects(code):
+    code_objects = [code]
+    for const in code.co_consts:
+        if isinstance(const, type(code)):
+            code_objects += get_code_objects(const)
+    return code_objects
+
+
+class LineTracer:
+    """Collects markers of executed lines of registered code objects.
+
+    It uses PEP 669 sys.monitoring, which reports only events of the registered code objects, where
+    available and sys.settrace otherwise.
+    """
+    tool_id = 3
+
+    def __init__(self):
+        self.code_markers = {}
+        self.previous_trace = None
+        self.monitoring = getattr(sys, 'monitoring', None)
+
+    def add(self, code_markers, covered_nodes):
+        if not self.code_markers:
+            self.start()
+        for code, line_markers in code_markers:
+            self.code_markers[id(code)] = (line_markers, covered_nodes)
+            if self.monitoring:
+                self.monitoring.set_local_events(self.tool_id, code, self.monitoring.events.LINE)
+
+    def remove(self, code_markers):
+        for code, _ in code_markers:
+            del self.code_markers[id(code)]
+            if self.monitoring:
+                self.monitoring.set_local_events(self.tool_id, code, 0)
+        if not self.code_markers:
+            self.stop()
+
+    def start(self):
+        if self.monitoring:
+            self.monitoring.use_tool_id(self.tool_id, 'mutpy')
+            self.monitoring.register_callback(self.tool_id, self.monitoring.events.LINE, self.monitor_line)
+        else:
+            self.previous_trace = sys.gettrace()
+            sys.settrace(self.trace_call)
+
+    def stop(self):
+        if self.monitoring:
+            self.monitoring.register_callback(self.tool_id, self.monitoring.events.LINE, None)
+            self.monitoring.free_tool_id(self.tool_id)
+        else:
+            sys.settrace(self.previous_trace)
+
+    def monitor_line(self, code, line_number):
+        line_markers, covered_nodes = self.code_markers[id(code)]
+        markers = line_markers.get(line_number)
+        if markers:
+            covered_nodes.update(markers)
+
+    def trace_call(self, frame, event, arg):
+        if id(frame.f_code) in self.code_markers:
+            return self.trace_line
+        return None
+
+    def trace_line(self, frame, event, arg):
+        if event == 'line':
+            line_markers, covered_nodes = self.code_markers[id(frame.f_code)]
+            markers = line_markers.get(frame.f_lineno)
+            if markers:
+                covered_nodes.update(markers)
+        return self.trace_line
+
+
+line_tracer = LineTracer()
+
+
+class TracingCoverageInjector(CoverageInjector):
+    """Measures coverage of the original module code through line events instead of injected calls.
+
+    Markers covered by each line of each code object are computed once from the AST. Statements which
+    share a line in the same scope are covered together. Lines are traced only inside the with block and
+    while the module is created.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.code_markers = []
+
+    def inject(self, node, module_name='coverage'):
+        self.covered_nodes.clear()
+        self.marker_transformer = MarkerNodeTransformer()
+        marker_node = self.marker_transformer.visit(node)
+        scope_markers = get_line_markers(marker_node)
+        self.covered_nodes.add(marker_node.marker)
+        code = compile(marker_node, module_name, 'exec')
+        self.code_markers = []
+        for code_object in get_code_objects(code):
+            line_markers = scope_markers.get(get_code_scope_key(code_object))
+            if line_markers:
+                self.code_markers.append((code_object, line_markers))
+        with self, utils.StdoutManager():
+            return utils.create_module_from_code(code, module_name)
+
+    def __enter__(self):
+        line_tracer.add(self.code_markers, self.covered_nodes)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        line_tracer.remove(self.code_markers)
+
+
+COVERAGE_BACKENDS = {
+    'ast': CoverageInjector,
+    'trace': TracingCoverageInjector,
+}
+
+
+def to_bitset(markers):
+    """Encode markers (non-negative integers) as bits of an integer."""
+    if isinstance(markers, ModulesCoveredNodes):
+        return ModulesCoveredNodes([to_bitset(nodes) for nodes in markers.covered_nodes])
+    bits = bytearray((max(markers) >> 3) + 1 if markers else 0)
+    for marker in markers:
+        bits[marker >> 3] |= 1 << (marker & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def to_bytes(bitset):
+    return bitset.to_bytes((bitset.bit_length() + 7) >> 3, 'little')
+
+
+def iter_bitset(bitset):
+    for index, byte in enumerate(to_bytes(bitset)):
+        while byte:
+            lowest_bit = byte & -byte
+            yield (index << 3) + lowest_bit.bit_length() - 1
+            byte ^= lowest_bit
+
+
+class ModulesCoveredNodes:
+    """Covered nodes of several modules with set operations used to measure coverage of each test."""
+
+    def __init__(self, covered_nodes):
+        self.covered_nodes = covered_nodes
+
+    def copy(self):
+        return ModulesCoveredNodes([nodes.copy() for nodes in self.covered_nodes])
+
+    def clear(self):
+        for nodes in self.covered_nodes:
+            nodes.clear()
+
+    def update(self, other):
+        for nodes, other_nodes in zip(self.covered_nodes, other.covered_nodes):
+            nodes.update(other_nodes)
+
+    def __or__(self, other):
+        return ModulesCoveredNodes([nodes | other_nodes
+                                    for nodes, other_nodes in zip(self.covered_nodes, other.covered_nodes)])
+
+
+class ModulesCoverageInjector:
+    """Coverage injectors of several modules measured by one run of tests."""
+
+    def __init__(self, coverage_injectors):
+        self.coverage_injectors = coverage_injectors
+        self.covered_nodes = ModulesCoveredNodes([injector.covered_nodes for injector in coverage_injectors])
+
+    def __enter__(self):
+        for coverage_injector in self.coverage_injectors:
+            coverage_injector.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for coverage_injector in self.coverage_injectors:
+            coverage_injector.__exit__(exc_type, exc_val, exc_tb)
+
+    def split_result(self, test_covered_nodes):
+        """Return covered nodes of each test in each module."""
+        return [{test: nodes.covered_nodes[index] for test, nodes in test_covered_nodes.items()}
+                for index in range(len(self.coverage_injectors))]
+
+
+class TestsCoverageIndex:
+    """Per-test coverage stored as bitsets.
+
+    Each test has a bitset of covered nodes markers. Bitsets of tests which cover a marker are built
+    from them on first use, so tests covering a mutant are found with OR of a few integers.
+    """
+
+    def __init__(self, test_covered_nodes):
+        self.test_covered_nodes = test_covered_nodes
+        self.tests = list(test_covered_nodes)
+        self.tests_bytes = [to_bytes(test_covered_nodes[test_id]) for test_id in self.tests]
+        self.covering_tests = {}
+
+    def get_covering_tests(self, marker):
+        if marker not in self.covering_tests:
+            index, bit = marker >> 3, 1 << (marker & 7)
+            self.covering_tests[marker] = to_bitset([number for number, bits in enumerate(self.tests_bytes)
+                                                     if index < len(bits) and bits[index] & bit])
+        return self.covering_tests[marker]
+
+    def find_tests(self, markers):
+        tests = 0
+        for marker in markers:
+            tests |= self.get_covering_tests(marker)
+        return {self.tests[number] for number in iter_bitset(tests)}
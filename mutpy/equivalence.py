@@ -0,0 +1,72 @@
+import dis
+import hashlib
+import types
+
+
+class EquivalentResult:
+    """Result of mutants equivalent to the original program, pickled by reference to keep its identity."""
+
+    def __reduce__(self):
+        return 'EQUIVALENT'
+
+
+EQUIVALENT = EquivalentResult()
+
+
+def fingerprint_code(code):
+    """Hash of the instructions of the code object.
+
+    File name, line numbers and constants or names which are not used by any instruction (e.g. left
+    after removing dead code) are ignored.
+    """
+    digest = hashlib.sha1()
+    update_digest(digest, code)
+    return digest.hexdigest()
+
+
+def update_digest(digest, code):
+    digest.update(repr((code.co_name, code.co_varnames, code.co_freevars, code.co_cellvars, code.co_argcount,
+                        getattr(code, 'co_posonlyargcount', 0), code.co_kwonlyargcount, code.co_flags)).encode())
+    digest.update(getattr(code, 'co_exceptiontable', b''))
+    for instruction in dis.get_instructions(code):
+        if instruction.opcode in dis.hasconst and isinstance(instruction.argval, types.CodeType):
+            update_digest(digest, instruction.argval)
+        elif instruction.opcode in dis.hasconst:
+            digest.update(repr((instruction.opname, type(instruction.argval), instruction.argval)).encode())
+        else:
+            digest.update(repr((instruction.opname, instruction.argval)).encode())
+
+
+class TrivialCompilerEquivalence:
+    """Finds mutants compiled to the same code as the original module or as an earlier mutant.
+
+    Mutants which only swap a function code are compared with the original function. Mutants
+    compiled to the same code as an earlier mutant share its result.
+    """
+
+    def __init__(self, target_ast, module_name):
+        self.original_fingerprint = fingerprint_code(compile(target_ast, module_name, 'exec'))
+        self.results = {}
+
+    @staticmethod
+    def create_key(mutant_code, function_patch=None):
+        path = tuple(function_patch.path) if function_patch else None
+        return path, fingerprint_code(mutant_code)
+
+    def is_equivalent(self, key, function_patch=None):
+        _, fingerprint = key
+        if function_patch:
+            return fingerprint == fingerprint_code(function_patch.function.__code__)
+        return fingerprint == self.original_fingerprint
+
+    def register(self, key):
+        self.results.setdefault(key, None)
+
+    def is_registered(self, key):
+        return key in self.results
+
+    def get_result(self, key):
+        return self.results.get(key)
+
+    def set_result(self, key, result, duration):
+        self.results[key] = (result, duration)
@@ -5,6 +5,9 @@ import re
 from mutpy import utils
 
 
+VISITOR_NAME_PATTERN = re.compile(r'mutate_([A-Za-z0-9]+)($|(_\w+)+$)')
+
+
 class MutationResign(Exception):
     pass
 
@@ -16,55 +19,101 @@ class Mutation:
         self.visitor = visitor
 
 
+def deep_copy_node(node):
+    parent = getattr(node, 'parent', None)
+    return copy.deepcopy(node, memo={id(parent): parent})
+
+
+def shallow_copy_node(node):
+    copied_node = copy.copy(node)
+    for field, value in ast.iter_fields(node):
+        if isinstance(value, list):
+            setattr(copied_node, field, value[:])
+    return copied_node
+
+
 def copy_node(mutate):
+    """Pass to the visitor a copy of the node whose fields can be freely reassigned.
+
+    Only the node and its list fields are copied, children are shared with the original tree. Visitors
+    may change children only through MutationOperator.patch (or helpers built on it, e.g. shift_lines),
+    so their changes are reverted after the mutant is yielded.
+    """
     def f(self, node):
-        copied_node = copy.deepcopy(node, memo={
-            id(node.parent): node.parent,
-        })
-        return mutate(self, copied_node)
+        return mutate(self, shallow_copy_node(node))
 
     return f
 
 
 class MutationOperator:
-    def mutate(self, node, to_mutate=None, sampler=None, coverage_injector=None, module=None, only_mutation=None):
+    MISSING = object()
+
+    @classmethod
+    def get_visitors(cls):
+        """Return names of visitors methods of the operator by node type, found once per class."""
+        if '_visitors' not in cls.__dict__:
+            cls._visitors = {}
+            for attr in dir(cls):
+                match = VISITOR_NAME_PATTERN.match(attr)
+                if match:
+                    cls._visitors.setdefault(match.group(1), []).append(attr)
+        return cls._visitors
+
+    def mutate(self, node, to_mutate=None, sampler=None, coverage_injector=None, module=None, only_mutation=None,
+               node_filter=None, sites=None):
         self.to_mutate = to_mutate
         self.sampler = sampler
         self.only_mutation = only_mutation
         self.coverage_injector = coverage_injector
         self.module = module
-        for new_node in self.visit(node):
+        self.node_filter = node_filter
+        self.patches = []
+        new_nodes = self.visit(node) if sites is None else self.visit_sites(node, sites)
+        for new_node in new_nodes:
             yield Mutation(operator=self.__class__, node=self.current_node, visitor=self.visitor), new_node
 
     def visit(self, node):
         if self.has_notmutate(node) or (self.coverage_injector and not self.coverage_injector.is_covered(node)):
             return
-        if self.only_mutation and self.only_mutation.node != node and self.only_mutation.node not in node.children:
+        if self.node_filter and not self.node_filter.is_selected(node):
+            return
+        if self.only_mutation and self.only_mutation.node != node and \
+                not utils.is_descendant(self.only_mutation.node, node):
             return
         self.fix_lineno(node)
-        visitors = self.find_visitors(node)
-        if visitors:
-            for visitor in visitors:
-                try:
-                    if self.sampler and not self.sampler.is_mutation_time():
-                        raise MutationResign
-                    if self.only_mutation and \
-                            (self.only_mutation.node != node or self.only_mutation.visitor != visitor.__name__):
-                        raise MutationResign
-                    new_node = visitor(node)
-                    self.visitor = visitor.__name__
-                    self.current_node = node
-                    self.fix_node_internals(node, new_node)
-                    ast.fix_missing_locations(new_node)
-                    yield new_node
-                except MutationResign:
-                    pass
-                finally:
-                    for new_node in self.generic_visit(node):
-                        yield new_node
-        else:
-            for new_node in self.generic_visit(node):
+        for new_node in self.visit_node(node):
+            yield new_node
+        for new_node in self.generic_visit(node):
+            yield new_node
+
+    def visit_node(self, node):
+        for visitor in self.find_visitors(node):
+            try:
+                if self.sampler and not self.sampler.is_mutation_time():
+                    raise MutationResign
+                if self.only_mutation and \
+                        (self.only_mutation.node != node or self.only_mutation.visitor != visitor.__name__):
+                    raise MutationResign
+                new_node = visitor(node)
+                self.visitor = visitor.__name__
+                self.current_node = node
+                self.fix_node_internals(node, new_node)
+                ast.fix_missing_locations(new_node)
                 yield new_node
+            except MutationResign:
+                pass
+            finally:
+                self.revert_patches()
+
+    def visit_sites(self, node, sites):
+        for site in sites:
+            for new_node in self.visit_node(site.node):
+                if site.parent is None:
+                    yield new_node
+                else:
+                    site.replace(new_node)
+                    yield node
+                    site.restore()
 
     def generic_visit(self, node):
         for field, old_value in ast.iter_fields(node):
@@ -102,7 +151,8 @@ class MutationOperator:
             yield
             setattr(node, field, old_value)
 
-    def has_notmutate(self, node):
+    @staticmethod
+    def has_notmutate(node):
         try:
             for decorator in node.decorator_list:
                 if decorator.id == utils.notmutate.__name__:
@@ -111,13 +161,15 @@ class MutationOperator:
         except AttributeError:
             return False
 
-    def fix_lineno(self, node):
+    @staticmethod
+    def fix_lineno(node):
         if not hasattr(node, 'lineno') and getattr(node, 'parent', None) is not None and hasattr(node.parent, 'lineno'):
             node.lineno = node.parent.lineno
 
     def fix_node_internals(self, old_node, new_node):
         if not hasattr(new_node, 'parent'):
-            new_node.children = old_node.children
+            new_node.preorder = old_node.preorder
+            new_node.preorder_index = old_node.preorder_index
             new_node.parent = old_node.parent
         if not hasattr(new_node, 'lineno') and hasattr(old_node, 'lineno'):
             new_node.lineno = old_node.lineno
@@ -125,21 +177,32 @@ class MutationOperator:
             new_node.marker = old_node.marker
 
     def find_visitors(self, node):
-        method_prefix = 'mutate_' + node.__class__.__name__
-        return self.getattrs_like(method_prefix)
+        return [getattr(self, visitor) for visitor in self.get_visitors().get(node.__class__.__name__, ())]
+
+    def patch(self, node, attr, value):
+        self.patches.append((node, attr, getattr(node, attr, self.MISSING)))
+        setattr(node, attr, value)
 
-    def getattrs_like(ob, attr_like):
-        pattern = re.compile(attr_like + "($|(_\w+)+$)")
-        return [getattr(ob, attr) for attr in dir(ob) if pattern.match(attr)]
+    def revert_patches(self):
+        while self.patches:
+            node, attr, value = self.patches.pop()
+            if value is self.MISSING:
+                delattr(node, attr)
+            else:
+                setattr(node, attr, value)
 
     def set_lineno(self, node, lineno):
         for n in ast.walk(node):
             if hasattr(n, 'lineno'):
-                n.lineno = lineno
+                self.patch(n, 'lineno', lineno)
 
     def shift_lines(self, nodes, shift_by=1):
         for node in nodes:
-            ast.increment_lineno(node, shift_by)
+            for n in ast.walk(node):
+                if 'lineno' in n._attributes:
+                    self.patch(n, 'lineno', getattr(n, 'lineno', 0) + shift_by)
+                if 'end_lineno' in n._attributes and getattr(n, 'end_lineno', None) is not None:
+                    self.patch(n, 'end_lineno', n.end_lineno + shift_by)
 
     @classmethod
     def name(cls):
@@ -150,6 +213,102 @@ class MutationOperator:
         return ' '.join(map(str.lower, (re.split('([A-Z][a-z]*)', cls.__name__)[1::2])))
 
 
+class MutationSite:
+
+    def __init__(self, node, parent=None, field=None, position=None):
+        self.node = node
+        self.parent = parent
+        self.field = field
+        self.position = position
+        self.old_values = None
+
+    def replace(self, new_node):
+        if self.position is None:
+            if new_node is None:
+                delattr(self.parent, self.field)
+            else:
+                setattr(self.parent, self.field, new_node)
+            return
+        values = getattr(self.parent, self.field)
+        self.old_values = values[:]
+        if isinstance(new_node, ast.AST):
+            values[self.position] = new_node
+        else:
+            values[self.position:self.position + 1] = new_node
+
+    def restore(self):
+        if self.position is None:
+            setattr(self.parent, self.field, self.node)
+        else:
+            getattr(self.parent, self.field)[:] = self.old_values
+
+    def is_affected_by(self, other):
+        """Check if replacing the node of other site may move or copy the node of this site."""
+        if other.position is not None and other.parent is self.parent and other.field == self.field:
+            return True
+        node = self.node
+        while node is not None:
+            if node is other.node:
+                return True
+            node = getattr(node, 'parent', None)
+        return False
+
+
+class MutationSiteIndex:
+    """Nodes which can be mutated by given operators, found in a single walk over the AST.
+
+    Nodes are walked in the same order and skipped by the same rules as in MutationOperator.visit, so
+    mutating sites of an operator gives the same mutants as visiting the whole AST.
+    """
+
+    def __init__(self, operators, node, coverage_injector=None, node_filter=None):
+        self.coverage_injector = coverage_injector
+        self.node_filter = node_filter
+        self.operators_by_node_type = {}
+        for operator in operators:
+            for node_type in operator.get_visitors():
+                self.operators_by_node_type.setdefault(node_type, []).append(operator)
+        self.sites = {operator: [] for operator in operators}
+        self.nodes_sites = {}
+        self.walk(node)
+
+    def walk(self, node):
+        stack = [MutationSite(node)]
+        while stack:
+            site = stack.pop()
+            if self.is_skipped(site.node):
+                continue
+            MutationOperator.fix_lineno(site.node)
+            self.nodes_sites[site.node] = site
+            for operator in self.operators_by_node_type.get(site.node.__class__.__name__, ()):
+                self.sites[operator].append(site)
+            stack.extend(reversed(self.get_child_sites(site.node)))
+
+    def is_skipped(self, node):
+        if MutationOperator.has_notmutate(node):
+            return True
+        if self.coverage_injector and not self.coverage_injector.is_covered(node):
+            return True
+        return bool(self.node_filter and not self.node_filter.is_selected(node))
+
+    @staticmethod
+    def get_child_sites(node):
+        sites = []
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, list):
+                sites += [MutationSite(child, node, field, position) for position, child in enumerate(value)
+                          if isinstance(child, ast.AST)]
+            elif isinstance(value, ast.AST):
+                sites.append(MutationSite(value, node, field))
+        return sites
+
+    def get_sites(self, operator):
+        return self.sites[operator]
+
+    def get_site(self, node):
+        return self.nodes_sites.get(node)
+
+
 class AbstractUnaryOperatorDeletion(MutationOperator):
     def mutate_UnaryOp(self, node):
         if isinstance(node.op, self.get_operator_type()):
@@ -2,7 +2,7 @@ import ast
 import functools
 
 from mutpy import utils
-from mutpy.operators.base import MutationResign, MutationOperator, copy_node
+from mutpy.operators.base import MutationResign, MutationOperator, copy_node, deep_copy_node
 
 
 class AbstractOverriddenElementModification(MutationOperator):
@@ -55,12 +55,12 @@ class HidingVariableDeletion(AbstractOverriddenElementModification):
         if not new_targets:
             return ast.Pass()
         elif len(new_targets) == 1:
-            node.targets = new_targets
-            node.value = new_values[0]
+            self.patch(node, 'targets', new_targets)
+            self.patch(node, 'value', new_values[0])
             return node
         else:
-            target.elts = new_targets
-            value.elts = new_values
+            self.patch(target, 'elts', new_targets)
+            self.patch(value, 'elts', new_values)
             return node
 
     @classmethod
@@ -155,15 +155,14 @@ class SuperCallingInsertPython27(AbstractSuperCallingModification, AbstractOverr
         self.shift_lines(node.body[1:], 1)
         return node
 
-    @copy_node
     def create_super_call(self, node):
         super_call = utils.create_ast('super().{}()'.format(node.name)).body[0]
         for arg in node.args.args[1:-len(node.args.defaults) or None]:
             super_call.value.args.append(ast.Name(id=arg.arg, ctx=ast.Load()))
         for arg, default in zip(node.args.args[-len(node.args.defaults):], node.args.defaults):
-            super_call.value.keywords.append(ast.keyword(arg=arg.arg, value=default))
+            super_call.value.keywords.append(ast.keyword(arg=arg.arg, value=deep_copy_node(default)))
         for arg, default in zip(node.args.kwonlyargs, node.args.kw_defaults):
-            super_call.value.keywords.append(ast.keyword(arg=arg.arg, value=default))
+            super_call.value.keywords.append(ast.keyword(arg=arg.arg, value=deep_copy_node(default)))
         if node.args.vararg:
             self.add_vararg_to_super_call(super_call, node.args.vararg)
         if node.args.kwarg:
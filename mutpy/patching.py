@@ -0,0 +1,129 @@
+import ast
+import copy
+import types
+
+from mutpy import utils
+
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+def get_ancestors(node):
+    ancestors = []
+    while node is not None:
+        ancestors.append(node)
+        node = getattr(node, 'parent', None)
+    return ancestors[::-1]
+
+
+def find_function_scope(node):
+    """Return the classes and the module level function (or method) whose body contains the node.
+
+    Returns None if the node is not placed inside a body of such function, e.g. it is a module level
+    statement, a decorator or a default value of an argument.
+    """
+    ancestors = get_ancestors(node)
+    if not isinstance(ancestors[0], ast.Module):
+        return None
+    for index in range(1, len(ancestors) - 1):
+        scope_node = ancestors[index]
+        if isinstance(scope_node, FUNCTION_NODES):
+            child = ancestors[index + 1]
+            if child is scope_node.args or child is scope_node.returns or \
+                    any(child is decorator for decorator in scope_node.decorator_list):
+                return None
+            return ancestors[1:index + 1]
+        elif not isinstance(scope_node, ast.ClassDef):
+            return None
+    return None
+
+
+def find_code(code, name):
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType) and const.co_name == name:
+            return const
+    return None
+
+
+def compile_function(module_node, scope, filename):
+    node = scope[-1]
+    for class_node in reversed(scope[:-1]):
+        class_node = copy.copy(class_node)
+        class_node.bases = []
+        class_node.keywords = []
+        class_node.decorator_list = []
+        class_node.body = [node]
+        node = class_node
+    future_imports = [statement for statement in module_node.body
+                      if isinstance(statement, ast.ImportFrom) and statement.module == '__future__']
+    code = compile(utils.create_module_ast(future_imports + [node]), filename, 'exec')
+    for scope_node in scope:
+        code = find_code(code, scope_node.name)
+        if code is None:
+            return None
+    return code
+
+
+def find_function(module, path):
+    namespace = module
+    for name in path[:-1]:
+        namespace = vars(namespace).get(name)
+        if not isinstance(namespace, type):
+            return None
+    function = vars(namespace).get(path[-1])
+    function = getattr(function, '__func__', function)
+    if isinstance(function, types.FunctionType):
+        return function
+    return None
+
+
+def is_compatible(function, code):
+    return (function.__code__.co_name == code.co_name and
+            function.__code__.co_firstlineno == code.co_firstlineno and
+            function.__code__.co_freevars == code.co_freevars)
+
+
+class FunctionPatch:
+    """Mutant which differs from the original module only by the code of a single function.
+
+    Instead of executing the whole mutated module, the code of the original function object is swapped
+    for the time of running tests and tests get a copy of the original module namespace, so module
+    level statements are not executed again.
+    """
+
+    def __init__(self, module, path, code):
+        self.module = module
+        self.path = path
+        self.code = code
+        self.function = find_function(module, path)
+        self.original_code = None
+
+    def create_module(self):
+        mutant_module = types.ModuleType(self.module.__name__)
+        mutant_module.__dict__.update(self.module.__dict__)
+        return mutant_module
+
+    def __enter__(self):
+        self.original_code = self.function.__code__
+        self.function.__code__ = self.code
+        return self.create_module()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.function.__code__ = self.original_code
+
+
+def create_function_patch(module, mutations):
+    scopes = [find_function_scope(mutation.node) for mutation in mutations]
+    if not scopes or None in scopes or any(scope[-1] is not scopes[0][-1] for scope in scopes):
+        return None
+    scope = scopes[0]
+    path = [node.name for node in scope]
+    function = find_function(module, path)
+    if function is None:
+        return None
+    try:
+        code = compile_function(scope[0].parent, scope, module.__name__)
+    except Exception:
+        return None
+    if code is None or not is_compatible(function, code):
+        return None
+    return FunctionPatch(module, path, code)
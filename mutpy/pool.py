@@ -0,0 +1,195 @@
+import ast
+import marshal
+import multiprocessing
+from queue import Empty
+
+from mutpy import utils, patching
+from mutpy.operators import Mutation
+from mutpy.test_runners.base import SerializableMutationTestResult
+
+
+def fork_available():
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def serialize_mutations(mutations):
+    return [(mutation.operator, mutation.visitor, getattr(mutation.node, 'marker', None),
+             getattr(mutation.node, 'lineno', None)) for mutation in mutations]
+
+
+def deserialize_mutations(serialized_mutations):
+    mutations = []
+    for operator, visitor, marker, lineno in serialized_mutations:
+        node = ast.AST()
+        if marker is not None:
+            node.marker = marker
+        if lineno is not None:
+            node.lineno = lineno
+        mutations.append(Mutation(operator=operator, node=node, visitor=visitor))
+    return mutations
+
+
+def create_incompetent_result(exception):
+    return SerializableMutationTestResult(
+        is_incompetent=True,
+        is_survived=False,
+        killer=None,
+        exception_traceback=None,
+        exception=exception,
+        tests_run=0,
+    )
+
+
+class MutationWorker:
+
+    def __init__(self, context, runner, total_duration, coverage_result, results, target_module=None,
+                 mutant_schemata=None):
+        self.runner = runner
+        self.target_module = target_module
+        self.mutant_schemata = mutant_schemata
+        self.total_duration = total_duration
+        self.coverage_result = coverage_result
+        self.results = results
+        self.tasks = context.Queue()
+        self.process = context.Process(target=self.work)
+        self.process.start()
+
+    def send(self, task):
+        self.tasks.put(task)
+
+    def stop(self):
+        self.tasks.put(None)
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def work(self):
+        try:
+            while True:
+                task = self.tasks.get()
+                if task is None:
+                    break
+                number, module_name, mutant_code, serialized_mutations, function_path, mutant_id = task
+                profiler = utils.TimeRegister.profiler
+                if profiler:
+                    profiler.record(number)
+                timer = utils.Timer()
+                result, duration, time_budget = self.run_mutant(module_name, mutant_code, serialized_mutations,
+                                                                function_path, mutant_id)
+                if result:
+                    result = utils.make_picklable_result(result)
+                profile = (profiler.pop_phases(number), timer.stop()) if profiler else None
+                self.results.put((number, result, duration, time_budget, profile))
+        except KeyboardInterrupt:
+            pass
+
+    def run_mutant(self, module_name, mutant_code, serialized_mutations, function_path=None, mutant_id=None):
+        mutations = deserialize_mutations(serialized_mutations)
+        if mutant_id:
+            with self.mutant_schemata.activate(mutant_id) as mutant_module:
+                return self.runner.run_tests_with_mutant(self.total_duration, mutant_module, mutations,
+                                                         self.coverage_result)
+        if function_path:
+            function_patch = patching.FunctionPatch(self.target_module, function_path, marshal.loads(mutant_code))
+            with function_patch as mutant_module:
+                return self.runner.run_tests_with_mutant(self.total_duration, mutant_module, mutations,
+                                                         self.coverage_result)
+        try:
+            with self.runner.stdout_manager:
+                mutant_module = utils.create_module_from_code(
+                    code=marshal.loads(mutant_code),
+                    module_name=module_name,
+                )
+        except BaseException as exception:
+            return create_incompetent_result(exception), 0, None
+        return self.runner.run_tests_with_mutant(self.total_duration, mutant_module, mutations, self.coverage_result)
+
+
+class MutationWorkerPool:
+    """Long-lived forked processes which run tests with mutants sent by the controller.
+
+    Workers are forked after the target module and its coverage were prepared, so they share the
+    runner state with the controller and only the compiled mutant code (or the id of a mutant switched
+    in the schemata module) has to be sent to them.
+    """
+    worker_check_interval = 1
+
+    def __init__(self, jobs, runner, total_duration, coverage_result=None, target_module=None, mutant_schemata=None):
+        self.jobs = jobs
+        self.target_module = target_module
+        self.mutant_schemata = mutant_schemata
+        self.runner = runner
+        self.total_duration = total_duration
+        self.coverage_result = coverage_result
+        self.context = multiprocessing.get_context('fork')
+        self.results = self.context.Queue()
+        self.finished = {}
+        self.assigned = {}
+        self.submitted = {}
+        self.workers = []
+
+    def __enter__(self):
+        self.workers = [self.create_worker() for _ in range(self.jobs)]
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            for worker in self.workers:
+                worker.stop()
+            for worker in self.workers:
+                worker.process.join()
+        else:
+            for worker in self.workers:
+                worker.process.terminate()
+
+    def create_worker(self):
+        return MutationWorker(self.context, self.runner, self.total_duration, self.coverage_result, self.results,
+                              self.target_module, self.mutant_schemata)
+
+    def submit(self, number, module_name, mutant_code, mutations, function_path=None, mutant_id=None):
+        worker = self.get_idle_worker()
+        self.assigned[worker] = number
+        self.submitted[number] = utils.Timer()
+        worker.send((number, module_name, marshal.dumps(mutant_code), serialize_mutations(mutations), function_path,
+                     mutant_id))
+
+    def get_result(self, number):
+        while number not in self.finished:
+            self.collect()
+        return self.finished.pop(number)
+
+    def get_idle_worker(self):
+        while True:
+            for worker in self.workers:
+                if worker not in self.assigned:
+                    return worker
+            self.collect()
+
+    def collect(self):
+        try:
+            number, result, duration, time_budget, profile = self.results.get(timeout=self.worker_check_interval)
+        except Empty:
+            self.replace_dead_workers()
+            return
+        self.finished[number] = (result, duration, time_budget)
+        self.add_worker_profile(number, profile)
+        for worker, assigned_number in list(self.assigned.items()):
+            if assigned_number == number:
+                del self.assigned[worker]
+
+    def add_worker_profile(self, number, profile):
+        """Add times measured by the worker and the rest of the time since submitting the mutant as IPC."""
+        submit_timer = self.submitted.pop(number, None)
+        if profile and submit_timer:
+            phases, worker_duration = profile
+            utils.TimeRegister.profiler.add_worker_phases(number, phases,
+                                                          max(0, submit_timer.stop() - worker_duration))
+
+    def replace_dead_workers(self):
+        for index, worker in enumerate(self.workers):
+            if not worker.is_alive():
+                number = self.assigned.pop(worker, None)
+                if number is not None:
+                    self.finished[number] = (None, 0, None)
+                    self.submitted.pop(number, None)
+                self.workers[index] = self.create_worker()
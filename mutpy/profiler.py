@@ -0,0 +1,146 @@
+import cProfile
+import heapq
+import json
+import os
+import time
+
+from mutpy import utils
+
+GENERATION = 'generation'
+COMPILATION = 'compilation'
+SUITE = 'suite'
+TESTS = 'tests'
+IPC = 'ipc'
+
+PHASES = {
+    'create_function_patch': COMPILATION,
+    'compile_mutant': COMPILATION,
+    'create_mutant_module': COMPILATION,
+    'create_test_suite': SUITE,
+    'run_mutation_test_runner': TESTS,
+}
+
+
+def add_phase_time(phases, phase, wall, cpu):
+    phase_time = phases.setdefault(phase, {'wall': 0, 'cpu': 0})
+    phase_time['wall'] += wall
+    if cpu is None or phase_time['cpu'] is None:
+        phase_time['cpu'] = None
+    else:
+        phase_time['cpu'] += cpu
+
+
+class MutantsProfiler:
+    """Records wall and CPU time of the phases of processing each mutant.
+
+    Times of generation, compilation, test suite construction, test run and (with --jobs) communication
+    with workers are written as a JSON Lines record per mutant when its result is known. CPU time is
+    measured in the process which handles the phase, so tests executed in a forked process count only
+    as wall time. With dumps, cProfile stats of the slowest mutants are saved next to the profile file.
+    """
+
+    def __init__(self, file_name, dumps=0):
+        self.file_name = file_name
+        self.dumps = dumps
+        self.profile_file = None
+        self.mutants = {}
+        self.current_number = None
+        self.reported_number = None
+        self.generation = (0, 0)
+        self.profile = None
+        self.slowest = []
+
+    def generate(self, mutants):
+        """Yield mutants and measure the time of generating them."""
+        iterator = iter(mutants)
+        while True:
+            wall, cpu = time.time(), time.process_time()
+            try:
+                mutant = next(iterator)
+            except StopIteration:
+                return
+            self.generation = (self.generation[0] + time.time() - wall,
+                               self.generation[1] + time.process_time() - cpu)
+            yield mutant
+
+    def record(self, number):
+        """Assign times of the next phases to the mutant."""
+        self.current_number = number
+        self.mutants[number] = {'timer': utils.Timer(), 'phases': {}, 'profile': None}
+
+    def start_mutant(self, number):
+        self.record(number)
+        add_phase_time(self.mutants[number]['phases'], GENERATION, *self.generation)
+        self.generation = (0, 0)
+        if self.dumps and self.profile is None:
+            self.profile = self.mutants[number]['profile'] = cProfile.Profile()
+            self.profile.enable()
+
+    def add_time(self, method_name, wall, cpu):
+        if method_name in PHASES and self.current_number in self.mutants:
+            add_phase_time(self.mutants[self.current_number]['phases'], PHASES[method_name], wall, cpu)
+
+    def pop_phases(self, number):
+        self.current_number = None
+        return self.mutants.pop(number)['phases']
+
+    def add_worker_phases(self, number, phases, ipc):
+        if number not in self.mutants:
+            return
+        for phase, phase_time in phases.items():
+            add_phase_time(self.mutants[number]['phases'], phase, phase_time['wall'], phase_time['cpu'])
+        add_phase_time(self.mutants[number]['phases'], IPC, ipc, None)
+
+    def get_dump_file_name(self, number):
+        return '{}-mutant-{}.pstats'.format(os.path.splitext(self.file_name)[0], number)
+
+    def initialize(self, targets, tests):
+        self.profile_file = open(self.file_name, 'w')
+
+    def mutation(self, number, mutations, module, mutant):
+        self.reported_number = number
+        if number in self.mutants:
+            self.mutants[number].update(module=module.__name__,
+                                        operators=[mutation.operator.name() for mutation in mutations])
+
+    def finish(self, status):
+        mutant = self.mutants.pop(self.reported_number, None)
+        if mutant is None or 'module' not in mutant:
+            return
+        wall = mutant['timer'].stop()
+        if mutant['profile']:
+            mutant['profile'].disable()
+            self.profile = None
+            heapq.heappush(self.slowest, (wall, self.reported_number, mutant['profile']))
+            if len(self.slowest) > self.dumps:
+                heapq.heappop(self.slowest)
+        record = {
+            'number': self.reported_number,
+            'module': mutant['module'],
+            'operators': mutant['operators'],
+            'status': status,
+            'wall': wall,
+            'phases': mutant['phases'],
+        }
+        self.profile_file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.profile_file.flush()
+
+    def killed(self, time, killer, exception_traceback, tests_run):
+        self.finish('killed')
+
+    def survived(self, time, tests_run):
+        self.finish('survived')
+
+    def incompetent(self, time, exception, tests_run):
+        self.finish('incompetent')
+
+    def timeout(self, time):
+        self.finish('timeout')
+
+    def equivalent(self, time):
+        self.finish('equivalent')
+
+    def end(self, score, duration):
+        for _, number, profile in self.slowest:
+            profile.dump_stats(self.get_dump_file_name(number))
+        self.profile_file.close()
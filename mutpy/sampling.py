@@ -0,0 +1,70 @@
+import heapq
+import math
+import random
+
+
+def wilson_interval(successes, trials, z):
+    """Return Wilson score interval (in percent) of a proportion."""
+    if not trials:
+        return 0, 100
+    proportion = successes / trials
+    denominator = 1 + z ** 2 / trials
+    center = (proportion + z ** 2 / (2 * trials)) / denominator
+    margin = z * math.sqrt(proportion * (1 - proportion) / trials + z ** 2 / (4 * trials ** 2)) / denominator
+    return 100 * max(0, center - margin), 100 * min(1, center + margin)
+
+
+def get_z_score(confidence):
+    """Return the quantile of the standard normal distribution for a two-sided confidence level (in percent)."""
+    low, high = 0, 10
+    for _ in range(64):
+        middle = (low + high) / 2
+        if math.erf(middle / math.sqrt(2)) < confidence / 100:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def stratified_order(strata, seed=None):
+    """Yield items of all strata in random order, the same for the same seed.
+
+    Items of each stratum are shuffled and the next item is taken from the stratum which has the smallest
+    part of its items drawn, so every prefix of the order holds strata in proportion to their sizes.
+    """
+    generator = random.Random(seed)
+    queue = []
+    for index, items in enumerate(strata):
+        if items:
+            queue.append((0.5 / len(items), generator.random(), index, generator.sample(items, len(items)), 0))
+    heapq.heapify(queue)
+    while queue:
+        _, _, index, items, drawn = heapq.heappop(queue)
+        yield items[drawn]
+        drawn += 1
+        if drawn < len(items):
+            heapq.heappush(queue, ((drawn + 0.5) / len(items), generator.random(), index, items, drawn))
+
+
+class ScoreEstimator:
+    """Estimates mutation score from mutants run in random order.
+
+    After each result the Wilson confidence interval of the score is updated, and mutation stops as soon
+    as the interval is not wider than the score plus or minus the margin (in percentage points). Without
+    a seed, the order of mutants is seeded by the run fingerprint, so it is the same for the same sources
+    and options.
+    """
+
+    def __init__(self, margin, confidence=95, seed=None):
+        self.margin = margin
+        self.confidence = confidence
+        self.seed = seed
+        self.z = get_z_score(confidence)
+
+    def get_interval(self, score):
+        bottom = score.all_mutants - score.incompetent_mutants - score.equivalent_mutants
+        return wilson_interval(score.killed_mutants + score.timeout_mutants, bottom, self.z)
+
+    def is_precise(self, score):
+        low, high = self.get_interval(score)
+        return high - low <= 2 * self.margin
@@ -0,0 +1,223 @@
+import ast
+import sys
+import types
+
+from mutpy import utils, patching, operators
+
+ACTIVE_MUTANT_NAME = '__mutpy_active__'
+NO_ACTIVE_MUTANT = 0
+PATTERN_NODES = getattr(ast, 'pattern', ())
+FORMATTED_VALUE_NODES = getattr(ast, 'FormattedValue', ())
+JOINED_STR_NODES = getattr(ast, 'JoinedStr', ())
+
+if sys.version_info >= (3, 8):
+    STRING_NODES = (ast.Constant,)
+
+    def create_number(value):
+        return ast.Constant(value=value)
+else:
+    STRING_NODES = (ast.Str,)
+
+    def create_number(value):
+        return ast.Num(n=value)
+
+
+def copy_tree(node, transform=None):
+    """Copy AST fields and locations of the node, without helper attributes (e.g. parent and preorder).
+
+    The transform is called with each original node and its copy and returns the node to put in the
+    copied tree.
+    """
+    if isinstance(node, list):
+        return [copy_tree(child, transform) for child in node]
+    if not isinstance(node, ast.AST):
+        return node
+    new_node = node.__class__()
+    for field, value in ast.iter_fields(node):
+        setattr(new_node, field, copy_tree(value, transform))
+    for attr in node._attributes:
+        if hasattr(node, attr):
+            setattr(new_node, attr, getattr(node, attr))
+    return transform(node, new_node) if transform else new_node
+
+
+def is_switchable_expression(node):
+    if not isinstance(node, ast.expr) or isinstance(node, (ast.Slice, ast.Starred, FORMATTED_VALUE_NODES)):
+        return False
+    if not isinstance(getattr(node, 'ctx', ast.Load()), ast.Load):
+        return False
+    if isinstance(node, ast.Tuple) and any(isinstance(element, ast.Slice) for element in node.elts):
+        return False
+    return not isinstance(node.parent, (JOINED_STR_NODES, FORMATTED_VALUE_NODES, PATTERN_NODES))
+
+
+def is_docstring(node):
+    if isinstance(node, ast.Expr):
+        node = node.value
+    return isinstance(node, STRING_NODES) and isinstance(node.parent, ast.Expr) and utils.is_docstring(node)
+
+
+def find_switch_node(node, new_node):
+    """Return the nearest expression or statement which can be switched between its original and mutated version."""
+    if isinstance(node, ast.stmt) or (is_switchable_expression(node) and isinstance(new_node, ast.expr)):
+        return node
+    node = node.parent
+    while not isinstance(node, ast.stmt) and not is_switchable_expression(node):
+        node = node.parent
+    return node
+
+
+def get_mutated_value(site):
+    if site.position is None:
+        return getattr(site.parent, site.field, None)
+    values = getattr(site.parent, site.field)
+    if len(values) == len(site.old_values):
+        return values[site.position]
+    return values[site.position:site.position + len(values) - len(site.old_values) + 1]
+
+
+def create_active_mutant_test(mutant_id, location_node):
+    test = ast.Compare(
+        left=ast.Name(id=ACTIVE_MUTANT_NAME, ctx=ast.Load()),
+        ops=[ast.Eq()],
+        comparators=[create_number(mutant_id)],
+    )
+    for node in ast.walk(test):
+        ast.copy_location(node, location_node)
+    return test
+
+
+class MutantSchemata:
+    """First order mutants of a module compiled into one meta-module and switched at runtime.
+
+    Every mutated expression (or statement, if the expression can't be replaced, e.g. it is an assignment
+    target) is wrapped in conditionals on the global active mutant id, so the meta-module is compiled and
+    imported once and a mutant is run by setting its id. Only mutants inside functions bodies are
+    switched, because module level code is executed just once, when the meta-module is imported.
+    """
+
+    def __init__(self, target_ast, module_name):
+        self.target_ast = target_ast
+        self.module_name = module_name
+        self.mutant_ids = {}
+        self.switches = {}
+        self.functions = {}
+        self.module = None
+
+    @staticmethod
+    def create_key(mutation):
+        return mutation.operator, mutation.node, mutation.visitor
+
+    def add_mutant(self, mutation, site):
+        """Register the mutant of the site which is currently applied to the target AST."""
+        scope = patching.find_function_scope(site.node) if site and site.parent else None
+        if scope is None:
+            return None
+        mutated_value = get_mutated_value(site)
+        switch_node = find_switch_node(site.node, mutated_value)
+        if is_docstring(switch_node):
+            return None
+        if switch_node is not site.node:
+            mutated_value = switch_node
+        mutated_value = copy_tree(mutated_value)
+        if isinstance(switch_node, ast.stmt):
+            if isinstance(mutated_value, ast.AST):
+                mutated_value = [mutated_value]
+            mutated_value = mutated_value or [ast.copy_location(ast.Pass(), site.node)]
+        mutant_id = len(self.mutant_ids) + 1
+        self.mutant_ids[self.create_key(mutation)] = mutant_id
+        self.switches.setdefault(switch_node, []).append((mutant_id, mutated_value))
+        self.functions.setdefault(scope[-1], []).append(mutant_id)
+        return mutant_id
+
+    def get_mutant_id(self, mutations):
+        if len(mutations) != 1:
+            return None
+        return self.mutant_ids.get(self.create_key(mutations[0]))
+
+    def create_ast(self, node=None, mutant_ids=None):
+        def switch(original_node, new_node):
+            for mutant_id, mutated_value in reversed(self.switches.get(original_node, ())):
+                if mutant_ids is not None and mutant_id not in mutant_ids:
+                    continue
+                test = create_active_mutant_test(mutant_id, original_node)
+                if isinstance(new_node, ast.stmt):
+                    new_node = ast.If(test=test, body=copy_tree(mutated_value), orelse=[new_node])
+                else:
+                    new_node = ast.IfExp(test=test, body=copy_tree(mutated_value), orelse=new_node)
+                ast.copy_location(new_node, original_node)
+            return new_node
+
+        return copy_tree(node or self.target_ast, switch)
+
+    def compile(self):
+        try:
+            return compile(self.create_ast(), self.module_name, 'exec')
+        except Exception:
+            self.remove_invalid_mutants()
+        return compile(self.create_ast(), self.module_name, 'exec')
+
+    def is_valid(self, function_node, mutant_ids):
+        function_module = utils.create_module_ast([self.create_ast(function_node, mutant_ids)])
+        try:
+            compile(function_module, self.module_name, 'exec')
+        except Exception:
+            return False
+        return True
+
+    def remove_invalid_mutants(self):
+        """Remove mutants which can't be compiled, checking functions one by one to find them quickly."""
+        invalid_ids = set()
+        for function_node, mutant_ids in self.functions.items():
+            if not self.is_valid(function_node, set(mutant_ids)):
+                invalid_ids.update(mutant_id for mutant_id in mutant_ids
+                                   if not self.is_valid(function_node, {mutant_id}))
+        self.mutant_ids = {key: mutant_id for key, mutant_id in self.mutant_ids.items() if mutant_id not in invalid_ids}
+        for switches in self.switches.values():
+            switches[:] = [(mutant_id, value) for mutant_id, value in switches if mutant_id not in invalid_ids]
+
+    def create_module(self):
+        """Compile and import the meta-module, return None if it fails."""
+        try:
+            self.module = utils.create_module_from_code(self.compile(), self.module_name,
+                                                        module_dict={ACTIVE_MUTANT_NAME: NO_ACTIVE_MUTANT})
+        except BaseException:
+            self.module = None
+        return self.module
+
+    def activate(self, mutant_id):
+        return ActiveMutant(self.module, mutant_id)
+
+
+class ActiveMutant:
+    """Mutant of the schemata which is switched on for the time of running tests.
+
+    Like a function patch, tests get a copy of the meta-module namespace.
+    """
+
+    def __init__(self, module, mutant_id):
+        self.module = module
+        self.mutant_id = mutant_id
+
+    def create_module(self):
+        mutant_module = types.ModuleType(self.module.__name__)
+        mutant_module.__dict__.update(self.module.__dict__)
+        return mutant_module
+
+    def __enter__(self):
+        setattr(self.module, ACTIVE_MUTANT_NAME, self.mutant_id)
+        return self.create_module()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        setattr(self.module, ACTIVE_MUTANT_NAME, NO_ACTIVE_MUTANT)
+
+
+def create_schemata(mutation_operators, target_ast, module, to_mutate=None, coverage_injector=None,
+                    node_filter=None):
+    mutant_schemata = MutantSchemata(target_ast, module.__name__)
+    site_index = operators.MutationSiteIndex(mutation_operators, target_ast, coverage_injector, node_filter)
+    for op in utils.sort_operators(mutation_operators):
+        for mutation, _ in op().mutate(target_ast, to_mutate, None, coverage_injector, module=module,
+                                       node_filter=node_filter, sites=site_index.get_sites(op)):
+            mutant_schemata.add_mutant(mutation, site_index.get_site(mutation.node))
+    return mutant_schemata
@@ -0,0 +1,189 @@
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+
+from mutpy import cache, operators, utils
+from mutpy.test.utils import FileMockModulesLoader
+from mutpy.test_runners.base import SerializableMutationTestResult
+
+
+class MutationResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix='mutpytmp-')
+        self.cache = cache.MutationResultCache(self.cache_dir)
+        self.cache.set_test_modules([types.ModuleType('test')])
+        self.mutations = [operators.Mutation(operators.ArithmeticOperatorReplacement, None, 'mutate_Add')]
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def create_key(self, code='x = y - z'):
+        return self.cache.create_key(self.mutations, utils.create_ast(code))
+
+    def test_get_missing_result(self):
+        self.assertIsNone(self.cache.get(self.create_key()))
+
+    def test_get_stored_result(self):
+        result = SerializableMutationTestResult(False, False, 'test_x', 'traceback', None, 1)
+
+        self.cache.set(self.create_key(), result, 0.5)
+
+        self.assertEqual(self.cache.get(self.create_key()), (result, 0.5))
+
+    def test_get_stored_timeout(self):
+        self.cache.set(self.create_key(), None, 5)
+
+        self.assertEqual(self.cache.get(self.create_key()), (None, 5))
+
+    def test_results_persisted_between_instances(self):
+        self.cache.set(self.create_key(), None, 5)
+        new_cache = cache.MutationResultCache(self.cache_dir)
+        new_cache.set_test_modules([types.ModuleType('test')])
+
+        self.assertEqual(new_cache.get(self.create_key()), (None, 5))
+
+    def test_key_depends_on_mutant(self):
+        self.assertNotEqual(self.create_key('x = y - z'), self.create_key('x = y * z'))
+
+    def test_key_depends_on_tests(self):
+        key = self.create_key()
+
+        self.cache.set_test_modules([types.ModuleType('other_test')])
+
+        self.assertNotEqual(key, self.create_key())
+
+    def test_key_depends_on_run_fingerprint(self):
+        key = self.create_key()
+
+        self.cache.set_run_fingerprint(cache.create_fingerprint([], {'timeout_factor': 10}))
+
+        self.assertNotEqual(key, self.create_key())
+
+    def test_get_stored_coverage(self):
+        target_module = types.ModuleType('target')
+        key = self.cache.create_coverage_key(target_module, utils.create_ast('x = 1'))
+
+        self.cache.set_coverage(key, {0, 1}, {'test_x': {0, 1}})
+
+        self.assertEqual(self.cache.get_coverage(key), ({0, 1}, {'test_x': {0, 1}}))
+        self.assertIsNone(self.cache.get_coverage(
+            self.cache.create_coverage_key(target_module, utils.create_ast('x = 2'))))
+
+    def test_test_kills_persisted_between_instances(self):
+        test_kills = {('test_x', 'operator:AOR'): 2, ('test_x', 'line:target:1'): 2, ('test_y', 'operator:AOR'): 1}
+        self.cache.set_test_kills(test_kills)
+
+        new_cache = cache.MutationResultCache(self.cache_dir)
+
+        self.assertEqual(new_cache.get_test_kills(), test_kills)
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def test_fingerprint_depends_on_options(self):
+        modules = [types.ModuleType('target')]
+
+        self.assertEqual(cache.create_fingerprint(modules, {'timeout_factor': 5}),
+                         cache.create_fingerprint(modules, {'timeout_factor': 5}))
+        self.assertNotEqual(cache.create_fingerprint(modules, {'timeout_factor': 5}),
+                            cache.create_fingerprint(modules, {'timeout_factor': 10}))
+
+    def test_fingerprint_depends_on_module_source(self):
+        with FileMockModulesLoader('target', 'x = 1') as loader:
+            fingerprint = cache.create_fingerprint([loader.module])
+        with FileMockModulesLoader('target', 'x = 2') as loader:
+            self.assertNotEqual(cache.create_fingerprint([loader.module]), fingerprint)
+
+    def test_get_package_modules(self):
+        package_modules = cache.get_package_modules([sys.modules['mutpy.cache']])
+
+        self.assertIn(sys.modules['mutpy.utils'], package_modules)
+        self.assertNotIn(sys.modules['unittest'], package_modules)
+
+
+class MutationRunStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp(prefix='mutpytmp-')
+        self.state_file = self.state_dir + '/state'
+        self.module = types.ModuleType('target')
+        self.mutations = [operators.Mutation(operators.ArithmeticOperatorReplacement, utils.create_ast('x'),
+                                             'mutate_Add')]
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def record_mutants(self, state):
+        state.mutation(1, self.mutations, self.module, None)
+        state.killed(0.5, 'test_x', 'traceback', 1)
+        state.mutation(2, self.mutations, self.module, None)
+        state.timeout(2.0)
+        state.end()
+
+    def test_outcomes_persisted_between_instances(self):
+        self.record_mutants(cache.MutationRunState(self.state_file))
+
+        state = cache.MutationRunState(self.state_file)
+
+        self.assertEqual(state.get(1, 'target', self.mutations),
+                         (SerializableMutationTestResult(False, False, 'test_x', 'traceback', None, 1), 0.5))
+        self.assertEqual(state.get(2, 'target', self.mutations), (None, 2.0))
+        self.assertIsNone(state.get(3, 'target', self.mutations))
+        self.assertIsNone(state.get(1, 'other', self.mutations))
+
+    def test_ignore_truncated_outcome(self):
+        self.record_mutants(cache.MutationRunState(self.state_file))
+        with open(self.state_file, 'r+b') as state_file:
+            state_file.truncate(len(state_file.read()) - 1)
+
+        state = cache.MutationRunState(self.state_file)
+
+        self.assertIsNotNone(state.get(1, 'target', self.mutations))
+        self.assertIsNone(state.get(2, 'target', self.mutations))
+
+    def test_record_after_truncated_outcome(self):
+        self.record_mutants(cache.MutationRunState(self.state_file))
+        with open(self.state_file, 'r+b') as state_file:
+            state_file.truncate(len(state_file.read()) - 1)
+        self.record_mutants(cache.MutationRunState(self.state_file))
+
+        state = cache.MutationRunState(self.state_file)
+
+        self.assertEqual(state.get(2, 'target', self.mutations), (None, 2.0))
+
+    def test_ignore_outcomes_of_other_fingerprint(self):
+        state = cache.MutationRunState(self.state_file)
+        state.set_run_fingerprint('first')
+        self.record_mutants(state)
+
+        state = cache.MutationRunState(self.state_file)
+        state.set_run_fingerprint('second')
+
+        self.assertIsNone(state.get(1, 'target', self.mutations))
+        self.record_mutants(state)
+        state = cache.MutationRunState(self.state_file)
+        state.set_run_fingerprint('second')
+        self.assertIsNotNone(state.get(1, 'target', self.mutations))
+
+    def test_ignore_outcomes_of_other_seed(self):
+        state = cache.MutationRunState(self.state_file)
+        state.set_run_fingerprint('first', seed=1)
+        self.record_mutants(state)
+
+        state = cache.MutationRunState(self.state_file)
+        state.set_run_fingerprint('first', seed=2)
+
+        self.assertIsNone(state.get(1, 'target', self.mutations))
+
+    def test_decided_mutants_not_recorded_again(self):
+        self.record_mutants(cache.MutationRunState(self.state_file))
+        with open(self.state_file, 'rb') as state_file:
+            content = state_file.read()
+
+        self.record_mutants(cache.MutationRunState(self.state_file))
+
+        with open(self.state_file, 'rb') as state_file:
+            self.assertEqual(state_file.read(), content)
@@ -0,0 +1,74 @@
+import unittest
+
+from mutpy import changes, codegen, operators, utils
+
+
+class ParseChangedLinesTest(unittest.TestCase):
+
+    def test_added_lines(self):
+        diff = utils.f("""
+        diff --git a/target.py b/target.py
+        --- a/target.py
+        +++ b/target.py
+        @@ -2,0 +3,2 @@ def mul(x):
+        +    y = x
+        +    return y
+        """)
+
+        self.assertEqual(changes.parse_changed_lines(diff), {3, 4})
+
+    def test_changed_single_line(self):
+        diff = utils.f("""
+        @@ -5 +5 @@
+        -    return x * x
+        +    return x + x
+        """)
+
+        self.assertEqual(changes.parse_changed_lines(diff), {5})
+
+    def test_deleted_lines(self):
+        diff = utils.f("""
+        @@ -7,2 +6,0 @@
+        -    x = 1
+        -    y = 2
+        """)
+
+        self.assertEqual(changes.parse_changed_lines(diff), {6})
+
+
+class ChangedNodesFilterTest(unittest.TestCase):
+
+    def test_mutate_only_changed_lines(self):
+        target_ast = utils.create_ast(utils.f("""
+        def add(x, y):
+            return x + y
+        def sub(x, y):
+            return x - y
+        """))
+        node_filter = changes.ChangedNodesFilter({4})
+
+        mutants = [codegen.to_source(mutant) for _, mutant in
+                   operators.ArithmeticOperatorReplacement().mutate(target_ast, node_filter=node_filter)]
+
+        self.assertEqual(len(mutants), 1)
+        self.assertIn('return x + y', mutants[0])
+        self.assertNotIn('return x - y', mutants[0])
+
+    def test_mutate_definition_with_changed_decorator(self):
+        target_ast = utils.create_ast(utils.f("""
+        @cache
+        def add(x, y):
+            return x + y
+        """))
+        node_filter = changes.ChangedNodesFilter({1})
+
+        mutants = [codegen.to_source(mutant) for _, mutant in
+                   operators.DecoratorDeletion().mutate(target_ast, node_filter=node_filter)]
+
+        self.assertEqual(len(mutants), 1)
+        self.assertNotIn('@cache', mutants[0])
+
+    def test_node_without_lineno_is_selected(self):
+        node_filter = changes.ChangedNodesFilter(set())
+
+        self.assertTrue(node_filter.is_selected(utils.create_ast('x + y')))
@@ -1,5 +1,10 @@
+import contextlib
+import io
 import unittest
+from unittest import mock
+
 from mutpy import commandline
+from mutpy.test_runners import pytest_runner, PytestTestRunner, PytestSessionTestRunner
 
 
 class CommandLineTest(unittest.TestCase):
@@ -18,3 +23,23 @@ class CommandLineTest(unittest.TestCase):
         mutator = commandline.build_mutator(
             parser.parse_args(['--operator', 'AOR']))
         self.assertEqual(1, len(mutator.operators))
+
+    def test_parse_shard(self):
+        parser = commandline.build_parser()
+        cfg = parser.parse_args(['--shard', '2/3'])
+        self.assertEqual((2, 3), cfg.shard)
+
+    def test_shard_type_with_wrong_index(self):
+        with self.assertRaises(commandline.argparse.ArgumentTypeError):
+            commandline.shard_type('4/3')
+
+    def test_get_pytest_session_runner_cls(self):
+        self.assertIs(commandline.get_runner_cls('pytest-session'), PytestSessionTestRunner)
+
+    def test_get_runner_cls_falls_back_without_pytest_session_internals(self):
+        output = io.StringIO()
+        with mock.patch.object(pytest_runner, 'SetupState', object), contextlib.redirect_stdout(output):
+            runner_cls = commandline.get_runner_cls('pytest-session')
+
+        self.assertIs(runner_cls, PytestTestRunner)
+        self.assertIn('pytest 7.0', output.getvalue())
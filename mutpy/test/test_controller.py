@@ -1,9 +1,13 @@
 import ast
+import json
+import os
+import shutil
 import sys
+import tempfile
 import types
 import unittest
 
-from mutpy import controller, operators, utils, codegen
+from mutpy import controller, operators, utils, codegen, pool, cache, views, profiler, sampling, equivalence
 from mutpy.test.utils import MockModulesLoader
 from mutpy.test_runners import UnittestTestRunner
 
@@ -43,6 +47,13 @@ class MutationScoreTest(unittest.TestCase):
 
         self.assertEqual(self.score.count(), 50)
 
+    def test_count_if_equivalent(self):
+        self.score.survived_mutants = 5
+        self.score.killed_mutants = 5
+        self.score.equivalent_mutants = 2
+
+        self.assertEqual(self.score.count(), 50)
+
     def test_update_coverage(self):
         self.score.update_coverage(1, 1)
 
@@ -60,6 +71,43 @@ class MutationScoreStoreView:
         self.score = score
 
 
+class MutationNumbersStoreView:
+    def __init__(self):
+        self.numbers = []
+        self.statuses = []
+
+    def mutation(self, number, *args):
+        self.numbers.append(number)
+
+    def killed(self, *args, **kwargs):
+        self.statuses.append('killed')
+
+    def survived(self, *args, **kwargs):
+        self.statuses.append('survived')
+
+    def equivalent(self, *args, **kwargs):
+        self.statuses.append('equivalent')
+
+
+class MutantSourcesStoreView:
+    def __init__(self):
+        self.sources = []
+
+    def mutation(self, number, mutations, module, mutant):
+        self.sources.append(codegen.to_source(mutant))
+
+
+class NumberOfTestsStoreView:
+    def __init__(self):
+        self.tests_run = []
+
+    def killed(self, time, killer, exception_traceback, tests_run):
+        self.tests_run.append(tests_run)
+
+    def survived(self, time, tests_run):
+        self.tests_run.append(tests_run)
+
+
 class MutationControllerTest(unittest.TestCase):
     TARGET_SRC = 'def mul(x): return x * x'
     TEST_SRC = utils.f("""
@@ -73,17 +121,22 @@ class MutationControllerTest(unittest.TestCase):
     """)
 
     def setUp(self):
+        self.score_view = MutationScoreStoreView()
+        self.mutation_controller = self.build_controller()
+
+    def build_controller(self, **kwargs):
         target_loader = MockModulesLoader('target', self.TARGET_SRC)
         test_loader = MockModulesLoader('test', self.TEST_SRC)
-        self.score_view = MutationScoreStoreView()
-        mutator = controller.FirstOrderMutator([operators.ArithmeticOperatorReplacement], percentage=100)
-        self.mutation_controller = MockMutationController(
+        mutator = controller.FirstOrderMutator(kwargs.pop('operators', [operators.ArithmeticOperatorReplacement]),
+                                               percentage=100)
+        return MockMutationController(
             runner_cls=UnittestTestRunner,
             target_loader=target_loader,
             test_loader=test_loader,
-            views=[self.score_view],
+            views=[self.score_view] + kwargs.pop('views', []),
             mutant_generator=mutator,
-            mutate_covered=True,
+            mutate_covered=kwargs.pop('mutate_covered', True),
+            **kwargs
         )
 
     def test_run(self):
@@ -94,6 +147,372 @@ class MutationControllerTest(unittest.TestCase):
         self.assertEqual(score.killed_mutants, 2)
         self.assertEqual(score.survived_mutants, 1)
 
+    @unittest.skipUnless(pool.fork_available(), 'requires fork')
+    def test_run_with_jobs(self):
+        numbers_view = MutationNumbersStoreView()
+        serial_view = MutationNumbersStoreView()
+        self.build_controller(views=[serial_view]).run()
+        mutation_controller = self.build_controller(views=[numbers_view], jobs=2)
+
+        mutation_controller.run()
+
+        score = self.score_view.score
+        self.assertEqual(score.all_mutants, 3)
+        self.assertEqual(score.killed_mutants, 2)
+        self.assertEqual(score.survived_mutants, 1)
+        self.assertEqual(numbers_view.numbers, [1, 2, 3])
+        self.assertEqual(numbers_view.statuses, serial_view.statuses)
+
+    def test_load_test_modules_once(self):
+        test_loader = self.mutation_controller.test_loader
+        loads = []
+
+        def count_load(*args, **kwargs):
+            loads.append(args)
+            return type(test_loader).load(test_loader, *args, **kwargs)
+
+        test_loader.load = count_load
+        self.mutation_controller.run()
+
+        self.assertEqual(self.score_view.score.all_mutants, 3)
+        self.assertEqual(len(loads), 2)
+        test_module = self.mutation_controller.runner.test_modules[0][0]
+        self.assertIs(test_module.target, self.mutation_controller.target_loader.module)
+
+    def test_run_baseline_coverage_once(self):
+        runner = self.mutation_controller.runner
+        inject_modules_coverage = runner.inject_modules_coverage
+        calls = []
+
+        def count_inject(targets):
+            calls.append([target_module.__name__ for _, target_module in targets])
+            return inject_modules_coverage(targets)
+
+        runner.inject_modules_coverage = count_inject
+        runner.inject_coverage = None
+
+        self.mutation_controller.run()
+
+        self.assertEqual(calls, [['target']])
+        self.assertEqual(self.score_view.score.all_mutants, 3)
+        self.assertEqual(self.score_view.score.covered_nodes, self.score_view.score.all_nodes)
+
+    def test_run_with_select_tests(self):
+        tests_run_view = NumberOfTestsStoreView()
+        mutation_controller = self.build_controller(views=[tests_run_view], mutate_covered=False, select_tests=True)
+
+        mutation_controller.run()
+
+        score = self.score_view.score
+        self.assertEqual(score.all_mutants, 3)
+        self.assertEqual(score.killed_mutants, 2)
+        self.assertEqual(score.survived_mutants, 1)
+        self.assertEqual(tests_run_view.tests_run, [1, 1, 1])
+
+    def test_run_with_trace_coverage_backend(self):
+        tests_run_view = NumberOfTestsStoreView()
+        mutation_controller = self.build_controller(views=[tests_run_view], select_tests=True,
+                                                    coverage_backend='trace')
+
+        mutation_controller.run()
+
+        score = self.score_view.score
+        self.assertEqual(score.all_mutants, 3)
+        self.assertEqual(score.killed_mutants, 2)
+        self.assertEqual(score.covered_nodes, score.all_nodes)
+        self.assertEqual(tests_run_view.tests_run, [1, 1, 1])
+
+    def test_run_with_kill_first(self):
+        numbers_view = MutationNumbersStoreView()
+        mutation_controller = self.build_controller(views=[numbers_view], mutate_covered=False, kill_first=True)
+
+        mutation_controller.run()
+
+        self.assertEqual(numbers_view.statuses, ['killed', 'killed', 'survived'])
+        test_kills = mutation_controller.runner.test_kills
+        (killer,) = {test for test, _ in test_kills.kills}
+        self.assertIn('test_mul', killer)
+        self.assertEqual(test_kills.count(killer, ['operator:AOR']), 2)
+        self.assertEqual(test_kills.count(killer, ['line:target:1']), 2)
+        self.assertIn(killer, mutation_controller.runner.test_durations)
+
+    def run_with_tce(self, **kwargs):
+        self.TARGET_SRC = utils.f("""
+        def mul(x):
+            if False:
+                return x + 1
+            return not (not x) and x * x
+        """)
+        numbers_view = MutationNumbersStoreView()
+        mutation_controller = self.build_controller(
+            views=[numbers_view],
+            operators=[operators.ArithmeticOperatorReplacement, operators.ConditionalOperatorDeletion],
+            mutate_covered=False,
+            tce=True,
+            **kwargs
+        )
+        mutants_run = self.record_mutants_run(mutation_controller)
+        mutation_controller.run()
+        return numbers_view, mutants_run
+
+    def test_run_with_tce(self):
+        numbers_view, mutants_run = self.run_with_tce()
+
+        score = self.score_view.score
+        self.assertEqual(numbers_view.statuses, ['equivalent', 'killed', 'killed', 'survived', 'killed', 'killed'])
+        self.assertEqual(score.equivalent_mutants, 1)
+        self.assertEqual(score.count(), 80)
+        self.assertEqual(len(mutants_run), 4)
+
+    @unittest.skipUnless(pool.fork_available(), 'requires fork')
+    def test_run_with_tce_and_jobs(self):
+        numbers_view, _ = self.run_with_tce(jobs=2)
+
+        self.assertEqual(numbers_view.statuses, ['equivalent', 'killed', 'killed', 'survived', 'killed', 'killed'])
+        self.assertEqual(self.score_view.score.equivalent_mutants, 1)
+
+    def test_run_with_tce_and_resume(self):
+        state_file = os.path.join(self.create_temp_dir(), 'state')
+        self.run_with_tce(run_state=cache.MutationRunState(state_file))
+        run_state = cache.MutationRunState(state_file)
+
+        numbers_view, mutants_run = self.run_with_tce(run_state=run_state)
+
+        self.assertEqual(len(run_state.results), 6)
+        self.assertIn(equivalence.EQUIVALENT, [result for result, _ in run_state.results.values()])
+
+        self.assertEqual(numbers_view.statuses, ['equivalent', 'killed', 'killed', 'survived', 'killed', 'killed'])
+        self.assertEqual(self.score_view.score.equivalent_mutants, 1)
+        self.assertEqual(mutants_run, [])
+
+    def run_with_schemata(self, **kwargs):
+        serial_view = MutationNumbersStoreView()
+        self.build_controller(views=[serial_view]).run()
+        numbers_view = MutationNumbersStoreView()
+        mutation_controller = self.build_controller(views=[numbers_view], schemata=True, **kwargs)
+        mutation_controller.compile_mutant = None
+        mutation_controller.create_function_patch = None
+
+        mutation_controller.run()
+
+        self.assertEqual(numbers_view.statuses, serial_view.statuses)
+        self.assertEqual(self.score_view.score.all_mutants, 3)
+
+    def test_run_with_schemata(self):
+        self.run_with_schemata()
+
+    @unittest.skipUnless(pool.fork_available(), 'requires fork')
+    def test_run_with_schemata_and_jobs(self):
+        self.run_with_schemata(jobs=2)
+
+    def create_temp_dir(self):
+        temp_dir = tempfile.mkdtemp(prefix='mutpytmp-')
+        self.addCleanup(shutil.rmtree, temp_dir)
+        return temp_dir
+
+    def build_controller_after_run(self, store_name, store_cls, **kwargs):
+        """Run controller with a store of results (cache or run state) and build next one on the same file."""
+        store_path = os.path.join(self.create_temp_dir(), 'store')
+        self.build_controller(**{store_name: store_cls(store_path)}).run()
+        kwargs[store_name] = store_cls(store_path)
+        return self.build_controller(**kwargs)
+
+    def test_run_with_resume(self):
+        tests_run_view = NumberOfTestsStoreView()
+        mutation_controller = self.build_controller_after_run('run_state', cache.MutationRunState,
+                                                              views=[tests_run_view])
+        mutation_controller.runner.run_tests_with_mutant = None
+
+        mutation_controller.run()
+
+        score = self.score_view.score
+        self.assertEqual(score.all_mutants, 3)
+        self.assertEqual(score.killed_mutants, 2)
+        self.assertEqual(score.survived_mutants, 1)
+        self.assertEqual(len(tests_run_view.tests_run), 3)
+
+    def test_resume_state_discarded_with_other_options(self):
+        mutation_controller = self.build_controller_after_run('run_state', cache.MutationRunState, timeout_factor=10)
+        mutants_run = self.record_mutants_run(mutation_controller)
+
+        mutation_controller.run()
+
+        self.assertEqual(len(mutants_run), 3)
+
+    def record_mutants_run(self, mutation_controller):
+        mutants_run = []
+        run_tests_with_mutant = mutation_controller.runner.run_tests_with_mutant
+
+        def run_tests(*args, **kwargs):
+            mutants_run.append(args)
+            return run_tests_with_mutant(*args, **kwargs)
+
+        mutation_controller.runner.run_tests_with_mutant = run_tests
+        return mutants_run
+
+    def run_with_profiler(self, **kwargs):
+        profile_dir = self.create_temp_dir()
+        self.addCleanup(setattr, utils.TimeRegister, 'profiler', None)
+        profile_file = profile_dir + '/profile.jsonl'
+        numbers_view = MutationNumbersStoreView()
+        self.build_controller(views=[numbers_view], profiler=profiler.MutantsProfiler(profile_file, dumps=1),
+                              **kwargs).run()
+        with open(profile_file) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record['number'] for record in records], numbers_view.numbers)
+        self.assertEqual([record['status'] for record in records], numbers_view.statuses)
+        for record in records:
+            self.assertEqual(record['operators'], ['AOR'])
+            self.assertTrue({'generation', 'compilation', 'suite', 'tests'}.issubset(record['phases']))
+        return profile_dir, records
+
+    def test_run_with_profiler(self):
+        profile_dir, records = self.run_with_profiler()
+
+        slowest = max(records, key=lambda record: record['wall'])
+        self.assertEqual(sorted(os.listdir(profile_dir)),
+                         ['profile-mutant-{}.pstats'.format(slowest['number']), 'profile.jsonl'])
+
+    @unittest.skipUnless(pool.fork_available(), 'requires fork')
+    def test_run_with_profiler_and_jobs(self):
+        profile_dir, records = self.run_with_profiler(jobs=2)
+
+        self.assertTrue(all('ipc' in record['phases'] for record in records))
+        self.assertEqual(os.listdir(profile_dir), ['profile.jsonl'])
+
+    def test_run_with_score_estimator(self):
+        numbers_view = MutationNumbersStoreView()
+        mutation_controller = self.build_controller(views=[numbers_view],
+                                                    score_estimator=sampling.ScoreEstimator(margin=50))
+
+        mutation_controller.run()
+
+        score = self.score_view.score
+        self.assertEqual(score.all_mutants, 1)
+        self.assertEqual(numbers_view.numbers, [1])
+        self.assertEqual(score.population, 3)
+        self.assertEqual(score.confidence, 95)
+        low, high = score.confidence_interval
+        self.assertTrue(0 <= low <= score.count() <= high <= 100)
+        self.assertLess(low, high)
+
+    def test_run_with_score_estimator_in_same_order(self):
+        orders = []
+        for seed in (None, None, 7, 7):
+            mutants_view = MutantSourcesStoreView()
+            self.build_controller(views=[mutants_view],
+                                  score_estimator=sampling.ScoreEstimator(margin=1, seed=seed)).run()
+            orders.append(mutants_view.sources)
+
+        self.assertEqual(orders[0], orders[1])
+        self.assertEqual(orders[2], orders[3])
+        self.assertEqual(len(orders[0]), 3)
+
+    def test_run_all_mutants_with_score_estimator(self):
+        mutation_controller = self.build_controller(score_estimator=sampling.ScoreEstimator(margin=1))
+
+        mutation_controller.run()
+
+        score = self.score_view.score
+        self.assertEqual(score.all_mutants, 3)
+        self.assertEqual(score.killed_mutants, 2)
+        self.assertEqual(score.confidence_interval, (score.count(), score.count()))
+
+    def test_run_with_shards(self):
+        numbers_view = MutationNumbersStoreView()
+        self.build_controller(views=[numbers_view]).run()
+        shards_numbers, shards_statuses = {}, {}
+
+        for index in (1, 2):
+            shard_view = MutationNumbersStoreView()
+            self.build_controller(views=[shard_view], shard=controller.MutantsShard(index, 2)).run()
+            shards_numbers.update(zip(shard_view.numbers, [index] * len(shard_view.numbers)))
+            shards_statuses.update(zip(shard_view.numbers, shard_view.statuses))
+
+        self.assertEqual(sorted(shards_numbers), numbers_view.numbers)
+        self.assertEqual([shards_statuses[number] for number in numbers_view.numbers], numbers_view.statuses)
+
+    def test_merge_shards_jsonl_reports(self):
+        report_dir = self.create_temp_dir()
+        numbers_view = MutationNumbersStoreView()
+        self.build_controller(views=[numbers_view]).run()
+        report_files = [os.path.join(report_dir, 'shard{}.jsonl'.format(index)) for index in (1, 2)]
+        for index, report_file in enumerate(report_files, start=1):
+            self.build_controller(views=[views.JSONLReportView(report_file)],
+                                  shard=controller.MutantsShard(index, 2)).run()
+        merged_numbers_view = MutationNumbersStoreView()
+        merged_score_view = MutationScoreStoreView()
+
+        controller.JSONLReportReplay(report_files, [merged_numbers_view, merged_score_view]).run()
+
+        self.assertEqual(merged_numbers_view.numbers, numbers_view.numbers)
+        self.assertEqual(merged_numbers_view.statuses, numbers_view.statuses)
+        self.assertEqual(merged_score_view.score.all_mutants, 3)
+        self.assertEqual(merged_score_view.score.covered_nodes, self.score_view.score.covered_nodes)
+
+    def test_replay_jsonl_report(self):
+        report_file = os.path.join(self.create_temp_dir(), 'report.jsonl')
+        numbers_view = MutationNumbersStoreView()
+        self.build_controller(views=[numbers_view, views.JSONLReportView(report_file)]).run()
+        replay_numbers_view = MutationNumbersStoreView()
+        replay_score_view = MutationScoreStoreView()
+
+        controller.JSONLReportReplay([report_file], [replay_numbers_view, replay_score_view]).run()
+
+        self.assertEqual(replay_numbers_view.numbers, numbers_view.numbers)
+        self.assertEqual(replay_numbers_view.statuses, numbers_view.statuses)
+        score = replay_score_view.score
+        self.assertEqual(score.all_mutants, 3)
+        self.assertEqual(score.killed_mutants, 2)
+        self.assertEqual(score.covered_nodes, self.score_view.score.covered_nodes)
+
+    @unittest.skipUnless(pool.fork_available(), 'requires fork')
+    def test_jsonl_report_with_jobs(self):
+        report_dir = self.create_temp_dir()
+        records = []
+        for jobs in (1, 2):
+            report_file = os.path.join(report_dir, 'report{}.jsonl'.format(jobs))
+            self.build_controller(views=[views.JSONLReportView(report_file)], jobs=jobs).run()
+            records.append([(record['number'], record['mutant_code']) for record in views.read_jsonl_report(report_file)
+                            if record['type'] == 'mutation'])
+
+        self.assertEqual(len(records[0]), 3)
+        self.assertEqual(records[1], records[0])
+
+    def test_replay_jsonl_report_with_score_interval(self):
+        report_file = os.path.join(self.create_temp_dir(), 'report.jsonl')
+        self.build_controller(views=[views.JSONLReportView(report_file)],
+                              score_estimator=sampling.ScoreEstimator(margin=50)).run()
+        score = self.score_view.score
+        replay_score_view = MutationScoreStoreView()
+
+        controller.JSONLReportReplay([report_file], [replay_score_view]).run()
+
+        replay_score = replay_score_view.score
+        self.assertEqual(replay_score.confidence, 95)
+        self.assertEqual(replay_score.confidence_interval, tuple(score.confidence_interval))
+        self.assertEqual(replay_score.population, 3)
+
+    def test_run_with_result_cache(self):
+        mutation_controller = self.build_controller_after_run('result_cache', cache.MutationResultCache)
+        mutation_controller.runner.run_tests_with_mutant = None
+
+        mutation_controller.run()
+
+        score = self.score_view.score
+        self.assertEqual(score.all_mutants, 3)
+        self.assertEqual(score.killed_mutants, 2)
+        self.assertEqual(score.survived_mutants, 1)
+
+    def test_result_cache_not_reused_with_other_options(self):
+        mutation_controller = self.build_controller_after_run('result_cache', cache.MutationResultCache,
+                                                              timeout_factor=10)
+        mutants_run = self.record_mutants_run(mutation_controller)
+
+        mutation_controller.run()
+
+        self.assertEqual(len(mutants_run), 3)
+
 
 class BaseHOMStrategyTest(unittest.TestCase):
 
@@ -121,8 +540,12 @@ class BaseHOMStrategyTest(unittest.TestCase):
         return operators.Mutation(operator=operators.ConstantReplacement, node=node)
 
     @staticmethod
-    def aor_mutation_on_subtraction():
-        return operators.Mutation(operator=operators.ArithmeticOperatorReplacement, node=ast.Sub(children=[]))
+    def subtraction_node():
+        return utils.create_ast('x - y').body[0].value.op
+
+    @classmethod
+    def aor_mutation_on_subtraction(cls):
+        return operators.Mutation(operator=operators.ArithmeticOperatorReplacement, node=cls.subtraction_node())
 
     @staticmethod
     def apply_strategy_to_mutations(hom_strategy_cls, mutations, order, hom_kwargs=None):
@@ -175,9 +598,10 @@ class FirstToLastHOMStrategyTest(BaseHOMStrategyTest):
         self.assert_mutation_in_changeset_at_position_equals(changes_to_apply, 1, 0, mutations[1])
 
     def test_generate_if_node_child(self):
-        node = ast.Sub(children=[])
+        unary_op_node = utils.create_ast('-x').body[0].value
+        node = unary_op_node.operand
         mutations = [
-            self.aor_mutation(node=ast.UnaryOp(children=[node])),
+            self.aor_mutation(node=unary_op_node),
             self.aor_mutation(node=node),
         ]
 
@@ -217,7 +641,7 @@ class BetweenOperatorsHOMStrategyTest(BaseHOMStrategyTest):
         self.assert_mutation_in_changeset_at_position_equals(changes_to_apply, 1, 0, mutations[1])
 
     def test_generate_if_two_operators(self):
-        mutations = self.TWO_AOR_MUTATIONS_ON_SUBTRACTION + [self.asr_mutation(node=ast.Sub(children=[]))]
+        mutations = self.TWO_AOR_MUTATIONS_ON_SUBTRACTION + [self.asr_mutation(node=self.subtraction_node())]
 
         changes_to_apply = self.apply_strategy_to_mutations_with_order_2(controller.BetweenOperatorsHOMStrategy,
                                                                          mutations)
@@ -231,8 +655,8 @@ class BetweenOperatorsHOMStrategyTest(BaseHOMStrategyTest):
 
     def test_generate_if_three_operators(self):
         mutations = self.TWO_AOR_MUTATIONS_ON_SUBTRACTION + [
-            self.asr_mutation(node=ast.Sub(children=[])),
-            self.crp_mutation(node=ast.Sub(children=[])),
+            self.asr_mutation(node=self.subtraction_node()),
+            self.crp_mutation(node=self.subtraction_node()),
         ]
 
         changes_to_apply = self.apply_strategy_to_mutations_with_order_2(controller.BetweenOperatorsHOMStrategy,
@@ -325,4 +749,16 @@ class HighOrderMutatorTest(unittest.TestCase):
                 self.assertEqual("x = ''", codegen.to_source(mutant))
                 self.assertEqual(len(mutations), 1)
         self.assertEqual(number, 1)
-        self.assertEqual(codegen.to_source(target_ast), "x = 'test'")
\ No newline at end of file
+        self.assertEqual(codegen.to_source(target_ast), "x = 'test'")
+
+
+class MutantsShardTest(unittest.TestCase):
+
+    def test_mutant_assigned_to_single_shard(self):
+        node = ast.AST()
+        node.marker = 3
+        mutations = [operators.Mutation(operators.ArithmeticOperatorReplacement, node, 'mutate_Add')]
+
+        selected = [controller.MutantsShard(index, 3).is_selected('target', mutations) for index in (1, 2, 3)]
+
+        self.assertEqual(selected.count(True), 1)
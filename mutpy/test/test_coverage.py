@@ -190,6 +190,36 @@ class CoverageInjectorTest(unittest.TestCase):
         self.assert_not_covered([for_body_el])
 
 
+class TracingCoverageInjectorTest(CoverageInjectorTest):
+    def setUp(self):
+        self.coverage_injector = coverage.TracingCoverageInjector()
+
+    def test_function_call_coverage(self):
+        node = utils.create_ast(utils.f("""
+        def f(x):
+            global y
+            if x:
+                return 1
+            return 2
+        """))
+        module = self.coverage_injector.inject(node)
+
+        with self.coverage_injector:
+            module.f(True)
+
+        function_node = node.body[0]
+        self.assert_covered([function_node.body[0], function_node.body[1], function_node.body[1].body[0]])
+        self.assert_not_covered([function_node.body[2]])
+
+    def test_trace_only_inside_with_block(self):
+        module = self.coverage_injector.inject(utils.create_ast('def f():\n    return 1'))
+        covered_nodes = self.coverage_injector.covered_nodes.copy()
+
+        module.f()
+
+        self.assertEqual(self.coverage_injector.covered_nodes, covered_nodes)
+
+
 class UnittestCoverageResultTest(unittest.TestCase):
     def test_run(self):
         coverage_injector = coverage.CoverageInjector()
@@ -215,5 +245,59 @@ class UnittestCoverageResultTest(unittest.TestCase):
         suite.run(result)
 
         self.assertEqual(coverage_injector.covered_nodes, {1})
-        self.assertEqual(result.test_covered_nodes[repr(test_x)], {1})
+        self.assertEqual(result.test_covered_nodes[repr(test_x)], coverage.to_bitset({1}))
         self.assertFalse(result.test_covered_nodes[repr(test_y)])
+
+
+class ModulesCoverageInjectorTest(unittest.TestCase):
+    def test_run(self):
+        coverage_injectors = [coverage.CoverageInjector(), coverage.CoverageInjector()]
+        coverage_injectors[1].covered_nodes.add(0)
+        modules_coverage_injector = coverage.ModulesCoverageInjector(coverage_injectors)
+
+        class ATest(unittest.TestCase):
+            def test_x(self):
+                coverage_injectors[0].covered_nodes.add(1)
+                coverage_injectors[1].covered_nodes.add(2)
+
+            def test_y(self):
+                coverage_injectors[0].covered_nodes.add(3)
+
+        result = UnittestCoverageResult(coverage_injector=modules_coverage_injector)
+        test_x = ATest(methodName='test_x')
+        test_y = ATest(methodName='test_y')
+
+        unittest.TestSuite([test_x, test_y]).run(result)
+
+        first_module, second_module = modules_coverage_injector.split_result(result.test_covered_nodes)
+        self.assertEqual(coverage_injectors[0].covered_nodes, {1, 3})
+        self.assertEqual(coverage_injectors[1].covered_nodes, {0, 2})
+        self.assertEqual(first_module, {repr(test_x): coverage.to_bitset({1}), repr(test_y): coverage.to_bitset({3})})
+        self.assertEqual(second_module, {repr(test_x): coverage.to_bitset({0, 2}),
+                                         repr(test_y): coverage.to_bitset({0})})
+
+
+class TestsCoverageIndexTest(unittest.TestCase):
+
+    def test_find_tests(self):
+        index = coverage.TestsCoverageIndex({'test_x': coverage.to_bitset({0, 1, 2}),
+                                             'test_y': coverage.to_bitset({0, 3}),
+                                             'test_z': coverage.to_bitset(set())})
+
+        self.assertEqual(index.find_tests({1}), {'test_x'})
+        self.assertEqual(index.find_tests({2, 3}), {'test_x', 'test_y'})
+        self.assertEqual(index.find_tests({0}), {'test_x', 'test_y'})
+        self.assertEqual(index.find_tests({4}), set())
+
+
+class BitsetTest(unittest.TestCase):
+
+    def test_to_bitset(self):
+        self.assertEqual(coverage.to_bitset({0, 3, 9}), 0b1000001001)
+        self.assertEqual(coverage.to_bitset(set()), 0)
+
+    def test_iter_bitset(self):
+        markers = {0, 7, 8, 15, 64, 1000}
+
+        self.assertEqual(list(coverage.iter_bitset(coverage.to_bitset(markers))), sorted(markers))
+        self.assertEqual(list(coverage.iter_bitset(0)), [])
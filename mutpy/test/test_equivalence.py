@@ -0,0 +1,47 @@
+import unittest
+
+from mutpy import equivalence, utils
+
+
+class FingerprintCodeTest(unittest.TestCase):
+
+    def fingerprint(self, source):
+        return equivalence.fingerprint_code(compile(utils.create_ast(source), 'target', 'exec'))
+
+    def test_ignore_line_numbers(self):
+        self.assertEqual(self.fingerprint('def f(x):\n    return x + 1'),
+                         self.fingerprint('\n\ndef f(x):\n\n    return (x +\n            1)'))
+
+    def test_compare_constants_types(self):
+        fingerprints = {self.fingerprint('x = {}'.format(value)) for value in ('1', '1.0', 'True')}
+
+        self.assertEqual(len(fingerprints), 3)
+
+    def test_compare_nested_code(self):
+        self.assertNotEqual(self.fingerprint('def f(x):\n    return x + 1'),
+                            self.fingerprint('def f(x):\n    return x - 1'))
+
+
+class TrivialCompilerEquivalenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.equivalence = equivalence.TrivialCompilerEquivalence(utils.create_ast('x = 1\nif False:\n    x = 2'),
+                                                                  'target')
+
+    def create_key(self, source):
+        return self.equivalence.create_key(compile(utils.create_ast(source), 'target', 'exec'))
+
+    def test_equivalent_if_dead_code_mutated(self):
+        self.assertTrue(self.equivalence.is_equivalent(self.create_key('x = 1\nif False:\n    x = 3')))
+        self.assertFalse(self.equivalence.is_equivalent(self.create_key('x = 2\nif False:\n    x = 2')))
+
+    def test_share_result_of_duplicate(self):
+        key = self.create_key('x = 2')
+        self.equivalence.register(key)
+
+        self.assertTrue(self.equivalence.is_registered(self.create_key('x = 2')))
+        self.assertIsNone(self.equivalence.get_result(key))
+
+        self.equivalence.set_result(key, None, 1.0)
+
+        self.assertEqual(self.equivalence.get_result(self.create_key('x = 2')), (None, 1.0))
@@ -38,6 +38,86 @@ class MutationOperatorTest(unittest.TestCase):
 
         self.assertEqual(len(mutations), 0)
 
+    def test_patches_reverted_after_mutation(self):
+        class ShiftPassOperator(operators.MutationOperator):
+
+            @operators.copy_node
+            def mutate_FunctionDef(self, node):
+                self.shift_lines(node.body, 10)
+                node.body.append(ast.Pass(lineno=node.body[-1].lineno + 1))
+                return node
+
+        target_ast = utils.create_ast('def f():\n    pass')
+        pass_node = target_ast.body[0].body[0]
+
+        for _, mutant in ShiftPassOperator().mutate(target_ast):
+            self.assertEqual(pass_node.lineno, 12)
+            self.assertEqual(len(mutant.body[0].body), 2)
+
+        self.assertEqual(pass_node.lineno, 2)
+        self.assertEqual(len(target_ast.body[0].body), 1)
+
+    def test_shallow_copy_node(self):
+        node = utils.create_ast('def f():\n    pass').body[0]
+
+        copied_node = operators.shallow_copy_node(node)
+
+        self.assertIsNot(copied_node.body, node.body)
+        self.assertIs(copied_node.body[0], node.body[0])
+        self.assertIs(copied_node.parent, node.parent)
+
+    def test_visitors_dispatch_table(self):
+        self.assertEqual(operators.RelationalOperatorReplacement.get_visitors()['Gt'],
+                         ['mutate_Gt', 'mutate_Gt_to_GtE'])
+        self.assertEqual(self.PassIdOperator.get_visitors(), {'Pass': ['mutate_Pass']})
+
+    def test_visitors_dispatch_table_of_subclass(self):
+        class PassAndBreakOperator(self.PassIdOperator):
+
+            def mutate_Break(self, node):
+                return ast.Continue()
+
+        self.assertEqual(self.PassIdOperator.get_visitors(), {'Pass': ['mutate_Pass']})
+        self.assertEqual(PassAndBreakOperator.get_visitors(), {'Break': ['mutate_Break'], 'Pass': ['mutate_Pass']})
+
+    def test_mutate_sites_from_index(self):
+        target_ast = utils.create_ast(utils.f("""
+        def f(x):
+            x = x + 1
+            return x * 2 - 3
+
+        @notmutate
+        def g(x):
+            return x + 1
+        """))
+        operator = operators.ArithmeticOperatorReplacement
+        site_index = operators.MutationSiteIndex([operator, self.PassIdOperator], target_ast)
+
+        mutants = [codegen.to_source(mutant) for _, mutant in operator().mutate(target_ast)]
+        index_mutants = [codegen.to_source(mutant) for _, mutant in
+                         operator().mutate(target_ast, sites=site_index.get_sites(operator))]
+
+        self.assertEqual(len(site_index.get_sites(operator)), 3)
+        self.assertEqual(site_index.get_sites(self.PassIdOperator), [])
+        self.assertEqual(index_mutants, mutants)
+
+    def test_site_affected_by_ancestor_and_list_neighbour(self):
+        target_ast = utils.create_ast(utils.f("""
+        def f(x):
+            x = x + 1
+            return x - 1
+        """))
+        site_index = operators.MutationSiteIndex([operators.ArithmeticOperatorReplacement,
+                                                  operators.StatementDeletion], target_ast)
+        add_site, sub_site = site_index.get_sites(operators.ArithmeticOperatorReplacement)
+        assign_site, return_site = site_index.get_sites(operators.StatementDeletion)
+
+        self.assertTrue(add_site.is_affected_by(assign_site))
+        self.assertTrue(return_site.is_affected_by(assign_site))
+        self.assertFalse(sub_site.is_affected_by(assign_site))
+        self.assertFalse(assign_site.is_affected_by(add_site))
+        self.assertIs(site_index.get_site(add_site.node), add_site)
+
 
 class OperatorTestCase(unittest.TestCase):
 
@@ -665,6 +745,20 @@ class HidingVariableDeletionTest(OperatorTestCase):
             pass
         """)], with_exec=True)
 
+    def test_original_restored_after_unpack_mutation(self):
+        original = utils.f("""
+        class B:
+            x = 1
+        class A(B):
+            (x, y, z) = (2, 3, 4)
+        """)
+        original_ast = utils.create_ast(original)
+        module = utils.create_module(original_ast)
+
+        list(self.op.mutate(original_ast, module=module))
+
+        self.assertEqual(codegen.to_source(original_ast), original)
+
 
 class BreakContinueReplacementTest(OperatorTestCase):
 
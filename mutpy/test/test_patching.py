@@ -0,0 +1,67 @@
+import unittest
+
+from mutpy import operators, patching, utils
+
+
+class FunctionPatchTest(unittest.TestCase):
+    SOURCE = utils.f("""
+    calls = []
+    calls.append(1 + 2)
+
+
+    def add(x, y):
+        return x + y
+
+
+    class Calculator:
+
+        def sub(self, x, y):
+            return x - y
+
+        @staticmethod
+        def mul(x, y=2 + 1):
+            return x * y
+
+        def describe(self):
+            return super().__str__() + '!'
+    """)
+
+    def setUp(self):
+        target_ast = utils.create_ast(self.SOURCE)
+        self.module = utils.create_module(utils.create_ast(self.SOURCE), module_name='target')
+        self.patches = [patching.create_function_patch(self.module, [mutation]) for mutation, _ in
+                        operators.ArithmeticOperatorReplacement().mutate(target_ast, module=self.module)]
+
+    def test_patch_function(self):
+        with self.patches[1] as mutant_module:
+            self.assertEqual(mutant_module.add(3, 2), 1)
+            self.assertEqual(self.module.add(3, 2), 1)
+            self.assertEqual(mutant_module.calls, [3])
+
+        self.assertEqual(self.module.add(3, 2), 5)
+
+    def test_patch_method(self):
+        calculator = self.module.Calculator()
+
+        with self.patches[2]:
+            self.assertEqual(calculator.sub(3, 2), 5)
+        with self.patches[4]:
+            self.assertEqual(calculator.mul(3, 2), 1.5)
+
+        self.assertEqual(calculator.sub(3, 2), 1)
+        self.assertEqual(calculator.mul(3, 2), 6)
+
+    def test_patch_method_with_super_call(self):
+        calculator = self.module.Calculator()
+
+        with self.patches[7]:
+            with self.assertRaises(TypeError):
+                calculator.describe()
+
+        self.assertTrue(calculator.describe().endswith('!'))
+
+    def test_no_patch_if_module_level_mutated(self):
+        self.assertIsNone(self.patches[0])
+
+    def test_no_patch_if_default_argument_mutated(self):
+        self.assertIsNone(self.patches[3])
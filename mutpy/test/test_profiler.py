@@ -0,0 +1,39 @@
+import unittest
+
+from mutpy import profiler
+
+
+class MutantsProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = profiler.MutantsProfiler('profile.jsonl')
+
+    def test_generate(self):
+        mutants = list(self.profiler.generate(iter([1, 2])))
+        self.profiler.start_mutant(1)
+
+        self.assertEqual(mutants, [1, 2])
+        self.assertEqual(self.profiler.generation, (0, 0))
+        self.assertIn(profiler.GENERATION, self.profiler.mutants[1]['phases'])
+
+    def test_add_time(self):
+        self.profiler.start_mutant(1)
+
+        self.profiler.add_time('compile_mutant', 2, 1)
+        self.profiler.add_time('create_mutant_module', 3, 1)
+        self.profiler.add_time('mutate_module', 10, 10)
+
+        self.assertEqual(self.profiler.mutants[1]['phases'][profiler.COMPILATION], {'wall': 5, 'cpu': 2})
+        self.assertEqual(set(self.profiler.mutants[1]['phases']), {profiler.GENERATION, profiler.COMPILATION})
+
+    def test_add_worker_phases(self):
+        self.profiler.start_mutant(1)
+
+        self.profiler.add_worker_phases(1, {profiler.TESTS: {'wall': 2, 'cpu': 1}}, ipc=0.5)
+
+        phases = self.profiler.mutants[1]['phases']
+        self.assertEqual(phases[profiler.TESTS], {'wall': 2, 'cpu': 1})
+        self.assertEqual(phases[profiler.IPC], {'wall': 0.5, 'cpu': None})
+
+    def test_dump_file_name(self):
+        self.assertEqual(self.profiler.get_dump_file_name(3), 'profile-mutant-3.pstats')
@@ -1,8 +1,17 @@
+import ast
+import os
+import shutil
+import tempfile
+import types
 import unittest
+from unittest import mock
 
-from mutpy import utils
+from mutpy import operators, utils
 from mutpy.test.utils import FileMockModulesLoader
-from mutpy.test_runners import UnittestTestRunner, PytestTestRunner
+from mutpy.test_runners import UnittestTestRunner, PytestTestRunner, PytestSessionTestRunner
+from mutpy.test_runners.base import KillCounter, MutantTestSelection
+from mutpy.test_runners import pytest_runner
+from mutpy.test_runners.pytest_runner import PytestSession, PytestMutpyPlugin
 
 TARGET_MUL_SRC = 'def mul(x): return x * x'
 TARGET_MUL_TYPEERROR_SRC = 'def mul(x): return x * "a"'
@@ -116,3 +125,217 @@ class PytestTestRunnerTest(BaseTestCases.BaseTestRunnerTest):
     def test_mul():
         assert target.mul(2) == 4
     """)
+
+
+class PytestSessionTestRunnerTest(PytestTestRunnerTest):
+    TEST_RUNNER_CLS = PytestSessionTestRunner
+
+    def test_collect_tests_once(self):
+        with FileMockModulesLoader('target', TARGET_MUL_SRC) as target_loader, \
+                FileMockModulesLoader('test', self.TEST_SRC_FAIL) as test_loader:
+            target_loader.load()
+            runner = self.TEST_RUNNER_CLS(test_loader, 5, utils.StdoutManager(True), False)
+            test_module, target_test = test_loader.load()[0]
+            first_result, _ = runner.run_test(test_module, target_test)
+            second_result, _ = runner.run_test(test_module, target_test)
+
+        self.assertEqual(len(runner.sessions), 1)
+        self.assertEqual(len(first_result.failed), 1)
+        self.assertEqual(len(second_result.failed), 1)
+        self.assertEqual(second_result.failed[0].name, first_result.failed[0].name)
+
+    def test_fall_back_to_pytest_main_when_session_cannot_be_opened(self):
+        with mock.patch.object(pytest_runner, '_prepareconfig', side_effect=TypeError):
+            result = self.run_test(TARGET_MUL_SRC, self.TEST_SRC_FAIL)
+
+        self.assertEqual(len(result.failed), 1)
+        self.assertIn('test_mul', result.get_killer())
+
+    def test_fall_back_to_pytest_main_when_session_cannot_be_run(self):
+        with mock.patch.object(PytestSession, 'run', side_effect=AttributeError):
+            result = self.run_test(TARGET_MUL_SRC, self.TEST_SRC_FAIL)
+
+        self.assertEqual(len(result.failed), 1)
+        self.assertIn('test_mul', result.get_killer())
+
+
+class PytestSessionReuseFixturesTest(unittest.TestCase):
+    TEST_SRC = utils.f("""
+    import pytest
+    SETUPS = []
+    @pytest.fixture(scope='session')
+    def base():
+        SETUPS.append('base')
+        return 2
+    @pytest.fixture(scope='session')
+    def dataset(base):
+        SETUPS.append('dataset')
+        return [base, 3]
+    def test_dataset(dataset):
+        assert dataset == [2, 3]
+    """)
+
+    FAILING_FIXTURE_TEST_SRC = utils.f("""
+    import pytest
+    SETUPS = []
+    @pytest.fixture(scope='session')
+    def dataset():
+        SETUPS.append('dataset')
+        if len(SETUPS) == 1:
+            raise RuntimeError('broken')
+        return [2, 3]
+    def test_dataset(dataset):
+        assert dataset == [2, 3]
+    """)
+
+    def run_twice(self, test_name, ini_source, test_source=TEST_SRC):
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+        with open(os.path.join(test_dir, 'pytest.ini'), 'w') as ini_file:
+            ini_file.write(ini_source)
+        test_path = os.path.join(test_dir, test_name + '.py')
+        with open(test_path, 'w') as test_file:
+            test_file.write(test_source)
+        session = PytestSession([test_path])
+        results = [session.run(PytestMutpyPlugin(skipped_tests=set())) for _ in range(2)]
+        return session.items[0].module.SETUPS, results
+
+    def test_set_up_fixtures_for_every_run(self):
+        setups, results = self.run_twice('test_not_reused_fixtures', '[pytest]\n')
+
+        self.assertEqual(setups, ['base', 'dataset'] * 2)
+        self.assertTrue(all(result.was_successful() for result in results))
+
+    def test_reuse_fixtures(self):
+        setups, results = self.run_twice('test_reused_fixtures', '[pytest]\nmutpy_reuse_fixtures = dataset\n')
+
+        self.assertEqual(setups, ['base', 'dataset'])
+        self.assertTrue(all(result.was_successful() for result in results))
+
+    def test_set_up_failing_reused_fixtures_for_every_run(self):
+        setups, results = self.run_twice('test_failing_reused_fixtures', '[pytest]\nmutpy_reuse_fixtures = dataset\n',
+                                         self.FAILING_FIXTURE_TEST_SRC)
+
+        self.assertEqual(setups, ['dataset'] * 3)
+        self.assertTrue(all(result.was_successful() for result in results))
+
+    def test_unconfigure_on_close(self):
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+        unconfigured_path = os.path.join(test_dir, 'unconfigured')
+        with open(os.path.join(test_dir, 'conftest.py'), 'w') as conftest_file:
+            conftest_file.write(utils.f("""
+            def pytest_unconfigure(config):
+                open({!r}, 'w').close()
+            """.format(unconfigured_path)))
+        test_path = os.path.join(test_dir, 'test_unconfigured.py')
+        with open(test_path, 'w') as test_file:
+            test_file.write('def test_nothing():\n    pass\n')
+        session = PytestSession([test_path])
+
+        session.close()
+
+        self.assertTrue(os.path.exists(unconfigured_path))
+
+
+class UnittestTestSuiteSelectTestsTest(unittest.TestCase):
+    TEST_SRC = utils.f("""
+        from unittest import TestCase
+        class MulTest(TestCase):
+            def test_a(self):
+                pass
+            def test_b(self):
+                pass
+            def test_c(self):
+                pass
+            def test_d(self):
+                pass
+        """)
+
+    def create_suite(self):
+        test_module = utils.create_module(utils.create_ast(self.TEST_SRC), module_name='test')
+        suite = UnittestTestRunner.test_suite_cls()
+        suite.add_tests(test_module, None)
+        tests = {test.internal_test_obj._testMethodName: test.internal_test_obj for test in suite}
+        test_kills = KillCounter()
+        test_kills.kills[str(tests['test_c']), 'operator:AOR'] = 1
+        return suite, tests, test_kills
+
+    def get_test_names(self, suite):
+        return [test.internal_test_obj._testMethodName for test in suite]
+
+    def test_select_covering_tests(self):
+        suite, tests, test_kills = self.create_suite()
+        selection = MutantTestSelection(
+            covering_tests={repr(tests['test_a']), repr(tests['test_c'])},
+            known_tests={repr(tests['test_a']), repr(tests['test_b']), repr(tests['test_c'])},
+            test_kills=test_kills,
+            kill_keys=['operator:AOR'],
+            test_durations={str(tests['test_a']): 2, str(tests['test_d']): 1},
+        )
+
+        suite.select_tests(selection)
+
+        self.assertEqual(self.get_test_names(suite), ['test_c', 'test_d', 'test_a'])
+
+    def test_order_all_tests(self):
+        suite, tests, test_kills = self.create_suite()
+        selection = MutantTestSelection(
+            test_kills=test_kills,
+            kill_keys=['line:target:1'],
+            test_durations={str(tests['test_a']): 3, str(tests['test_b']): 2, str(tests['test_c']): 4,
+                            str(tests['test_d']): 1},
+        )
+
+        suite.select_tests(selection)
+
+        self.assertEqual(self.get_test_names(suite), ['test_d', 'test_b', 'test_a', 'test_c'])
+
+
+class KillCounterTest(unittest.TestCase):
+
+    def test_count_kills(self):
+        test_kills = KillCounter()
+        mutation = operators.Mutation(operators.ArithmeticOperatorReplacement, ast.Add(lineno=3))
+        test_kills.mutation(1, [mutation], types.ModuleType('target'), None)
+        test_kills.killed(0.1, 'test_x', None, 1)
+        test_kills.mutation(2, [mutation], types.ModuleType('other'), None)
+        test_kills.killed(0.1, 'test_x', None, 1)
+
+        self.assertEqual(test_kills.count('test_x', ['operator:AOR']), 2)
+        self.assertEqual(test_kills.count('test_x', ['line:target:3']), 1)
+        self.assertEqual(test_kills.count('test_x', ['operator:AOR', 'line:other:3']), 3)
+        self.assertEqual(test_kills.count('test_y', ['operator:AOR']), 0)
+
+
+class TimeBudgetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.runner = UnittestTestRunner(None, 5, utils.StdoutManager(True), False, timeout_floor=0.5)
+        self.suite = UnittestTestSuiteSelectTestsTest().create_suite()[0]
+
+    def test_budget_without_tests_durations(self):
+        self.assertEqual(self.runner.get_time_budget(self.suite, total_duration=3), 15)
+        self.assertEqual(self.runner.get_time_budget(self.suite, total_duration=0.1), 5)
+
+    def test_budget_of_selected_tests(self):
+        tests = {test.internal_test_obj._testMethodName: test.internal_test_obj for test in self.suite}
+        self.runner.test_durations = {str(tests['test_a']): 0.1, str(tests['test_b']): 0.2, str(tests['test_c']): 0.3,
+                                      str(tests['test_d']): 4}
+        self.suite.select_tests(MutantTestSelection(covering_tests={repr(tests['test_b'])},
+                                                    known_tests={repr(test) for test in tests.values()}))
+
+        self.assertAlmostEqual(self.runner.get_time_budget(self.suite, total_duration=4.6), 5 * (0.2 + 4))
+
+    def test_budget_with_suite_overhead(self):
+        tests = {test.internal_test_obj._testMethodName: test.internal_test_obj for test in self.suite}
+        self.runner.test_durations = {str(test): 0.01 for test in tests.values()}
+        self.suite.select_tests(MutantTestSelection(covering_tests={repr(tests['test_b'])},
+                                                    known_tests={repr(test) for test in tests.values()}))
+
+        self.assertAlmostEqual(self.runner.get_time_budget(self.suite, total_duration=2.04), 5 * (2 + 0.01 + 0.01))
+
+    def test_budget_floor(self):
+        self.runner.test_durations = {'test_x': 0.01}
+
+        self.assertEqual(self.runner.get_time_budget(self.suite, total_duration=0.01), 0.5)
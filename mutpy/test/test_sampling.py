@@ -0,0 +1,79 @@
+import unittest
+
+from mutpy import controller, sampling
+
+
+class WilsonIntervalTest(unittest.TestCase):
+
+    def test_interval(self):
+        low, high = sampling.wilson_interval(50, 100, 1.96)
+
+        self.assertAlmostEqual(low, 40.4, places=1)
+        self.assertAlmostEqual(high, 59.6, places=1)
+
+    def test_interval_of_all_successes(self):
+        low, high = sampling.wilson_interval(10, 10, 1.96)
+
+        self.assertAlmostEqual(low, 72.2, places=1)
+        self.assertEqual(high, 100)
+
+    def test_interval_without_trials(self):
+        self.assertEqual(sampling.wilson_interval(0, 0, 1.96), (0, 100))
+
+
+class ZScoreTest(unittest.TestCase):
+
+    def test_z_score(self):
+        self.assertAlmostEqual(sampling.get_z_score(95), 1.96, places=2)
+        self.assertAlmostEqual(sampling.get_z_score(99), 2.576, places=3)
+
+
+class StratifiedOrderTest(unittest.TestCase):
+
+    def test_order(self):
+        small_stratum = list(range(10))
+        big_stratum = list(range(100, 130))
+
+        order = list(sampling.stratified_order([small_stratum, big_stratum, []]))
+
+        self.assertEqual(sorted(order), small_stratum + big_stratum)
+        for length in range(4, len(order) + 1, 4):
+            self.assertAlmostEqual(sum(item in small_stratum for item in order[:length]), length / 4, delta=1)
+
+    def test_same_order_with_same_seed(self):
+        strata = [list(range(10)), list(range(100, 130))]
+
+        self.assertEqual(list(sampling.stratified_order(strata, seed=7)),
+                         list(sampling.stratified_order(strata, seed=7)))
+
+
+class ScoreEstimatorTest(unittest.TestCase):
+
+    def create_score(self, killed, survived, incompetent=0):
+        score = controller.MutationScore()
+        score.killed_mutants = killed
+        score.survived_mutants = survived
+        score.incompetent_mutants = incompetent
+        return score
+
+    def test_get_interval(self):
+        estimator = sampling.ScoreEstimator(margin=10)
+
+        low, high = estimator.get_interval(self.create_score(killed=50, survived=50, incompetent=20))
+
+        self.assertAlmostEqual(low, 40.4, places=1)
+        self.assertAlmostEqual(high, 59.6, places=1)
+
+    def test_is_precise(self):
+        estimator = sampling.ScoreEstimator(margin=10)
+
+        self.assertTrue(estimator.is_precise(self.create_score(killed=50, survived=50)))
+        self.assertFalse(estimator.is_precise(self.create_score(killed=5, survived=5)))
+
+    def test_confidence(self):
+        score = self.create_score(killed=50, survived=50)
+
+        low, high = sampling.ScoreEstimator(margin=10, confidence=99).get_interval(score)
+
+        self.assertLess(low, 40.4)
+        self.assertGreater(high, 59.6)
@@ -0,0 +1,90 @@
+import ast
+import types
+import unittest
+
+from mutpy import operators, schemata, utils
+
+
+class StoreNameOperator(operators.MutationOperator):
+
+    def mutate_Name(self, node):
+        return ast.Name(id=node.id, ctx=ast.Store())
+
+
+class MutantSchemataTest(unittest.TestCase):
+    SOURCE = utils.f("""
+    offset = 1 + 2
+
+
+    def add(x, y):
+        return x + y
+
+
+    class Counter:
+
+        def increment(self, enabled=True):
+            if enabled:
+                self.value = 1 - 2
+    """)
+
+    def create_schemata(self, mutation_operators):
+        target_ast = utils.create_ast(self.SOURCE)
+        target_module = types.ModuleType('target')
+        mutants = []
+        mutant_schemata = schemata.MutantSchemata(target_ast, target_module.__name__)
+        site_index = operators.MutationSiteIndex(mutation_operators, target_ast)
+        for op in mutation_operators:
+            for mutation, _ in op().mutate(target_ast, module=target_module, sites=site_index.get_sites(op)):
+                mutant_schemata.add_mutant(mutation, site_index.get_site(mutation.node))
+                mutants.append([mutation])
+        return mutant_schemata, mutants
+
+    def test_switch_expression(self):
+        mutant_schemata, mutants = self.create_schemata([operators.ArithmeticOperatorReplacement])
+        module = mutant_schemata.create_module()
+        mutant_id = mutant_schemata.get_mutant_id(mutants[1])
+
+        with mutant_schemata.activate(mutant_id) as mutant_module:
+            self.assertEqual(mutant_module.add(3, 2), 1)
+            self.assertEqual(module.add(3, 2), 1)
+
+        self.assertEqual(module.add(3, 2), 5)
+        self.assertEqual(module.offset, 3)
+        self.assertIn('return x - y if __mutpy_active__ == {} else x + y'.format(mutant_id),
+                      ast.unparse(mutant_schemata.create_ast()))
+
+    def test_switch_statement(self):
+        mutant_schemata, mutants = self.create_schemata([operators.ConditionalOperatorInsertion])
+        module = mutant_schemata.create_module()
+        counter = module.Counter()
+
+        with mutant_schemata.activate(mutant_schemata.get_mutant_id(mutants[0])):
+            counter.increment()
+
+        self.assertFalse(hasattr(counter, 'value'))
+        counter.increment()
+        self.assertEqual(counter.value, -1)
+
+    def test_not_switch_module_level_mutants(self):
+        mutant_schemata, mutants = self.create_schemata([operators.ArithmeticOperatorReplacement])
+
+        self.assertIsNone(mutant_schemata.get_mutant_id(mutants[0]))
+        self.assertEqual(len(mutant_schemata.mutant_ids), 2)
+
+    def test_remove_invalid_mutants(self):
+        mutant_schemata, mutants = self.create_schemata([operators.ArithmeticOperatorReplacement, StoreNameOperator])
+
+        module = mutant_schemata.create_module()
+
+        self.assertEqual(module.add(3, 2), 5)
+        self.assertIsNotNone(mutant_schemata.get_mutant_id(mutants[1]))
+        self.assertEqual({mutant_schemata.get_mutant_id(mutant) for mutant in mutants[3:]}, {None})
+
+    def test_find_switch_node_of_assignment_target(self):
+        target_ast = utils.create_ast(self.SOURCE)
+        assign_node = target_ast.body[2].body[0].body[0].body[0]
+
+        switch_node = schemata.find_switch_node(assign_node.targets[0], ast.Name(id='value', ctx=ast.Store()))
+
+        self.assertIs(switch_node, assign_node)
+        self.assertIs(schemata.find_switch_node(assign_node.value.op, ast.Add()), assign_node.value)
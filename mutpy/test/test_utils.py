@@ -4,6 +4,7 @@ import shutil
 import types
 import tempfile
 import sys
+import time
 from mutpy import utils, operators
 
 
@@ -122,6 +123,63 @@ class TimeRegisterTest(unittest.TestCase):
 
         self.assertEqual(MockTimeRegister.executions['foo'], 1)
 
+    def test_profiler(self):
+        times = []
+
+        class ProfilerMock:
+            def add_time(self, method_name, wall, cpu):
+                times.append((method_name, wall))
+
+        @MockTimeRegister
+        def foo(x):
+            if x:
+                bar()
+
+        @MockTimeRegister
+        def bar():
+            foo(0)
+
+        MockTimeRegister.profiler = ProfilerMock()
+        self.addCleanup(setattr, MockTimeRegister, 'profiler', None)
+        foo(1)
+
+        self.assertEqual(times, [('bar', 1), ('foo', 1)])
+
+
+class CreateAstTest(unittest.TestCase):
+
+    def test_preorder_intervals(self):
+        module_node = utils.create_ast('x = 1 + 2\ny = 3')
+        assign_node, other_assign_node = module_node.body
+        operand_node = assign_node.value.left
+
+        self.assertTrue(utils.is_descendant(operand_node, module_node))
+        self.assertTrue(utils.is_descendant(operand_node, assign_node))
+        self.assertFalse(utils.is_descendant(operand_node, other_assign_node))
+        self.assertFalse(utils.is_descendant(assign_node, assign_node))
+        self.assertFalse(utils.is_descendant(module_node, assign_node))
+
+    def test_copy_shared_nodes(self):
+        module_node = utils.create_ast('x + y')
+        left_ctx, right_ctx = module_node.body[0].value.left.ctx, module_node.body[0].value.right.ctx
+
+        self.assertIsNot(left_ctx, right_ctx)
+        self.assertNotEqual(left_ctx.preorder, right_ctx.preorder)
+
+    def test_create_module_ast(self):
+        module_node = utils.create_module_ast(utils.create_ast('x = 1').body)
+        namespace = {}
+
+        exec(compile(module_node, 'module', 'exec'), namespace)
+
+        self.assertEqual(namespace['x'], 1)
+
+    def test_not_descendant_from_other_tree(self):
+        module_node = utils.create_ast('x = 1')
+        other_module_node = utils.create_ast('x = 1')
+
+        self.assertFalse(utils.is_descendant(other_module_node.body[0], module_node))
+
 
 class GetByPythonVersionTest(unittest.TestCase):
 
@@ -175,6 +233,19 @@ class TestF(unittest.TestCase):
         """), 'def f():\n    pass')
 
 
+class PercentileTest(unittest.TestCase):
+
+    def test_percentile(self):
+        values = [5, 1, 4, 2, 3, 6, 8, 7, 10, 9]
+
+        self.assertEqual(utils.percentile(values, 50), 5)
+        self.assertEqual(utils.percentile(values, 95), 10)
+        self.assertEqual(utils.percentile(values, 0), 1)
+
+    def test_percentile_of_empty_values(self):
+        self.assertEqual(utils.percentile([], 95), 0)
+
+
 class InjectImporterTest(unittest.TestCase):
 
     def test_inject(self):
@@ -199,3 +270,108 @@ class InjectImporterTest(unittest.TestCase):
 
         del sys.modules['source']
         importer.uninstall()
+
+
+class ModuleInjectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.source_module = utils.create_module(utils.create_ast('def mul(x): return x * x\nFACTOR = 2'),
+                                                 module_name='source')
+        self.source_module.__file__ = 'source.py'
+        self.test_module = types.ModuleType('test')
+        self.test_module.source = self.source_module
+        self.test_module.mul = self.source_module.mul
+        self.test_module.FACTOR = self.source_module.FACTOR
+        self.test_module.other = 1
+        self.injector = utils.ModuleInjector(self.source_module, [self.test_module])
+
+    def test_find_references(self):
+        references = [imported_as for _, imported_as, _ in self.injector.references]
+
+        self.assertTrue({'source', 'mul', 'FACTOR'}.issubset(references))
+        self.assertNotIn('other', references)
+        self.assertNotIn('__name__', references)
+
+    def test_inject_and_restore(self):
+        mutant_module = utils.create_module(utils.create_ast('def mul(x): return x + x\nFACTOR = 3'),
+                                            module_name='source')
+
+        self.injector.inject_to(mutant_module)
+
+        self.assertIs(self.test_module.source, mutant_module)
+        self.assertEqual(mutant_module.__file__, 'source.py')
+        self.assertIs(self.test_module.mul, mutant_module.mul)
+        self.assertEqual(self.test_module.FACTOR, 3)
+
+        self.injector.restore()
+
+        self.assertIs(self.test_module.source, self.source_module)
+        self.assertIs(self.test_module.mul, self.source_module.mul)
+        self.assertEqual(self.test_module.FACTOR, 2)
+        self.assertEqual(self.test_module.other, 1)
+
+    def test_skip_missing_member(self):
+        mutant_module = utils.create_module(utils.create_ast('FACTOR = 3'), module_name='source')
+
+        self.injector.inject_to(mutant_module)
+
+        self.assertIs(self.test_module.mul, self.source_module.mul)
+
+
+class SerializableResultMock:
+
+    def __init__(self, value):
+        self.value = value
+
+    def serialize(self):
+        return self.value
+
+
+class SuiteMock:
+
+    def __init__(self, value=None, sleep=0):
+        self.value = value
+        self.sleep = sleep
+
+    def run(self):
+        time.sleep(self.sleep)
+        return SerializableResultMock(self.value)
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+class MutationTestRunnerForkTest(unittest.TestCase):
+
+    def test_get_result(self):
+        runner = utils.MutationTestRunnerFork(suite=SuiteMock(value=('result',)))
+
+        runner.start()
+        result = runner.get_result(live_time=5)
+        runner.terminate()
+
+        self.assertEqual(result, ('result',))
+
+    def test_timeout(self):
+        runner = utils.MutationTestRunnerFork(suite=SuiteMock(sleep=10))
+
+        runner.start()
+        result = runner.get_result(live_time=0.1)
+        runner.terminate()
+
+        self.assertIsNone(result)
+        self.assertIsNone(runner.pid)
+
+    def test_child_changes_not_visible_in_parent(self):
+        state = {'value': 'original'}
+
+        class ChangingSuite:
+            def run(self):
+                state['value'] = 'changed'
+                return SerializableResultMock(('result',))
+
+        runner = utils.MutationTestRunnerFork(suite=ChangingSuite())
+
+        runner.start()
+        runner.get_result(live_time=5)
+        runner.terminate()
+
+        self.assertEqual(state['value'], 'original')
@@ -1,9 +1,14 @@
+import ast
+import os
+import shutil
 import sys
+import tempfile
 import unittest
 from contextlib import contextmanager
 from io import StringIO
 
-from mutpy import utils
+from mutpy import operators, utils
+from mutpy import views
 from mutpy.views import QuietTextView, TextView
 
 COLOR_RED = 'red'
@@ -58,3 +63,74 @@ class TextViewTest(unittest.TestCase):
             self.SEPARATOR + self.EOL + '- 1: x = x + 1' + self.EOL + '+ 1: x = x - 1' + self.EOL + self.SEPARATOR,
             output
         )
+
+
+class JSONLReportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.report_dir = tempfile.mkdtemp()
+        self.report_file = os.path.join(self.report_dir, 'report.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.report_dir)
+
+    def test_restore_mutant_code(self):
+        source_lines = ['def f(x):', '    y = x + 1', '    return y']
+        mutant_diff = [[1, 2, ['    y = x - 1']], [3, 3, ['f(1)']]]
+
+        mutant_code = views.restore_mutant_code(source_lines, mutant_diff)
+
+        self.assertEqual(mutant_code, 'def f(x):\n    y = x - 1\n    return y\nf(1)')
+
+    @unittest.skipUnless(hasattr(ast, 'unparse'), 'requires ast.unparse')
+    def test_create_mutant_diff_of_mutated_statements(self):
+        source = utils.f('''
+        from functools import lru_cache
+        LIMIT = 10 + 1
+
+
+        class Counter:
+            """Counts calls."""
+
+            @lru_cache()
+            def count(self, x):
+                if x > LIMIT: return x - 1  # large
+                total = 0
+                for i in range(x):
+                    total += i * 2
+                return total
+        x = 1; y = x + 2
+        ''')
+        source_lines = source.split('\n')
+        target_ast = utils.create_ast(source)
+        mutants = 0
+
+        for operator in operators.standard_operators | operators.experimental_operators:
+            for mutation, mutant in operator().mutate(target_ast):
+                mutant_diff = views.create_mutant_diff(source_lines, [mutation], mutant)
+
+                mutant_code = views.restore_mutant_code(source_lines, mutant_diff)
+                self.assertEqual(ast.dump(ast.parse(mutant_code)), ast.dump(ast.parse(ast.unparse(mutant))))
+                mutants += 1
+
+        self.assertGreater(mutants, 10)
+
+    @unittest.skipUnless(hasattr(ast, 'unparse'), 'requires ast.unparse')
+    def test_create_mutant_diff_renders_only_mutated_statement(self):
+        source = utils.f('''
+        def f(x):
+            y = x + 1  # comment
+            return y
+        ''')
+        source_lines = source.split('\n')
+        mutation, mutant = next(operators.ArithmeticOperatorReplacement().mutate(utils.create_ast(source)))
+
+        self.assertEqual(views.create_mutant_diff(source_lines, [mutation], mutant), [[1, 2, ['    y = x - 1']]])
+
+    def test_read_truncated_report(self):
+        with open(self.report_file, 'w') as report_file:
+            report_file.write('{"type": "initialize"}\n{"type": "mut')
+
+        records = list(views.read_jsonl_report(self.report_file))
+
+        self.assertEqual(records, [{'type': 'initialize'}])
@@ -18,6 +18,8 @@ def __pytest_not_installed(*args, **kwargs):
 
 
 if pytest_installed():
-    from .pytest_runner import PytestTestRunner
+    from .pytest_runner import PytestTestRunner, PytestSessionTestRunner, pytest_session_supported
 else:
     PytestTestRunner = __pytest_not_installed
+    PytestSessionTestRunner = __pytest_not_installed
+    pytest_session_supported = __pytest_not_installed
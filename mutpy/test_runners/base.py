@@ -1,6 +1,6 @@
 import sys
 from abc import abstractmethod
-from collections import namedtuple
+from collections import namedtuple, Counter
 
 from mutpy import utils, coverage
 
@@ -14,6 +14,14 @@ class BaseTestSuite:
     def skip_test(self, test):
         pass
 
+    @abstractmethod
+    def select_tests(self, selection):
+        pass
+
+    @abstractmethod
+    def get_selected_tests(self, known_tests):
+        pass
+
     @abstractmethod
     def run(self):
         pass
@@ -27,6 +35,60 @@ class BaseTestSuite:
         pass
 
 
+class KillCounter:
+    """Number of mutants killed by each test per mutation operator and per mutated line.
+
+    It is notified about mutants like views, so kills are counted in mutations order also when mutants
+    are run in parallel.
+    """
+
+    def __init__(self):
+        self.kills = Counter()
+        self.current_keys = []
+
+    @staticmethod
+    def get_keys(mutations, module_name):
+        keys = []
+        for mutation in mutations:
+            keys.append('operator:{}'.format(mutation.operator.name()))
+            lineno = getattr(mutation.node, 'lineno', None)
+            if lineno is not None:
+                keys.append('line:{}:{}'.format(module_name, lineno))
+        return keys
+
+    def mutation(self, number, mutations, module, mutant):
+        self.current_keys = self.get_keys(mutations, module.__name__)
+
+    def killed(self, time, killer, *args, **kwargs):
+        for key in self.current_keys:
+            self.kills[killer, key] += 1
+
+    def count(self, test_name, keys):
+        return sum(self.kills[test_name, key] for key in keys)
+
+
+class MutantTestSelection:
+    """Tests to run with a mutant and their order.
+
+    If covering tests are given, only them and tests without coverage data (e.g. added after coverage was
+    measured) are selected. Tests which killed mutants of the same operator or line go first, followed by
+    the fastest tests.
+    """
+
+    def __init__(self, covering_tests=None, known_tests=(), test_kills=None, kill_keys=(), test_durations=None):
+        self.covering_tests = covering_tests
+        self.known_tests = known_tests
+        self.test_kills = test_kills or KillCounter()
+        self.kill_keys = kill_keys
+        self.test_durations = test_durations or {}
+
+    def is_selected(self, test_id):
+        return self.covering_tests is None or test_id in self.covering_tests or test_id not in self.known_tests
+
+    def get_priority(self, test_name):
+        return -self.test_kills.count(test_name, self.kill_keys), self.test_durations.get(test_name, 0)
+
+
 class BaseTest:
 
     @abstractmethod
@@ -39,7 +101,7 @@ class CoverageTestResult:
     def __init__(self, *args, coverage_injector=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.coverage_injector = coverage_injector
-        self.always_covered_nodes = coverage_injector.covered_nodes.copy()
+        self.always_covered_nodes = coverage.to_bitset(coverage_injector.covered_nodes)
         self.test_covered_nodes = {}
 
     def start_measure_coverage(self):
@@ -47,7 +109,8 @@ class CoverageTestResult:
         self.coverage_injector.covered_nodes.clear()
 
     def stop_measure_coverage(self, test):
-        self.test_covered_nodes[repr(test)] = self.coverage_injector.covered_nodes.copy() | self.always_covered_nodes
+        self.test_covered_nodes[repr(test)] = (coverage.to_bitset(self.coverage_injector.covered_nodes) |
+                                               self.always_covered_nodes)
         self.coverage_injector.covered_nodes.update(self.covered_nodes)
 
 
@@ -71,6 +134,7 @@ class MutationTestResult:
         self.failed = []
         self.type_error = None
         self.skipped = []
+        self.test_durations = {}
 
     def was_successful(self):
         return len(self.failed) == 0 and not self.is_incompetent()
@@ -126,6 +190,9 @@ class MutationTestResult:
     def add_failed(self, name, short_message, long_message):
         self.failed.append(TestFailure(name, short_message, long_message))
 
+    def add_duration(self, name, duration):
+        self.test_durations[name] = duration
+
 
 class TestInfo:
     def __init__(self, name):
@@ -142,40 +209,86 @@ class TestFailure(TestInfo):
 class BaseTestRunner:
     test_suite_cls = None
 
-    def __init__(self, test_loader, timeout_factor, stdout_manager, mutate_covered):
+    def __init__(self, test_loader, timeout_factor, stdout_manager, mutate_covered, select_tests=False,
+                 kill_first=False, timeout_floor=1, timeout_percentile=95, coverage_backend='ast'):
         self.test_loader = test_loader
         self.timeout_factor = timeout_factor
+        self.timeout_floor = timeout_floor
+        self.timeout_percentile = timeout_percentile
         self.stdout_manager = stdout_manager
         self.mutate_covered = mutate_covered
+        self.select_tests = select_tests
+        self.kill_first = kill_first
+        self.coverage_injector_cls = coverage.COVERAGE_BACKENDS[coverage_backend]
+        self.test_kills = KillCounter()
+        self.test_durations = {}
+        self.test_modules = None
+        self.module_injectors = {}
         self.init_modules = self.find_init_modules()
 
     def create_empty_test_suite(self):
         return self.test_suite_cls()
 
-    def create_test_suite(self, mutant_module):
+    @utils.TimeRegister
+    def create_test_suite(self, *mutant_modules):
         if not issubclass(self.test_suite_cls, BaseTestSuite):
             raise ValueError('{0} is not a subclass of {1}'.format(self.test_suite_cls, BaseTestSuite))
         suite = self.create_empty_test_suite()
-        injector = utils.ModuleInjector(mutant_module)
-        for test_module, target_test in self.test_loader.load():
-            injector.inject_to(test_module)
+        for mutant_module in mutant_modules:
+            self.get_module_injector(mutant_module).inject_to(mutant_module)
+        for test_module, target_test in self.load_test_modules():
             suite.add_tests(test_module, target_test)
-        importer = utils.InjectImporter(mutant_module)
+        importer = utils.InjectImporter(*mutant_modules)
         importer.install()
         return suite
 
+    def load_test_modules(self):
+        if self.test_modules is None:
+            self.test_modules = list(self.test_loader.load())
+        return self.test_modules
+
+    def get_module_injector(self, mutant_module):
+        if mutant_module.__name__ not in self.module_injectors:
+            test_modules = [test_module for test_module, _ in self.load_test_modules()]
+            self.module_injectors[mutant_module.__name__] = utils.ModuleInjector(mutant_module, test_modules)
+        return self.module_injectors[mutant_module.__name__]
+
+    def restore_test_modules(self, *mutant_modules):
+        for mutant_module in mutant_modules:
+            self.get_module_injector(mutant_module).restore()
+
     @utils.TimeRegister
     def run_tests_with_mutant(self, total_duration, mutant_module, mutations, coverage_result):
         suite = self.create_test_suite(mutant_module)
-        if coverage_result:
-            self.mark_not_covered_tests_as_skip(mutations, coverage_result, suite)
-        timer = utils.Timer()
-        result = self.run_mutation_test_runner(suite, total_duration)
-        timer.stop()
-        return result, timer.duration
+        try:
+            selection = self.create_test_selection(mutations, mutant_module.__name__, coverage_result)
+            if selection:
+                suite.select_tests(selection)
+            time_budget = self.get_time_budget(suite, total_duration)
+            timer = utils.Timer()
+            result = self.run_mutation_test_runner(suite, time_budget)
+            timer.stop()
+        finally:
+            self.restore_test_modules(mutant_module)
+        return result, timer.duration, time_budget
+
+    def get_time_budget(self, suite, total_duration):
+        """Return the time budget of a mutant from durations of the tests it runs.
+
+        Time of the original run which is not spent in tests (e.g. building the suite or starting the test
+        framework) is added as the fixed cost of every run.
+        """
+        if not self.test_durations:
+            return self.timeout_factor * (total_duration if total_duration > 1 else 1)
+        slack = utils.percentile(self.test_durations.values(), self.timeout_percentile)
+        overhead = max(0, total_duration - sum(self.test_durations.values()))
+        expected_duration = overhead + slack
+        for test in suite.get_selected_tests(self.test_durations):
+            expected_duration += self.test_durations.get(test, slack)
+        return max(self.timeout_floor, self.timeout_factor * expected_duration)
 
-    def run_mutation_test_runner(self, suite, total_duration):
-        live_time = self.timeout_factor * (total_duration if total_duration > 1 else 1)
+    @utils.TimeRegister
+    def run_mutation_test_runner(self, suite, live_time):
         test_runner_class = utils.get_mutation_test_runner_class()
         test_runner = test_runner_class(suite=suite)
         with self.stdout_manager:
@@ -185,14 +298,36 @@ class BaseTestRunner:
         return result
 
     def inject_coverage(self, target_ast, target_module):
-        if not self.mutate_covered:
+        if not self.requires_coverage():
             return None, None
+        return self.inject_modules_coverage([(target_ast, target_module)])[0]
+
+    def inject_modules_coverage(self, targets):
+        """Measure coverage of all target modules with one run of tests.
+
+        Return the coverage injector and tests coverage index of each module.
+        """
+        coverage_injectors = [self.coverage_injector_cls() for _ in targets]
+        coverage_modules = [coverage_injector.inject(target_ast, target_module.__name__)
+                            for coverage_injector, (target_ast, target_module) in zip(coverage_injectors, targets)]
+        modules_coverage_injector = coverage.ModulesCoverageInjector(coverage_injectors)
+        suite = self.create_test_suite(*coverage_modules)
+        try:
+            with self.stdout_manager, modules_coverage_injector:
+                coverage_result = suite.run_with_coverage(coverage_injector=modules_coverage_injector)
+        finally:
+            self.restore_test_modules(*coverage_modules)
+        modules_test_covered_nodes = modules_coverage_injector.split_result(coverage_result.test_covered_nodes)
+        return [(coverage_injector, coverage.TestsCoverageIndex(test_covered_nodes))
+                for coverage_injector, test_covered_nodes in zip(coverage_injectors, modules_test_covered_nodes)]
+
+    def restore_coverage(self, target_ast, covered_nodes, test_covered_nodes):
         coverage_injector = coverage.CoverageInjector()
-        coverage_module = coverage_injector.inject(target_ast, target_module.__name__)
-        suite = self.create_test_suite(coverage_module)
-        with self.stdout_manager:
-            coverage_result = suite.run_with_coverage(coverage_injector=coverage_injector)
-        return coverage_injector, coverage_result
+        coverage_injector.restore(target_ast, covered_nodes)
+        return coverage_injector, coverage.TestsCoverageIndex(test_covered_nodes)
+
+    def requires_coverage(self):
+        return self.mutate_covered or self.select_tests
 
     def run_test(self, test_module, target_test):
         suite = self.create_empty_test_suite()
@@ -200,13 +335,15 @@ class BaseTestRunner:
         timer = utils.Timer()
         with self.stdout_manager:
             result = suite.run()
+        self.test_durations.update(result.test_durations)
         return result, timer.stop()
 
     def find_init_modules(self):
         test_runner_class = utils.get_mutation_test_runner_class()
-        test_runner = test_runner_class(suite=self.create_empty_test_suite())
-        test_runner.start()
-        test_runner.terminate()
+        if test_runner_class.requires_warm_up:
+            test_runner = test_runner_class(suite=self.create_empty_test_suite())
+            test_runner.start()
+            test_runner.terminate()
         return list(sys.modules.keys())
 
     def remove_loaded_modules(self):
@@ -214,11 +351,13 @@ class BaseTestRunner:
             if module not in self.init_modules:
                 del sys.modules[module]
 
-    def mark_not_covered_tests_as_skip(self, mutations, coverage_result, suite):
-        mutated_nodes = {mutation.node.marker for mutation in mutations}
-
-        for test in suite:
-            test_id = repr(test)
-            if test_id in coverage_result.test_covered_nodes and mutated_nodes.isdisjoint(
-                    coverage_result.test_covered_nodes[test_id]):
-                suite.skip_test(test)
+    def create_test_selection(self, mutations, module_name, coverage_result):
+        covering_tests, known_tests = None, ()
+        mutated_nodes = {getattr(mutation.node, 'marker', None) for mutation in mutations}
+        if coverage_result and None not in mutated_nodes:
+            covering_tests = coverage_result.find_tests(mutated_nodes)
+            known_tests = coverage_result.test_covered_nodes
+        elif not self.kill_first:
+            return None
+        return MutantTestSelection(covering_tests, known_tests, self.test_kills,
+                                   KillCounter.get_keys(mutations, module_name), self.test_durations)
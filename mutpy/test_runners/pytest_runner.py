@@ -1,13 +1,24 @@
+import atexit
+import functools
+
 import pytest
-from _pytest.config import default_plugins
 
+try:
+    from _pytest.config import default_plugins, _prepareconfig
+    from _pytest.main import Session
+    from _pytest.runner import SetupState
+except ImportError:
+    _prepareconfig = None
+
+from mutpy import utils
 from mutpy.test_runners.base import BaseTestSuite, BaseTestRunner, MutationTestResult, CoverageTestResult, BaseTest
 
 
 class PytestMutpyPlugin:
 
-    def __init__(self, skipped_tests):
+    def __init__(self, skipped_tests, selection=None):
         self.skipped_tests = skipped_tests
+        self.selection = selection
         self.mutation_test_result = MutationTestResult()
 
     def has_failed_before(self, nodeid):
@@ -16,12 +27,20 @@ class PytestMutpyPlugin:
     def has_been_skipped_before(self, nodeid):
         return next((test for test in self.mutation_test_result.skipped if test.name == nodeid), None) is not None
 
-    def pytest_collection_modifyitems(self, items):
+    def pytest_collection_modifyitems(self, config, items):
         for item in items:
             if item.nodeid in self.skipped_tests:
                 item.add_marker(pytest.mark.skip)
+        if self.selection:
+            deselected = [item for item in items if not self.selection.is_selected(item.nodeid)]
+            items[:] = sorted((item for item in items if self.selection.is_selected(item.nodeid)),
+                              key=lambda item: self.selection.get_priority(item.nodeid))
+            if deselected:
+                config.hook.pytest_deselected(items=deselected)
 
     def pytest_runtest_logreport(self, report):
+        if report.when == 'call':
+            self.mutation_test_result.add_duration(report.nodeid, report.duration)
         if report.skipped:
             self.mutation_test_result.add_skipped(report.nodeid)
         elif report.failed and not self.has_failed_before(report.nodeid):
@@ -66,6 +85,7 @@ class PytestTestSuite(BaseTestSuite):
     def __init__(self):
         self.tests = set()
         self.skipped_tests = set()
+        self.selection = None
 
     def add_tests(self, test_module, target_test):
         if target_test:
@@ -78,8 +98,14 @@ class PytestTestSuite(BaseTestSuite):
     def skip_test(self, test):
         self.skipped_tests.add(test.internal_test_obj.nodeid)
 
+    def select_tests(self, selection):
+        self.selection = selection
+
+    def get_selected_tests(self, known_tests):
+        return [test for test in known_tests if not self.selection or self.selection.is_selected(test)]
+
     def run(self):
-        mutpy_plugin = PytestMutpyPlugin(skipped_tests=self.skipped_tests)
+        mutpy_plugin = PytestMutpyPlugin(skipped_tests=self.skipped_tests, selection=self.selection)
         pytest.main(args=list(self.tests) + ['-x', '-p', 'no:terminal'], plugins=list(default_plugins) + [mutpy_plugin])
         return mutpy_plugin.mutation_test_result
 
@@ -107,3 +133,184 @@ class PytestTest(BaseTest):
 
 class PytestTestRunner(BaseTestRunner):
     test_suite_cls = PytestTestSuite
+
+
+def pytest_session_supported():
+    """Check if pytest internals used by PytestSession (as of pytest 7.0) are available."""
+    return (_prepareconfig is not None and hasattr(Session, 'from_config') and hasattr(SetupState, 'setup') and
+            hasattr(pytest.Function, '_initrequest'))
+
+
+class PytestMutpySessionPlugin:
+    REUSE_FIXTURES_INI = 'mutpy_reuse_fixtures'
+
+    def pytest_addoption(self, parser):
+        parser.addini(self.REUSE_FIXTURES_INI, type='args', default=[],
+                      help='mutation-safe fixtures (not function scoped) set up once and shared by all mutants')
+
+
+class PytestSession:
+    """Pytest configured and with tests collected once, whose items are run again for every mutant.
+
+    Unlike pytest.main, running tests doesn't load plugins, parse configuration and collect tests
+    again, selected items are just run through the runtest protocol of the open session.
+
+    Fixtures listed in the mutpy_reuse_fixtures ini option (and fixtures they depend on) are set up
+    when the session is opened and their teardown is deferred to the exit, so mutants run in forked
+    processes share their cached values. The session is finished and pytest unconfigured at the exit.
+    """
+
+    def __init__(self, tests):
+        self.config = _prepareconfig(list(tests) + ['-p', 'no:terminal'],
+                                     plugins=list(default_plugins) + [PytestMutpySessionPlugin()])
+        self.config._do_configure()
+        self.session = Session.from_config(self.config)
+        self.config.hook.pytest_sessionstart(session=self.session)
+        self.session.perform_collect()
+        self.items = list(self.session.items)
+        capture_manager = self.config.pluginmanager.getplugin('capturemanager')
+        if capture_manager:
+            capture_manager.suspend_global_capture(in_=True)
+        self.reused_fixtures = {}
+        atexit.register(self.close)
+        self.reuse_fixtures(self.config.getini(PytestMutpySessionPlugin.REUSE_FIXTURES_INI))
+
+    def reuse_fixtures(self, names):
+        if not names:
+            return
+        for item in self.items:
+            name2fixturedefs = getattr(getattr(item, '_fixtureinfo', None), 'name2fixturedefs', {})
+            names_to_reuse = [name for name in names if name in name2fixturedefs]
+            while names_to_reuse:
+                fixturedefs = name2fixturedefs.get(names_to_reuse.pop())
+                if not fixturedefs:
+                    continue
+                fixturedef = fixturedefs[-1]
+                if fixturedef.scope == 'function' or fixturedef.params is not None or \
+                        fixturedef in self.reused_fixtures:
+                    continue
+                self.reused_fixtures[fixturedef] = None
+                fixturedef.finish = functools.partial(self.defer_finish, fixturedef)
+                names_to_reuse.extend(fixturedef.argnames)
+        for item in self.items:
+            if any(fixturedef.cached_result is None for fixturedef in self.get_reused_fixtures(item)):
+                self.set_up(item)
+
+    def get_reused_fixtures(self, item):
+        name2fixturedefs = getattr(getattr(item, '_fixtureinfo', None), 'name2fixturedefs', {})
+        return [fixturedefs[-1] for fixturedefs in name2fixturedefs.values()
+                if fixturedefs and fixturedefs[-1] in self.reused_fixtures]
+
+    def set_up(self, item):
+        """Set up fixtures of the item, reused fixtures which fail are set up again by every test."""
+        failed_fixtures = []
+        try:
+            self.session._setupstate.setup(item)
+        except Exception:
+            failed_fixtures = self.get_reused_fixtures(item)
+        finally:
+            self.session._setupstate.teardown_exact(None)
+            item._initrequest()
+        for fixturedef in failed_fixtures:
+            self.stop_reusing(fixturedef)
+
+    def stop_reusing(self, fixturedef):
+        request = self.reused_fixtures.pop(fixturedef)
+        del fixturedef.finish
+        if request is not None:
+            fixturedef.finish(request)
+        fixturedef.cached_result = None
+
+    def defer_finish(self, fixturedef, request):
+        self.reused_fixtures[fixturedef] = request
+
+    def finish_reused_fixtures(self):
+        for fixturedef, request in list(self.reused_fixtures.items()):
+            del fixturedef.finish
+            if request is not None:
+                fixturedef.finish(request)
+
+    def close(self):
+        atexit.unregister(self.close)
+        try:
+            self.finish_reused_fixtures()
+            self.config.hook.pytest_sessionfinish(session=self.session, exitstatus=0)
+        finally:
+            self.config._ensure_unconfigure()
+
+    def select_items(self, skipped_tests, selection):
+        items = [item for item in self.items if item.nodeid not in skipped_tests]
+        if selection:
+            items = sorted((item for item in items if selection.is_selected(item.nodeid)),
+                           key=lambda item: selection.get_priority(item.nodeid))
+        return items
+
+    def run(self, plugin, skipped_tests=(), selection=None):
+        for item in self.items:
+            if item.nodeid in skipped_tests:
+                plugin.mutation_test_result.add_skipped(item.nodeid)
+        items = self.select_items(skipped_tests, selection)
+        self.config.pluginmanager.register(plugin)
+        try:
+            for index, item in enumerate(items):
+                next_item = items[index + 1] if index + 1 < len(items) else None
+                self.config.hook.pytest_runtest_protocol(item=item, nextitem=next_item)
+                if not plugin.mutation_test_result.was_successful():
+                    break
+        finally:
+            self.session._setupstate.teardown_exact(None)
+            self.config.pluginmanager.unregister(plugin)
+        return plugin.mutation_test_result
+
+
+class PytestSessionTestSuite(PytestTestSuite):
+
+    def __init__(self, sessions=None):
+        super().__init__()
+        self.sessions = {} if sessions is None else sessions
+
+    def get_session(self):
+        """Get session of tests, None if pytest internals it relies on don't work with installed pytest."""
+        key = tuple(sorted(self.tests))
+        if key not in self.sessions:
+            try:
+                self.sessions[key] = PytestSession(key)
+            except (AttributeError, TypeError):
+                self.sessions[key] = None
+        return self.sessions[key]
+
+    def run(self):
+        session = self.get_session()
+        if session is not None:
+            mutpy_plugin = PytestMutpyPlugin(skipped_tests=self.skipped_tests, selection=self.selection)
+            try:
+                return session.run(mutpy_plugin, self.skipped_tests, self.selection)
+            except (AttributeError, TypeError):
+                self.sessions[tuple(sorted(self.tests))] = None
+        return super().run()
+
+    def __iter__(self):
+        session = self.get_session()
+        if session is None:
+            yield from super().__iter__()
+            return
+        for item in session.items:
+            yield PytestTest(item)
+
+
+class PytestSessionTestRunner(PytestTestRunner):
+    test_suite_cls = PytestSessionTestSuite
+
+    def __init__(self, *args, **kwargs):
+        self.sessions = {}
+        super().__init__(*args, **kwargs)
+
+    def create_empty_test_suite(self):
+        return self.test_suite_cls(self.sessions)
+
+    @utils.TimeRegister
+    def create_test_suite(self, *mutant_modules):
+        suite = super().create_test_suite(*mutant_modules)
+        with self.stdout_manager:
+            suite.get_session()
+        return suite
@@ -1,3 +1,4 @@
+import time
 import unittest
 
 from mutpy.test_runners.base import CoverageTestResult, BaseTestSuite, BaseTestRunner, MutationTestResult, BaseTest
@@ -10,6 +11,15 @@ class UnittestMutationTestResult(unittest.TestResult):
         self.type_error = None
         self.failfast = True
         self.mutation_test_result = MutationTestResult()
+        self.test_start = None
+
+    def startTest(self, test):
+        super().startTest(test)
+        self.test_start = time.time()
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        self.mutation_test_result.add_duration(str(test), time.time() - self.test_start)
 
     def addSuccess(self, test):
         super().addSuccess(test)
@@ -86,6 +96,14 @@ class UnittestTestSuite(BaseTestSuite):
         setattr(test.internal_test_obj, test.internal_test_obj._testMethodName,
                 unittest.skip('not covered')(test_method))
 
+    def select_tests(self, selection):
+        tests = [test for test in self.iter_tests(self.suite) if selection.is_selected(repr(test))]
+        tests.sort(key=lambda test: selection.get_priority(str(test)))
+        self.suite = unittest.TestSuite(tests)
+
+    def get_selected_tests(self, known_tests):
+        return [str(test) for test in self.iter_tests(self.suite)]
+
     def run(self):
         result = UnittestMutationTestResult()
         self.suite.run(result)
@@ -105,7 +123,7 @@ class UnittestTestSuite(BaseTestSuite):
     def iter_tests(self, tests):
         try:
             for test in tests:
-                self.iter_tests(test)
+                yield from self.iter_tests(test)
         except TypeError:
             yield tests
 
@@ -1,12 +1,16 @@
+import array
 import ast
 import copy
 import ctypes
 import importlib
 import inspect
 import os
+import pickle
 import pkgutil
 import random
 import re
+import select
+import signal
 import sys
 import time
 import types
@@ -25,6 +29,10 @@ from threading import Thread
 
 def create_module(ast_node, module_name='mutant', module_dict=None):
     code = compile(ast_node, module_name, 'exec')
+    return create_module_from_code(code, module_name, module_dict)
+
+
+def create_module_from_code(code, module_name='mutant', module_dict=None):
     module = types.ModuleType(module_name)
     module.__dict__.update(module_dict or {})
     exec(code, module.__dict__)
@@ -190,22 +198,24 @@ class ModulesLoader:
 
 
 class InjectImporter:
-    def __init__(self, module):
-        try:
-            del sys.modules[module.__name__]
-        except KeyError:
-            pass
-        self.module = module
+    def __init__(self, *modules):
+        for module in modules:
+            try:
+                del sys.modules[module.__name__]
+            except KeyError:
+                pass
+        self.modules = {module.__name__: module for module in modules}
 
     def find_module(self, fullname, path=None):
-        if fullname == self.module.__name__:
+        if fullname in self.modules:
             return self
         else:
             return None
 
     def load_module(self, fullname):
-        self.module.__loader__ = self
-        sys.modules[fullname] = self.module
+        module = self.modules[fullname]
+        module.__loader__ = self
+        sys.modules[fullname] = module
 
     def install(self):
         if isinstance(sys.meta_path[0], self.__class__):
@@ -220,35 +230,50 @@ class InjectImporter:
 
 
 class ModuleInjector:
+    """Replaces references to the source module, its classes, functions and other globals in test modules.
+
+    References are found once, so injecting every next mutant of the same module only patches them and
+    restore brings back the original values.
+    """
+    SOURCE_MODULE = object()
+
+    def __init__(self, source, targets):
+        self.references = []
+        self.original_values = []
+        for target in targets:
+            for imported_as, artifact in target.__dict__.items():
+                name = self.find_reference(imported_as, artifact, source)
+                if name is not None:
+                    self.references.append((target, imported_as, name))
+
+    def find_reference(self, imported_as, artifact, source):
+        if inspect.ismodule(artifact):
+            if self.safe_getattr(artifact, '__name__') == source.__name__:
+                return self.SOURCE_MODULE
+        elif inspect.isclass(artifact) or inspect.isfunction(artifact):
+            if self.safe_getattr(artifact, '__name__') in source.__dict__:
+                return self.safe_getattr(artifact, '__name__')
+        elif imported_as in source.__dict__ and not self.is_restricted(imported_as):
+            return imported_as
+        return None
+
+    def inject_to(self, source):
+        self.restore()
+        for target, imported_as, name in self.references:
+            if name is self.SOURCE_MODULE:
+                source.__file__ = target.__dict__[imported_as].__file__
+                value = source
+            elif name in source.__dict__:
+                value = source.__dict__[name]
+            else:
+                continue
+            self.original_values.append((target, imported_as, target.__dict__[imported_as]))
+            target.__dict__[imported_as] = value
 
-    def __init__(self, source):
-        self.source = source
-
-    def inject_to(self, target):
-        for imported_as in target.__dict__.copy():
-            artifact = target.__dict__[imported_as]
-            self.__perform_injection(imported_as, artifact, target)
-
-    def __perform_injection(self, imported_as, artefact, target):
-        if inspect.ismodule(artefact):
-            self.try_inject_module(imported_as, artefact, target)
-        elif inspect.isclass(artefact) or inspect.isfunction(artefact):
-            self.try_incject_class_or_function(imported_as, artefact, target)
-        else:
-            self.try_inject_other(imported_as, target)
-
-    def try_inject_module(self, imported_as, module, target):
-        if self.safe_getattr(module, '__name__') == self.source.__name__:
-            self.source.__file__ = module.__file__
-            target.__dict__[imported_as] = self.source
-
-    def try_incject_class_or_function(self, imported_as, class_or_function, target):
-        if self.safe_getattr(class_or_function, '__name__') in self.source.__dict__:
-            target.__dict__[imported_as] = self.source.__dict__[self.safe_getattr(class_or_function, '__name__')]
-
-    def try_inject_other(self, imported_as, target):
-        if imported_as in self.source.__dict__ and not self.is_restricted(imported_as):
-            target.__dict__[imported_as] = self.source.__dict__[imported_as]
+    def restore(self):
+        while self.original_values:
+            target, imported_as, value = self.original_values.pop()
+            target.__dict__[imported_as] = value
 
     def is_restricted(self, name):
         return name in ['__builtins__', '__name__', '__doc__', '__file__']
@@ -288,6 +313,7 @@ class TimeRegister:
     executions = defaultdict(float)
     timer_class = Timer
     stack = []
+    profiler = None
 
     def __init__(self, method):
         self.method = method
@@ -301,10 +327,14 @@ class TimeRegister:
 
         self.stack.append(self.method)
         time_reg = self.timer_class()
+        cpu_start = time.process_time()
         result = self.method(*args, **kwargs)
 
-        self.executions[self.method.__name__] += time_reg.stop()
+        duration = time_reg.stop()
+        self.executions[self.method.__name__] += duration
         self.stack.pop()
+        if self.profiler and all(method.__name__ != self.method.__name__ for method in self.stack):
+            self.profiler.add_time(self.method.__name__, duration, time.process_time() - cpu_start)
         return result
 
     @classmethod
@@ -321,7 +351,28 @@ class RandomSampler:
         return random.randrange(100) < self.percentage
 
 
+def percentile(values, percent):
+    values = sorted(values)
+    if not values:
+        return 0
+    index = max(0, min(len(values) - 1, int(round(percent / 100 * len(values))) - 1))
+    return values[index]
+
+
+def make_picklable_result(result):
+    try:
+        pickle.dumps(result)
+    except Exception:
+        exception = result.exception
+        if isinstance(exception, tuple):
+            exception = exception[1]
+        result = result._replace(exception=Exception(repr(exception)))
+    return result
+
+
 class MutationTestRunner:
+    requires_warm_up = True
+
     def __init__(self, suite):
         super().__init__()
         self.suite = suite
@@ -343,7 +394,67 @@ class MutationTestRunnerProcess(MutationTestRunner, Process):
             return None
 
     def set_result(self, result):
-        self.queue.put_nowait(result.serialize())
+        self.queue.put_nowait(make_picklable_result(result.serialize()))
+
+
+class MutationTestRunnerFork(MutationTestRunner):
+    """Runs tests in a copy-on-write child forked from the current (already warmed up) interpreter.
+
+    Test modules and their dependencies are imported once by the parent, so every mutant costs only
+    a fork and a pipe instead of a new multiprocessing process with its queue.
+    """
+    requires_warm_up = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pid = None
+        self.reader = None
+        self.writer = None
+
+    def start(self):
+        read_fd, write_fd = os.pipe()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self.pid = os.fork()
+        if self.pid == 0:
+            os.close(read_fd)
+            self.writer = os.fdopen(write_fd, 'wb')
+            exit_code = 0
+            try:
+                self.run()
+            except BaseException:
+                exit_code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(exit_code)
+        os.close(write_fd)
+        self.reader = os.fdopen(read_fd, 'rb')
+
+    def get_result(self, live_time):
+        ready, _, _ = select.select([self.reader], [], [], live_time)
+        if not ready:
+            return None
+        try:
+            return pickle.load(self.reader)
+        except (EOFError, pickle.UnpicklingError):
+            return None
+
+    def set_result(self, result):
+        pickle.dump(make_picklable_result(result.serialize()), self.writer)
+        self.writer.flush()
+
+    def terminate(self):
+        if self.pid:
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            os.waitpid(self.pid, 0)
+            self.pid = None
+        if self.reader:
+            self.reader.close()
+            self.reader = None
 
 
 class MutationTestRunnerThread(MutationTestRunner, Thread):
@@ -374,26 +485,73 @@ class MutationTestRunnerThread(MutationTestRunner, Thread):
 def get_mutation_test_runner_class():
     if os.name == 'nt':
         return MutationTestRunnerThread
+    elif hasattr(os, 'fork'):
+        return MutationTestRunnerFork
     else:
         return MutationTestRunnerProcess
 
 
+class PreorderIndex:
+    """Side table with the last preorder number in the subtree of each node of a tree.
+
+    A node numbered `node.preorder` spans the numbers up to `ends[node.preorder]`, so checking if a node
+    is a descendant of another one is a range comparison. Copies of nodes share the table.
+    """
+    __slots__ = ('ends',)
+
+    def __init__(self):
+        self.ends = array.array('l')
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def add(self):
+        self.ends.append(len(self.ends))
+        return len(self.ends) - 1
+
+    def close(self, number):
+        self.ends[number] = len(self.ends) - 1
+
+    def contains(self, ancestor_number, number):
+        return ancestor_number < number <= self.ends[ancestor_number]
+
+
 class ParentNodeTransformer(ast.NodeTransformer):
+
+    def __init__(self):
+        self.parent = None
+        self.preorder_index = PreorderIndex()
+
     def visit(self, node):
         if getattr(node, 'parent', None):
             node = copy.copy(node)
             if hasattr(node, 'lineno'):
                 del node.lineno
-        node.parent = getattr(self, 'parent', None)
-        node.children = []
+        node.parent = self.parent
+        node.preorder = self.preorder_index.add()
+        node.preorder_index = self.preorder_index
         self.parent = node
         result_node = super().visit(node)
         self.parent = node.parent
-        if self.parent:
-            self.parent.children += [node] + node.children
+        self.preorder_index.close(node.preorder)
         return result_node
 
 
+def is_descendant(node, ancestor):
+    return node.preorder_index is ancestor.preorder_index and \
+        ancestor.preorder_index.contains(ancestor.preorder, node.preorder)
+
+
+def create_module_ast(body):
+    module_node = ast.Module(body=body)
+    if 'type_ignores' in ast.Module._fields:
+        module_node.type_ignores = []
+    return module_node
+
+
 def create_ast(code):
     return ParentNodeTransformer().visit(ast.parse(code))
 
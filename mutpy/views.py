@@ -1,9 +1,10 @@
 import ast
 import datetime
 import inspect
+import json
 import os
 import traceback
-from difflib import unified_diff
+from difflib import SequenceMatcher, unified_diff
 
 import jinja2
 import yaml
@@ -47,6 +48,9 @@ class QuietTextView:
             self.time_format(duration),
             self.decorate('{:.1f}%'.format(score.count()), 'blue', attrs=['bold']),
         ))
+        if score.confidence_interval:
+            self.level_print('{:g}% confidence interval: {:.1f}% - {:.1f}% (run {} of {} mutants)'.format(
+                score.confidence, *score.confidence_interval, score.all_mutants, score.population), 2)
 
     def level_print(self, msg, level=1, ended=True, continuation=False):
         end = "\n" if ended else ""
@@ -80,6 +84,7 @@ class TextView(QuietTextView):
     def __init__(self, colored_output=False, show_mutants=False):
         super().__init__(colored_output)
         self.show_mutants = show_mutants
+        self.mutants_sources = {}
 
     def initialize(self, targets, tests):
         self.level_print('Start mutation process:')
@@ -102,6 +107,9 @@ class TextView(QuietTextView):
                                                                 100 * score.incompetent_mutants / score.all_mutants), 2)
             self.level_print('timeout: {} ({:.1f}%)'.format(score.timeout_mutants,
                                                             100 * score.timeout_mutants / score.all_mutants), 2)
+            if score.equivalent_mutants:
+                self.level_print('equivalent: {} ({:.1f}%)'.format(
+                    score.equivalent_mutants, 100 * score.equivalent_mutants / score.all_mutants), 2)
             if score.all_nodes:
                 self.level_print('Coverage: {} of {} AST nodes ({:.1f}%)'.format(
                     score.covered_nodes, score.all_nodes,
@@ -123,7 +131,12 @@ class TextView(QuietTextView):
         if result.is_incompetent():
             self.level_print(str(result.get_exception()), 2)
 
+    def capture_mutant(self, number, mutations, module, mutant):
+        if self.show_mutants:
+            self.mutants_sources[number] = codegen.to_source(mutant)
+
     def mutation(self, number, mutations, module, mutant):
+        mutant = self.mutants_sources.pop(number, mutant)
         for mutation in mutations:
             self.level_print(
                 '[#{:>4}] {:<3} {}: '.format(number, mutation.operator.name(), module.__name__),
@@ -141,7 +154,7 @@ class TextView(QuietTextView):
                                                                                                              exception))
 
     def print_code(self, mutant, original):
-        mutant_src = codegen.to_source(mutant)
+        mutant_src = mutant if isinstance(mutant, str) else codegen.to_source(mutant)
         mutant_src = codegen.add_line_numbers(mutant_src)
         original_src = codegen.to_source(original)
         original_src = codegen.add_line_numbers(original_src)
@@ -171,6 +184,9 @@ class TextView(QuietTextView):
     def incompetent(self, time, *args, **kwargs):
         self.level_print(self.time_format(time) + ' ' + self.decorate('incompetent', 'cyan'), continuation=True)
 
+    def equivalent(self, time, *args, **kwargs):
+        self.level_print(self.time_format(time) + ' ' + self.decorate('equivalent', 'magenta'), continuation=True)
+
 
 class DebugView:
 
@@ -197,13 +213,18 @@ class AccReportView:
         self.number_of_tests = number_of_tests
 
     def mutation(self, number, mutations, module, mutant):
-        mutations = [{'operator': mutation.operator.name(), 'lineno': mutation.node.lineno} for mutation in mutations]
+        mutations = [{'operator': mutation.operator.name(), 'lineno': getattr(mutation.node, 'lineno', None)}
+                     for mutation in mutations]
         self.current_mutation = {
             'number': number,
             'mutations': mutations,
             'module': module,
+            'time_budget': None,
         }
 
+    def time_budget(self, time_budget):
+        self.current_mutation['time_budget'] = time_budget
+
     def killed(self, time, killer, exception_traceback, tests_run, *args, **kwargs):
         self.end_mutation(
             'killed',
@@ -222,6 +243,9 @@ class AccReportView:
     def timeout(self, time, *args, **kwargs):
         self.end_mutation('timeout', time=time)
 
+    def equivalent(self, time, *args, **kwargs):
+        self.end_mutation('equivalent', time=time)
+
     def end_mutation(self, status, time=None, killer=None, tests_run=None, exception_traceback=None):
         self.current_mutation['status'] = status
         self.current_mutation['time'] = time
@@ -238,20 +262,28 @@ class YAMLReportView(AccReportView):
         self.file_name = file_name
 
     def end(self, score, duration):
+        report = {
+            'targets': self.target,
+            'tests': [{'name': test.__name__, 'target': target, 'time': time} for test, target, time in self.tests],
+            'number_of_tests': self.number_of_tests,
+            'mutations': self.mutation_info,
+            'total_time': duration,
+            'time_stats': dict(utils.TimeRegister.executions),
+            'mutation_score': score.count(),
+            'coverage': {
+                'covered_nodes': score.covered_nodes,
+                'all_nodes': score.all_nodes,
+            }
+        }
+        if score.confidence_interval:
+            report['mutation_score_interval'] = {
+                'confidence': score.confidence,
+                'low': score.confidence_interval[0],
+                'high': score.confidence_interval[1],
+                'mutants': score.population,
+            }
         with open(self.file_name, 'w') as report_file:
-            yaml.dump({
-                'targets': self.target,
-                'tests': [{'name': test.__name__, 'target': target, 'time': time} for test, target, time in self.tests],
-                'number_of_tests': self.number_of_tests,
-                'mutations': self.mutation_info,
-                'total_time': duration,
-                'time_stats': dict(utils.TimeRegister.executions),
-                'mutation_score': score.count(),
-                'coverage': {
-                    'covered_nodes': score.covered_nodes,
-                    'all_nodes': score.all_nodes,
-                }
-            }, report_file, default_flow_style=False)
+            yaml.dump(report, report_file, default_flow_style=False)
 
 
 class HTMLReportView(AccReportView):
@@ -263,16 +295,20 @@ class HTMLReportView(AccReportView):
         os.makedirs(os.path.join(dir_name, 'mutants'), exist_ok=True)
         templates_path = os.path.join(os.path.dirname(__file__), 'templates')
         self.env = jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath=templates_path))
+        self.mutants_sources = {}
+
+    def capture_mutant(self, number, mutations, module, mutant):
+        self.mutants_sources[number] = codegen.to_source(mutant)
 
     def mutation(self, number, mutations, module, mutant):
         super().mutation(number, mutations, module, mutant)
-        self.current_mutation['mutant'] = mutant
+        self.current_mutation['mutant_code'] = self.mutants_sources.pop(number, None) or codegen.to_source(mutant)
 
     def end_mutation(self, *args, **kwargs):
         super().end_mutation(*args, **kwargs)
         template = self.env.get_template('detail.html')
         context = {
-            'mutant_code': codegen.to_source(self.current_mutation['mutant']),
+            'mutant_code': self.current_mutation.pop('mutant_code'),
         }
         context.update(self.current_mutation)
         report = template.render(context)
@@ -295,3 +331,194 @@ class HTMLReportView(AccReportView):
         file_path = os.path.join(self.dir_name, 'index.html')
         with open(file_path, 'w') as report_file:
             report_file.write(report)
+
+
+class JSONLReportView:
+    """Writes a JSON Lines record for each mutant as soon as its result is known.
+
+    Mutants are stored as differences from the source of their module, which is written once in a
+    "module" record, so YAML and HTML reports can be generated later from the stream. Only statements
+    holding mutated nodes are rendered (where ast.unparse and end line numbers are available), so the
+    cost of a record doesn't grow with the size of the module.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.report_file = None
+        self.sources = {}
+        self.mutants_changes = {}
+        self.current_mutation = None
+
+    def write(self, record):
+        self.report_file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.report_file.flush()
+
+    def initialize(self, targets, tests):
+        self.report_file = open(self.file_name, 'w')
+        self.write({'type': 'initialize', 'targets': targets, 'tests': tests})
+
+    def passed(self, tests, number_of_tests):
+        self.write({
+            'type': 'passed',
+            'tests': [{'name': test.__name__, 'target': target, 'time': time} for test, target, time in tests],
+            'number_of_tests': number_of_tests,
+        })
+
+    def get_source_lines(self, module):
+        if module.__name__ not in self.sources:
+            try:
+                source = inspect.getsource(module)
+            except (OSError, TypeError):
+                source = None
+            self.sources[module.__name__] = source.split('\n') if source is not None else None
+            if source is not None:
+                self.write({'type': 'module', 'name': module.__name__, 'file': getattr(module, '__file__', None),
+                            'source': source})
+        return self.sources[module.__name__]
+
+    def mutation(self, number, mutations, module, mutant):
+        self.current_mutation = {
+            'type': 'mutation',
+            'number': number,
+            'module': module.__name__,
+            'mutations': [{'operator': mutation.operator.name(), 'lineno': getattr(mutation.node, 'lineno', None)}
+                          for mutation in mutations],
+            'time_budget': None,
+        }
+        self.current_mutation.update(self.mutants_changes.pop(number, None) or
+                                     self.get_mutant_changes(mutations, module, mutant))
+
+    def capture_mutant(self, number, mutations, module, mutant):
+        self.mutants_changes[number] = self.get_mutant_changes(mutations, module, mutant)
+
+    def get_mutant_changes(self, mutations, module, mutant):
+        source_lines = self.get_source_lines(module)
+        if source_lines is None:
+            return {'mutant_code': codegen.to_source(mutant)}
+        return {'mutant_diff': create_mutant_diff(source_lines, mutations, mutant)}
+
+    def time_budget(self, time_budget):
+        self.current_mutation['time_budget'] = time_budget
+
+    def killed(self, time, killer, exception_traceback, tests_run, *args, **kwargs):
+        self.end_mutation('killed', time=time, killer=str(killer), tests_run=tests_run,
+                          exception_traceback=exception_traceback)
+
+    def survived(self, time, tests_run, *args, **kwargs):
+        self.end_mutation('survived', time=time, tests_run=tests_run)
+
+    def incompetent(self, time, exception, tests_run, *args, **kwargs):
+        self.end_mutation('incompetent', time=time, tests_run=tests_run, exception=repr(exception))
+
+    def timeout(self, time, *args, **kwargs):
+        self.end_mutation('timeout', time=time)
+
+    def equivalent(self, time, *args, **kwargs):
+        self.end_mutation('equivalent', time=time)
+
+    def end_mutation(self, status, **kwargs):
+        self.current_mutation['status'] = status
+        self.current_mutation.update(kwargs)
+        self.write(self.current_mutation)
+
+    def end(self, score, duration):
+        self.write({
+            'type': 'end',
+            'duration': duration,
+            'covered_nodes': score.covered_nodes,
+            'all_nodes': score.all_nodes,
+            'confidence': score.confidence,
+            'confidence_interval': score.confidence_interval,
+            'population': score.population,
+        })
+        self.report_file.close()
+
+
+def read_jsonl_report(file_name):
+    with open(file_name) as report_file:
+        for line in report_file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                break
+
+
+def create_mutant_diff(source_lines, mutations, mutant):
+    """Return changes of the source lines made by the mutant.
+
+    Statements holding mutated nodes are rendered in place of their original lines. If they can't be found
+    (e.g. without end line numbers or if they share lines with other statements), the whole mutant is
+    rendered and compared with the source.
+    """
+    if not hasattr(ast, 'unparse'):
+        return compare_mutant_lines(source_lines, codegen.to_source(mutant).split('\n'))
+    statements = find_mutated_statements(source_lines, mutations)
+    if statements is None:
+        return compare_mutant_lines(source_lines, ast.unparse(mutant).split('\n'))
+    mutant_diff = []
+    for start, end, statement in statements:
+        line = source_lines[start]
+        indent = line[:len(line) - len(line.lstrip())]
+        current_statement = find_current_node(statement)
+        new_lines = ast.unparse(current_statement).split('\n') if current_statement else []
+        mutant_diff.append([start, end, [indent + new_line if new_line else new_line for new_line in new_lines]])
+    return mutant_diff
+
+
+def compare_mutant_lines(source_lines, mutant_lines):
+    return [
+        [start, end, mutant_lines[mutant_start:mutant_end]]
+        for tag, start, end, mutant_start, mutant_end in
+        SequenceMatcher(None, source_lines, mutant_lines, autojunk=False).get_opcodes() if tag != 'equal'
+    ]
+
+
+def find_mutated_statements(source_lines, mutations):
+    """Return sorted lines spans (start, end) of the outermost statements holding mutated nodes."""
+    statements = {}
+    for mutation in mutations:
+        node = mutation.node
+        while node is not None and not (isinstance(node, ast.stmt) and get_statement_span(source_lines, node)):
+            node = getattr(node, 'parent', None)
+        if node is None:
+            return None
+        statements[get_statement_span(source_lines, node)] = node
+    spans = sorted(statements)
+    return [(start, end, statements[start, end]) for start, end in spans
+            if not any(other_start <= start and end <= other_end and (other_start, other_end) != (start, end)
+                       for other_start, other_end in spans)]
+
+
+def get_statement_span(source_lines, statement):
+    """Return lines (start, end) of the statement if it doesn't share them with other code, else None."""
+    if getattr(statement, 'end_lineno', None) is None or not hasattr(statement, 'lineno'):
+        return None
+    start = min([statement.lineno] + [decorator.lineno for decorator in getattr(statement, 'decorator_list', [])
+                                      if hasattr(decorator, 'lineno')]) - 1
+    end = statement.end_lineno
+    if end > len(source_lines) or source_lines[start][:statement.col_offset].strip():
+        return None
+    tail = source_lines[end - 1][statement.end_col_offset:].strip()
+    if tail and not tail.startswith('#'):
+        return None
+    return start, end
+
+
+def find_current_node(node):
+    """Return the node which is in place of the original node in the mutated tree, or None if it was removed."""
+    parent = getattr(node, 'parent', None)
+    if parent is None:
+        return node
+    preorder = getattr(node, 'preorder', None)
+    for _, value in ast.iter_fields(parent):
+        for child in (value if isinstance(value, list) else [value]):
+            if child is node or preorder is not None and getattr(child, 'preorder', None) == preorder:
+                return child
+    return None
+
+
+def restore_mutant_code(source_lines, mutant_diff):
+    lines = source_lines[:]
+    for start, end, new_lines in reversed(mutant_diff):
+        lines[start:end] = new_lines
+    return '\n'.join(lines)
@@ -31,7 +31,8 @@ setup(
     scripts=['bin/mut.py'],
     install_requires=requirements,
     extras_require={
-        'pytest': ["pytest>=3.0"]
+        'pytest': ["pytest>=3.0"],
+        'pytest-session': ["pytest>=7.0"],
     },
     test_suite='mutpy.test',
     classifiers=[